@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'job_portal.settings')
 
 application = get_asgi_application()
+
+# Build the job index now rather than in each worker's first request
+from recruitment.utils.job_index import preload_job_index  # noqa: E402
+
+preload_job_index()
@@ -60,6 +60,9 @@ MIDDLEWARE = [
     
     # Allauth middleware
     'allauth.account.middleware.AccountMiddleware',
+
+    # Per-view query counts and timings (QUERY_INSTRUMENTATION)
+    'recruitment.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'job_portal.urls'
@@ -176,3 +179,88 @@ ACCOUNT_EMAIL_VERIFICATION = 'optional'
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
 
+
+# Resume Ranking
+# Share of the final ranking score taken from resume/job text similarity;
+# the rest comes from the trained model's 'Hire' probability.
+RANKER_RELEVANCE_WEIGHT = 0.5
+# How often each worker checks the database for jobs saved by other workers
+JOB_INDEX_REFRESH_SECONDS = 30
+# Build the job index when a web worker starts instead of on first use
+JOB_INDEX_PRELOAD = True
+# 'bundle' memory-maps the single-file model bundle so gunicorn workers share
+# one copy; 'pickle' loads the scikit-learn objects into every worker.
+RANKER_ARTIFACT_FORMAT = 'bundle'
+# 'auto' walks the flattened trees for small batches and uses scikit-learn's
+# predict_proba for large ones; 'flat' or 'sklearn' force one evaluator.
+RANKER_EVALUATOR = 'auto'
+
+# Resume Scoring Queue
+# Queue scoring for the process_scoring_queue worker instead of scoring
+# inside the application POST request.
+RESUME_SCORING_ASYNC = True
+# Attempts before a task is marked Failed; retries back off exponentially
+# starting at SCORING_RETRY_BACKOFF_SECONDS.
+SCORING_MAX_ATTEMPTS = 3
+SCORING_RETRY_BACKOFF_SECONDS = 30
+# A claimed batch that is not finished within this many seconds is handed
+# to another worker. Batches always get at least PARSER_TIMEOUT_SECONDS per
+# task, since nothing interrupts a batch whose resumes all time out.
+SCORING_LEASE_SECONDS = 300
+
+# Resume Scorer Cache
+# Per-process memory budgets (bytes) for the public resume scorer's cached
+# resume text, model features and final results; least recently used
+# entries are evicted first.
+SCORE_CACHE_TEXT_BYTES = 32 * 1024 * 1024
+SCORE_CACHE_FEATURE_BYTES = 16 * 1024 * 1024
+SCORE_CACHE_SCORE_BYTES = 4 * 1024 * 1024
+
+# Resume Text Extraction
+# Extraction stops after this many pages or characters, whichever comes
+# first; resumes rarely need more and huge uploads stay cheap.
+RESUME_MAX_PAGES = 20
+RESUME_MAX_CHARS = 100000
+
+# Resume Parser Pool
+# Resumes are parsed in separate worker processes so a malformed PDF cannot
+# hang or exhaust a web worker. Each file gets PARSER_TIMEOUT_SECONDS and
+# each worker PARSER_MEMORY_LIMIT_MB of address space (Unix only) before it
+# is killed and replaced.
+PARSER_POOL_ENABLED = True
+PARSER_POOL_WORKERS = 2
+PARSER_TIMEOUT_SECONDS = 30
+PARSER_MEMORY_LIMIT_MB = 1024
+PARSER_MAX_TASKS_PER_WORKER = 200
+
+# Applicant Job Feed
+# Open jobs shown per page on the applicant dashboard
+JOB_FEED_PAGE_SIZE = 12
+# Applicants shown per page when reviewing a job
+APPLICANT_PAGE_SIZE = 25
+# Results per page in job search
+JOB_SEARCH_PAGE_SIZE = 20
+# Job search ranks only the newest this many matching jobs, so broad
+# queries stay fast; the page says when older matches were left out.
+JOB_SEARCH_CANDIDATES = 5000
+
+# Analytics
+# Days shown in the analytics dashboard's time series
+ANALYTICS_DAYS = 30
+
+# Query Instrumentation
+# Count SQL queries and time per view and report views that exceed their
+# budget in recruitment.urls.QUERY_BUDGETS; the worst views are printed
+# every QUERY_REPORT_EVERY requests and shown in /health/details/ (staff only).
+QUERY_INSTRUMENTATION = False
+QUERY_REPORT_EVERY = 500
+
+# Resume Uploads
+# Resume uploads larger than this are rejected while they stream in.
+# Uploads above FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to a temporary file
+# instead of being held in memory.
+RESUME_MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # Django's default, 2.5 MB
+# Stored resumes without references are deleted by `sweep_resumes` once
+# nothing has used them for this long
+RESUME_SWEEP_GRACE_HOURS = 24
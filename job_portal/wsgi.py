@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'job_portal.settings')
 
 application = get_wsgi_application()
+
+# Build the job index now rather than in each worker's first request
+from recruitment.utils.job_index import preload_job_index  # noqa: E402
+
+preload_job_index()
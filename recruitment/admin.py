@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Company, JobListing, Application
+from .models import Company, JobListing, Application, ScoringTask, ParsedResume, StoredFile, Skill, SkillAlias, DailyStats, ScoreBucket
 
 @admin.register(Company)
 class CompanyAdmin(admin.ModelAdmin):
@@ -9,11 +9,49 @@ class CompanyAdmin(admin.ModelAdmin):
 @admin.register(JobListing)
 class JobListingAdmin(admin.ModelAdmin):
     list_display = ('title', 'company', 'deadline', 'created_at')
-    list_filter = ('company', 'created_at')
+    list_filter = ('company', 'created_at', 'skills')
     search_fields = ('title', 'description')
 
 @admin.register(Application)
 class ApplicationAdmin(admin.ModelAdmin):
-    list_display = ('full_name', 'job', 'ranking_score', 'applied_at')
-    list_filter = ('job', 'ranking_score')
+    list_display = ('full_name', 'job', 'ranking_score', 'score_status', 'applied_at')
+    list_filter = ('job', 'ranking_score', 'score_status')
     search_fields = ('full_name', 'email', 'job__title')
+
+@admin.register(ScoringTask)
+class ScoringTaskAdmin(admin.ModelAdmin):
+    list_display = ('application', 'status', 'attempts', 'available_at', 'locked_until', 'worker')
+    list_filter = ('status',)
+    search_fields = ('application__full_name', 'last_error')
+
+@admin.register(ParsedResume)
+class ParsedResumeAdmin(admin.ModelAdmin):
+    list_display = ('content_hash', 'parser_version', 'created_at')
+    list_filter = ('parser_version',)
+    search_fields = ('content_hash', 'text')
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'ref_count', 'size', 'created_at')
+    search_fields = ('name', 'content_hash')
+
+class SkillAliasInline(admin.TabularInline):
+    model = SkillAlias
+    extra = 1
+
+@admin.register(Skill)
+class SkillAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name', 'aliases__alias')
+    inlines = [SkillAliasInline]
+
+@admin.register(DailyStats)
+class DailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('day', 'company', 'jobs_posted', 'applications', 'accepted', 'rejected')
+    list_filter = ('company',)
+    date_hierarchy = 'day'
+
+@admin.register(ScoreBucket)
+class ScoreBucketAdmin(admin.ModelAdmin):
+    list_display = ('company', 'bucket', 'count')
+    list_filter = ('company',)
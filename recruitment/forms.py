@@ -1,5 +1,6 @@
 from django import forms
 from .models import JobListing, Application, Company
+from .utils import uploads
 
 class JobPostForm(forms.ModelForm):
     class Meta:
@@ -80,6 +81,28 @@ class ApplicationForm(forms.ModelForm):
                     raise forms.ValidationError(f"Start date cannot be before the job's start date ({self.job.start_date}).")
         return start_date
 
+    def clean_resume(self):
+        resume = self.cleaned_data.get('resume')
+        if 'resume' in self.upload_errors:
+            return None  # reported by clean()
+        # Files that came through ResumeUploadHandler were checked while
+        # streaming; anything else (tests, other handlers) is checked here
+        if resume and not hasattr(resume, 'sha256'):
+            error = uploads.validate_resume(resume)
+            if error:
+                raise forms.ValidationError(error)
+        return resume
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field, error in self.upload_errors.items():
+            if field in self.fields:
+                # Replaces what the field made of the empty file that the
+                # next upload handler supplies in its place
+                self.errors.pop(field, None)
+                self.add_error(field, error)
+        return cleaned_data
+
     def clean_available_interview_date(self):
         interview_date = self.cleaned_data.get('available_interview_date')
         if interview_date:
@@ -90,7 +113,13 @@ class ApplicationForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         self.job = kwargs.pop('job', None)
+        # Files rejected by ResumeUploadHandler never reach request.FILES
+        self.upload_errors = kwargs.pop('upload_errors', None) or {}
         super(ApplicationForm, self).__init__(*args, **kwargs)
+        for field in self.upload_errors:
+            if field in self.fields:
+                # Report why the file was rejected, not that it is missing
+                self.fields[field].required = False
         for field in self.fields.values():
             field.widget.attrs.update({'class': 'form-control'})
         
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recruitment.models import JobListing, ParsedResume
+from recruitment.utils import skills
+
+
+class Command(BaseCommand):
+    help = 'Seeds the skill vocabulary and links existing jobs and parsed resumes to Skill rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows processed per transaction')
+
+    def handle(self, *args, **options):
+        # 1. Canonical skills and aliases from the keyword vocabulary
+        new_aliases = skills.seed_vocabulary()
+        self.stdout.write(f"Vocabulary: {new_aliases} new aliases.")
+
+        # 2. Jobs, from their required_skills text
+        jobs = 0
+        last_id = 0
+        while True:
+            batch = list(JobListing.objects.filter(id__gt=last_id).order_by('id').only('id', 'required_skills')[:options['chunk_size']])
+            if not batch:
+                break
+            with transaction.atomic():
+                for job in batch:
+                    skills.sync_job_skills(job)
+            jobs += len(batch)
+            last_id = batch[-1].id
+        self.stdout.write(f"Linked {jobs} jobs.")
+
+        # 3. Parsed resumes, from the skills the keyword matcher found
+        resumes = 0
+        last_id = 0
+        while True:
+            batch = list(ParsedResume.objects.filter(id__gt=last_id).order_by('id').only('id', 'features')[:options['chunk_size']])
+            if not batch:
+                break
+            with transaction.atomic():
+                skills.link_parsed_resumes(batch)
+            resumes += len(batch)
+            last_id = batch[-1].id
+        self.stdout.write(self.style.SUCCESS(f"Done: {jobs} jobs and {resumes} parsed resumes linked to skills."))
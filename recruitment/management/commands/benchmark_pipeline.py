@@ -0,0 +1,223 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+import os
+import sys
+import json
+import time
+import random
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import numpy as np
+import pandas as pd
+import sklearn
+from recruitment.utils import model_store
+from recruitment.utils.ranker import Ranker
+from recruitment.utils.resume_parser import parse_resume
+
+# Models trained in sparse mode run TF-IDF inside the preprocessor, so
+# they report the two as one 'tfidf+preprocess' stage.
+STAGES = ('parse_resume', 'extract_features', 'tfidf', 'preprocess', 'tfidf+preprocess', 'predict_proba')
+
+FILLER = [
+    "Collaborated with cross-functional teams to deliver features on schedule.",
+    "Designed and maintained data pipelines processing millions of records daily.",
+    "Mentored junior engineers and led weekly code reviews.",
+    "Improved service latency by profiling hot paths and removing redundant work.",
+    "Wrote technical documentation and presented results to stakeholders.",
+    "Built dashboards to monitor model quality and business metrics.",
+    "Participated in on-call rotation and incident post-mortems.",
+]
+
+
+class Command(BaseCommand):
+    help = 'Times each stage of the resume ranking pipeline on a synthetic corpus and writes the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-sizes', default='1,10,100,10000', help='Comma-separated batch sizes')
+        parser.add_argument('--corpus-size', type=int, default=10000, help='Synthetic resumes generated from the training CSV')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for the synthetic corpus')
+        parser.add_argument('--max-runs', type=int, default=200, help='Upper bound on timed runs per stage and batch size')
+        parser.add_argument('--time-budget', type=float, default=10.0, help='Seconds after which a measurement stops adding runs (at least 3 are always made)')
+        parser.add_argument('--max-parse-batch', type=int, default=100, help='Largest batch timed for parse_resume (parsing is slow)')
+        parser.add_argument('--resume-dir', default=os.path.join(settings.MEDIA_ROOT, 'resumes'), help='Real resume files parsed alongside the synthetic ones')
+        parser.add_argument('--output', default='ranking_benchmark.json', help='Where to write the JSON report')
+        parser.add_argument('--compare', help='Earlier JSON report to compare against')
+
+    def handle(self, *args, **options):
+        batch_sizes = sorted({int(size) for size in options['batch_sizes'].split(',') if size.strip()})
+        if not batch_sizes or batch_sizes[0] < 1:
+            raise CommandError("--batch-sizes must be positive integers")
+
+        version, model_dir = model_store.active_version()
+        ranker = Ranker(model_dir=model_dir, version=version)
+        if not ranker.initialized:
+            raise CommandError("No trained model found. Run 'python manage.py train_resume_model' first.")
+
+        # 1. Reproducible corpus: texts for the scoring stages, files for parsing
+        texts = self._synthetic_corpus(options['corpus_size'], options['seed'])
+        self.stdout.write(f"Model version {version}: {len(texts)} synthetic resumes, batch sizes {batch_sizes}")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            files = self._write_docx(texts[:options['max_parse_batch']], tmp_dir)
+            files += self._real_resumes(options['resume_dir'])
+
+            # 2. Time every stage at every batch size
+            results = []
+            for batch_size in batch_sizes:
+                batch = [texts[i % len(texts)] for i in range(batch_size)]
+                stages = self._stage_functions(ranker, batch)
+                if batch_size <= options['max_parse_batch']:
+                    paths = [files[i % len(files)] for i in range(batch_size)]
+                    stages['parse_resume'] = lambda paths=paths: [parse_resume(path) for path in paths]
+
+                for stage in STAGES:
+                    if stage not in stages:
+                        continue
+                    result = self._measure(stages[stage], batch_size, options['max_runs'], options['time_budget'])
+                    result.update({'stage': stage, 'batch_size': batch_size})
+                    results.append(result)
+                    self.stdout.write(
+                        f"{stage:<17} batch={batch_size:<6} p50={result['p50_ms']:>10.3f}ms p99={result['p99_ms']:>10.3f}ms "
+                        f"{result['resumes_per_s']:>12.1f} resumes/s peak={result['peak_kib']:>9.1f}KiB"
+                    )
+
+        report = {
+            'meta': self._metadata(version, options, len(files)),
+            'results': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} measurements to {options['output']}"))
+
+        if options['compare']:
+            self._compare(options['compare'], results)
+
+    def _synthetic_corpus(self, size, seed):
+        data_path = os.path.join(model_store.get_data_dir(), 'AI_Resume_Screening.csv')
+        if not os.path.exists(data_path):
+            raise CommandError(f"Data file not found at {data_path}")
+        rows = pd.read_csv(data_path).fillna({'Certifications': 'None'}).to_dict('records')
+
+        rng = random.Random(seed)
+        texts = []
+        for i in range(size):
+            row = rows[i % len(rows)]
+            lines = [
+                f"{row['Name']}",
+                f"{row['Job Role']} with {row['Experience (Years)']} years of experience",
+                f"Education: {row['Education']}",
+                f"Skills: {row['Skills']}",
+                f"Completed {row['Projects Count']} projects",
+            ]
+            if row['Certifications'] != 'None':
+                lines.append(f"Certifications: {row['Certifications']}")
+            lines += rng.sample(FILLER, rng.randint(2, len(FILLER)))
+            texts.append("\n".join(lines))
+        return texts
+
+    def _write_docx(self, texts, directory):
+        import docx
+
+        paths = []
+        for i, text in enumerate(texts):
+            document = docx.Document()
+            for line in text.split("\n"):
+                document.add_paragraph(line)
+            path = os.path.join(directory, f'resume_{i}.docx')
+            document.save(path)
+            paths.append(path)
+        return paths
+
+    def _real_resumes(self, directory):
+        if not directory or not os.path.isdir(directory):
+            return []
+        return sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if os.path.splitext(name)[1].lower() in ('.pdf', '.docx')
+        )
+
+    def _stage_functions(self, ranker, batch):
+        # Each stage gets the output of the previous one precomputed, so only
+        # its own work is timed.
+        features = pd.DataFrame(ranker._extract_features_batch(batch))
+        X = ranker.encode_features(features.copy())
+        stages = {
+            'extract_features': lambda: pd.DataFrame(ranker._extract_features_batch(batch)),
+            'predict_proba': lambda: ranker._predict_proba(X),
+        }
+        if ranker._skills_in_preprocessor:
+            stages['tfidf+preprocess'] = lambda: ranker.encode_features(features.copy())
+        else:
+            skills_tfidf = ranker.tfidf.transform(features['Skills'])
+            stages['tfidf'] = lambda: ranker.tfidf.transform(features['Skills'])
+            stages['preprocess'] = lambda: ranker.encode_features(features.copy(), skills_tfidf)
+        return stages
+
+    def _measure(self, func, batch_size, max_runs, time_budget):
+        func()  # warm-up
+
+        # Enough runs for stable percentiles without spending minutes on
+        # the largest batches or the slowest stages.
+        runs = max(3, min(max_runs, 10000 // batch_size))
+        samples = []
+        deadline = time.perf_counter() + time_budget
+        while len(samples) < runs and (len(samples) < 3 or time.perf_counter() < deadline):
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+
+        # tracemalloc slows allocation down, so peak memory gets its own run
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        samples = np.asarray(samples) * 1000
+        return {
+            'runs': len(samples),
+            'p50_ms': float(np.percentile(samples, 50)),
+            'p99_ms': float(np.percentile(samples, 99)),
+            'mean_ms': float(samples.mean()),
+            'resumes_per_s': float(batch_size / (samples.mean() / 1000)),
+            'peak_kib': peak / 1024,
+        }
+
+    def _metadata(self, version, options, parse_files):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'model_version': version,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'sklearn': sklearn.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'corpus_size': options['corpus_size'],
+            'seed': options['seed'],
+            'parse_files': parse_files,
+        }
+
+    def _compare(self, path, results):
+        try:
+            with open(path) as f:
+                previous = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read {path}: {e}")
+
+        before = {(r['stage'], r['batch_size']): r for r in previous.get('results', [])}
+        self.stdout.write(f"Compared with {path} (commit {previous.get('meta', {}).get('commit')}):")
+        for result in results:
+            old = before.get((result['stage'], result['batch_size']))
+            if old is None:
+                continue
+            change = result['p50_ms'] / old['p50_ms'] - 1 if old['p50_ms'] else 0.0
+            line = f"  {result['stage']:<17} batch={result['batch_size']:<6} p50 {old['p50_ms']:.3f} -> {result['p50_ms']:.3f}ms ({change:+.0%})"
+            self.stdout.write(self.style.WARNING(line + " (worse)") if change > 0.1 else line)
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+import os
+import time
+import numpy as np
+import pandas as pd
+from recruitment.utils import model_store
+from recruitment.utils.ranker import Ranker
+
+
+def _percentiles(samples):
+    samples = np.asarray(samples) * 1000
+    return float(np.percentile(samples, 50)), float(np.percentile(samples, 99))
+
+
+class Command(BaseCommand):
+    help = 'Compares single-resume scoring latency of the sklearn and flat forest evaluators'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeats', type=int, default=500, help='Timed single-resume calls per evaluator')
+
+    def handle(self, *args, **options):
+        version, model_dir = model_store.active_version()
+        # The sklearn evaluator needs the pickled estimator, not the bundle
+        rankers = {
+            name: Ranker(model_dir=model_dir, version=version, evaluator=name, artifact_format='pickle')
+            for name in ('sklearn', 'flat')
+        }
+        if not all(ranker.initialized for ranker in rankers.values()):
+            raise CommandError("No trained model found. Run 'python manage.py train_resume_model' first.")
+
+        data_path = os.path.join(model_store.get_data_dir(), 'AI_Resume_Screening.csv')
+        df = pd.read_csv(data_path)
+        texts = [f"{row['Skills']} {row['Education']} {row['Job Role']}" for _, row in df.iterrows()]
+
+        # Both evaluators must agree before their speed means anything
+        reference = rankers['sklearn'].predict_scores(texts)
+        flat = rankers['flat'].predict_scores(texts)
+        max_diff = float(np.abs(reference - flat).max())
+        self.stdout.write(f"Model version {version}: {len(texts)} resumes, "
+                          f"bit-identical={np.array_equal(reference, flat)}, max |diff|={max_diff:.2e}")
+
+        self.stdout.write(f"{'evaluator':<10} {'forest p50':>11} {'forest p99':>11} {'end-to-end p50':>15} {'end-to-end p99':>15}")
+        for name, ranker in rankers.items():
+            forest_times, total_times = [], []
+            for i in range(options['repeats']):
+                text = texts[i % len(texts)]
+                X = ranker.encode([text])
+
+                start = time.perf_counter()
+                ranker._predict_proba(X)
+                forest_times.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                ranker.predict_scores([text])
+                total_times.append(time.perf_counter() - start)
+
+            forest_p50, forest_p99 = _percentiles(forest_times)
+            total_p50, total_p99 = _percentiles(total_times)
+            self.stdout.write(f"{name:<10} {forest_p50:>9.3f}ms {forest_p99:>9.3f}ms {total_p50:>13.3f}ms {total_p99:>13.3f}ms")
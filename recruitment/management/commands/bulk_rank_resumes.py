@@ -0,0 +1,280 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import transaction
+import os
+import re
+import csv
+import json
+import time
+import hashlib
+import zipfile
+from recruitment.models import Application, JobListing, ParsedResume
+from recruitment.utils import rollups
+from recruitment.utils.keywords import matcher
+from recruitment.utils.parser_pool import ParserPool
+from recruitment.utils.ranker import get_ranker
+from recruitment.utils.resume_store import PARSER_VERSION
+from recruitment.utils.resume_storage import resume_storage, retain
+from recruitment.utils.skills import link_parsed_resumes
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx')
+EMAIL_PATTERN = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+
+
+class Command(BaseCommand):
+    help = 'Parses a directory or zip of PDF/DOCX resumes in parallel, ranks them in one batch and writes a ranked CSV/JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Directory (searched recursively) or .zip archive of resumes')
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--job', type=int, help='Rank against this JobListing id')
+        target.add_argument('--requirements', help='Rank against free-text requirements, e.g. "python, django, sql"')
+
+        parser.add_argument('--output', default='ranked_resumes.csv', help='Where to write the ranking (.csv or .json)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Sandboxed processes parsing resumes')
+        parser.add_argument('--batch-size', type=int, default=100, help='Files read and parsed together (bounds memory for large archives)')
+        parser.add_argument('--max-file-mb', type=float, default=10.0, help='Skip files larger than this')
+        parser.add_argument('--create-applications', action='store_true', help='Also create an Application per resume for --job')
+        parser.add_argument('--as-user', help='Username the created applications belong to (required with --create-applications)')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        if not (os.path.isdir(source) or zipfile.is_zipfile(source)):
+            raise CommandError(f"{source} is neither a directory nor a zip archive.")
+
+        job = None
+        if options['job']:
+            try:
+                job = JobListing.objects.get(pk=options['job'])
+            except JobListing.DoesNotExist:
+                raise CommandError(f"JobListing {options['job']} does not exist.")
+
+        user = None
+        if options['create_applications']:
+            if job is None or not options['as_user']:
+                raise CommandError("--create-applications needs --job and --as-user.")
+            User = get_user_model()
+            try:
+                user = User.objects.get(**{User.USERNAME_FIELD: options['as_user']})
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['as_user']} does not exist.")
+
+        ranker = get_ranker()
+        if not ranker.initialized:
+            self.stdout.write(self.style.WARNING("No trained model found; ranking by job relevance only."))
+
+        max_bytes = int(options['max_file_mb'] * 1024 * 1024)
+        stats = {'files': 0, 'parsed': 0, 'failed': 0, 'skipped': 0, 'duplicates': 0, 'empty': 0, 'parse': 0.0}
+        started = time.perf_counter()
+
+        # 1. Stream the files in batches and parse each batch in parallel.
+        # Only the extracted text (bounded by RESUME_MAX_CHARS) is kept per
+        # resume; file contents are dropped once their batch is parsed.
+        resumes = []
+        text_by_hash = {}
+        pool = ParserPool(workers=options['workers'])
+        try:
+            batch = []
+            for name, data in self._iter_files(source, max_bytes, stats):
+                batch.append((name, data))
+                if len(batch) >= options['batch_size']:
+                    resumes += self._parse_batch(batch, pool, text_by_hash, user, stats)
+                    batch = []
+            if batch:
+                resumes += self._parse_batch(batch, pool, text_by_hash, user, stats)
+        finally:
+            pool.close()
+
+        if not resumes:
+            raise CommandError("No PDF/DOCX resumes found.")
+
+        # 2. One batched ranking call for every resume with text
+        t0 = time.perf_counter()
+        with_text = [resume for resume in resumes if resume['text']]
+        ranked = ranker.rank_resumes(with_text, job if job is not None else options['requirements'])
+        if with_text and not ranked:
+            # Files stored for this run are deleted by sweep_resumes
+            raise CommandError("Ranking failed; see the error above.")
+        rank_time = time.perf_counter() - t0
+
+        by_filename = {resume['filename']: resume for resume in resumes}
+        rows = []
+        for position, result in enumerate(ranked, start=1):
+            resume = by_filename[result['filename']]
+            rows.append(self._row(position, resume, result))
+        # Unreadable files go last, unranked, so nothing silently disappears
+        rows += [self._row(None, resume, None) for resume in resumes if not resume['text']]
+
+        # 3. Report and (optionally) applications
+        self._write_output(options['output'], rows, job, options['requirements'])
+        created = 0
+        if options['create_applications']:
+            created = self._create_applications(rows, by_filename, job, user)
+
+        elapsed = time.perf_counter() - started
+        rate = stats['files'] / elapsed if elapsed else 0.0
+        parse_rate = stats['parsed'] / stats['parse'] if stats['parse'] else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Ranked {len(ranked)} of {stats['files']} resumes in {elapsed:.1f}s ({rate:.1f} files/s) -> {options['output']}"
+        ))
+        self.stdout.write(
+            f"Parsed {stats['parsed']} new files in {stats['parse']:.1f}s ({parse_rate:.1f} files/s), rank {rank_time:.2f}s; "
+            f"{stats['empty']} without text ({stats['failed']} failed to parse), {stats['duplicates']} duplicates, "
+            f"{stats['skipped']} skipped."
+        )
+        if options['create_applications']:
+            self.stdout.write(f"Created {created} applications for '{job.title}'.")
+
+    def _iter_files(self, source, max_bytes, stats):
+        """
+        Yields (name, bytes) for each supported file, one at a time. Zip
+        members are decompressed straight into memory, never to disk.
+        """
+        if os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for filename in sorted(files):
+                    path = os.path.join(root, filename)
+                    if not self._accept(os.path.relpath(path, source), os.path.getsize(path), max_bytes, stats):
+                        continue
+                    with open(path, 'rb') as f:
+                        yield os.path.relpath(path, source), f.read()
+            return
+
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or info.filename.startswith('__MACOSX/'):
+                    continue
+                if not self._accept(info.filename, info.file_size, max_bytes, stats):
+                    continue
+                with archive.open(info) as member:
+                    # file_size comes from the archive itself; don't trust it
+                    data = member.read(max_bytes + 1)
+                if len(data) > max_bytes:
+                    stats['skipped'] += 1
+                    self.stdout.write(f"  skipped {info.filename}: larger than {max_bytes // (1024 * 1024)} MB")
+                    continue
+                yield info.filename, data
+
+    def _accept(self, name, size, max_bytes, stats):
+        if os.path.splitext(name)[1].lower() not in SUPPORTED_EXTENSIONS:
+            stats['skipped'] += 1
+            return False
+        if size > max_bytes:
+            stats['skipped'] += 1
+            self.stdout.write(f"  skipped {name}: larger than {max_bytes // (1024 * 1024)} MB")
+            return False
+        return True
+
+    def _parse_batch(self, batch, pool, text_by_hash, user, stats):
+        hashes = [hashlib.sha256(data).hexdigest() for _, data in batch]
+
+        # Text for content seen earlier in this run or already in the store
+        # is reused; everything else is parsed once, in parallel.
+        unseen = {content_hash for content_hash in hashes if content_hash not in text_by_hash}
+        for parsed in ParsedResume.objects.filter(content_hash__in=unseen, parser_version=PARSER_VERSION).only('content_hash', 'text'):
+            text_by_hash[parsed.content_hash] = parsed.text
+        to_parse = {}
+        for (name, data), content_hash in zip(batch, hashes):
+            if content_hash not in text_by_hash and content_hash not in to_parse:
+                to_parse[content_hash] = (name, data)
+
+        t0 = time.perf_counter()
+        failed = set()
+        if to_parse:
+            texts = pool.map([data for _, data in to_parse.values()], [name for name, _ in to_parse.values()])
+            stats['parsed'] += len(to_parse)
+            for content_hash, text in zip(to_parse, texts):
+                if text is None:
+                    # Timed out or crashed: ranked without text, and not stored
+                    # as this content's text
+                    failed.add(content_hash)
+                    stats['failed'] += 1
+                    text = ''
+                text_by_hash[content_hash] = text
+        stats['parse'] += time.perf_counter() - t0
+
+        resumes = []
+        for (name, data), content_hash in zip(batch, hashes):
+            text = text_by_hash[content_hash]
+            stats['files'] += 1
+            if not text.strip():
+                stats['empty'] += 1
+            resume = {'filename': name, 'text': text if text.strip() else '', 'hash': content_hash, 'new': content_hash in to_parse and content_hash not in failed}
+            if user is not None:
+                # Store the file now, while its bytes are in memory
+                content = ContentFile(data)
+                content.sha256 = content_hash
+                resume['stored_as'] = resume_storage().save('resumes/' + os.path.basename(name), content)
+            resumes.append(resume)
+        stats['duplicates'] += len(batch) - len(set(hashes))
+        self.stdout.write(f"  parsed {stats['files']} files...")
+        return resumes
+
+    def _row(self, position, resume, result):
+        return {
+            'rank': position,
+            'filename': resume['filename'],
+            'score': round(result['score'], 6) if result else None,
+            'hire_probability': round(result['hire_probability'], 6) if result and result['hire_probability'] is not None else None,
+            'relevance': round(result['relevance'], 6) if result and result['relevance'] is not None else None,
+            'sha256': resume['hash'],
+            'error': '' if result else 'No text could be extracted',
+        }
+
+    def _write_output(self, path, rows, job, requirements):
+        if path.lower().endswith('.json'):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'job': job.pk if job is not None else None,
+                    'requirements': requirements,
+                    'results': rows,
+                }, f, indent=2)
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def _create_applications(self, rows, by_filename, job, user):
+        resumes = [by_filename[row['filename']] for row in rows]
+
+        with transaction.atomic():
+            # Keep the parsed text so the portal never parses these files again
+            new = {}
+            for resume in resumes:
+                if resume['new'] and resume['hash'] not in new:
+                    new[resume['hash']] = ParsedResume(
+                        content_hash=resume['hash'], parser_version=PARSER_VERSION, text=resume['text'],
+                    )
+            for parsed, features in zip(new.values(), matcher.match_batch([parsed.text for parsed in new.values()])):
+                parsed.features = features
+            ParsedResume.objects.bulk_create(new.values(), ignore_conflicts=True)
+            stored = list(ParsedResume.objects.filter(
+                content_hash__in={resume['hash'] for resume in resumes}, parser_version=PARSER_VERSION,
+            ).only('id', 'content_hash', 'features'))
+            link_parsed_resumes([parsed for parsed in stored if parsed.content_hash in new])
+            parsed_ids = {parsed.content_hash: parsed.id for parsed in stored}
+
+            applications = []
+            for row, resume in zip(rows, resumes):
+                email = EMAIL_PATTERN.search(resume['text'])
+                applications.append(Application(
+                    user=user,
+                    job=job,
+                    full_name=os.path.splitext(os.path.basename(resume['filename']))[0][:255],
+                    email=email.group(0) if email else '',
+                    resume=resume['stored_as'],
+                    resume_hash=resume['hash'],
+                    parsed_resume_id=parsed_ids.get(resume['hash']),
+                    ranking_score=row['score'] or 0.0,
+                    score_status='Scored' if row['score'] is not None else 'Failed',
+                ))
+            Application.objects.bulk_create(applications, batch_size=500)
+            # bulk_create sends no signals, so count the file references and
+            # update the analytics rollups here
+            for application in applications:
+                retain(application.resume.name)
+            rollups.applications_saved(applications, created=True)
+        return len(applications)
@@ -0,0 +1,107 @@
+from django.core.management.base import BaseCommand
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Count
+from recruitment.models import Application, StoredFile
+from recruitment.utils.resume_store import file_hash
+from recruitment.utils.resume_storage import resume_storage, hashed_name, content_hash_from_name
+
+
+class Command(BaseCommand):
+    help = 'Moves application resumes into the content-addressed storage, one file per distinct content, and rebuilds reference counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be moved and saved')
+        parser.add_argument('--keep-originals', action='store_true', help='Leave the old files in place after moving')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows per bulk_update statement')
+
+    def handle(self, *args, **options):
+        storage = resume_storage()
+        dry_run = options['dry_run']
+
+        # 1. Hash every resume still stored under its upload name
+        moved = []
+        originals = {}
+        targets = {}
+        stats = {'applications': 0, 'already': 0, 'missing': 0, 'moved': 0, 'files': 0, 'duplicate_bytes': 0}
+        for application in Application.objects.only('id', 'resume', 'resume_hash').order_by('id').iterator(chunk_size=options['chunk_size']):
+            stats['applications'] += 1
+            name = application.resume.name
+            if not name or content_hash_from_name(name):
+                stats['already'] += 1
+                continue
+            if name not in originals:
+                try:
+                    digest = file_hash(storage.path(name))
+                except OSError:
+                    stats['missing'] += 1
+                    self.stdout.write(f"  missing file for application {application.id}: {name}")
+                    continue
+                originals[name] = digest
+                size = storage.size(name)
+                if digest in targets:
+                    stats['duplicate_bytes'] += size
+                else:
+                    targets[digest] = name
+            digest = originals[name]
+            application.resume.name = hashed_name(digest, name)
+            application.resume_hash = digest
+            moved.append(application)
+        stats['moved'] = len(moved)
+        stats['files'] = len(targets)
+
+        self.stdout.write(
+            f"{stats['applications']} applications: {stats['already']} already deduplicated, "
+            f"{stats['moved']} to move into {stats['files']} files, {stats['missing']} with missing files."
+        )
+        self.stdout.write(f"Duplicate copies: {len(originals) - len(targets)} files, {stats['duplicate_bytes'] / (1024 * 1024):.1f} MB.")
+        if dry_run:
+            return
+
+        # 2. Copy one file per content hash (a no-op if it is already there)
+        for digest, name in targets.items():
+            with storage.open(name, 'rb') as f:
+                content = File(f, name=name)
+                content.sha256 = digest
+                storage.save(name, content)
+
+        # 3. Point applications at the shared files and recount references
+        with transaction.atomic():
+            Application.objects.bulk_update(moved, ['resume', 'resume_hash'], batch_size=options['chunk_size'])
+            counts = dict(
+                Application.objects.exclude(resume='').values('resume').annotate(n=Count('id')).values_list('resume', 'n')
+            )
+            counts = {name: n for name, n in counts.items() if content_hash_from_name(name)}
+            # Unreferenced files are left to sweep_resumes, which also
+            # deletes them from disk
+            StoredFile.objects.exclude(name__in=list(counts)).exclude(ref_count=0).update(ref_count=0)
+            existing = {stored.name: stored for stored in StoredFile.objects.all()}
+            for name, n in counts.items():
+                stored = existing.get(name)
+                if stored is None:
+                    StoredFile.objects.create(
+                        name=name, content_hash=content_hash_from_name(name), size=self._size(storage, name), ref_count=n,
+                    )
+                elif stored.ref_count != n:
+                    stored.ref_count = n
+                    stored.save(update_fields=['ref_count'])
+        self.stdout.write(f"Reference counts rebuilt for {len(counts)} stored files.")
+
+        # 4. The old copies are no longer referenced by any application
+        removed = 0
+        if not options['keep_originals']:
+            still_used = set(Application.objects.filter(resume__in=list(originals)).values_list('resume', flat=True))
+            for name in originals:
+                if name not in still_used and storage.exists(name):
+                    storage.delete(name)
+                    removed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {stats['moved']} applications now share {stats['files']} files; {removed} old files removed."
+        ))
+
+    def _size(self, storage, name):
+        try:
+            return storage.size(name)
+        except OSError:
+            return 0
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+import time
+from recruitment.models import ScoringTask
+from recruitment.utils import scoring_queue
+
+
+class Command(BaseCommand):
+    help = 'Scores queued applications in batches (run one or more of these alongside the web server)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Tasks claimed and scored together')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling forever')
+
+    def handle(self, *args, **options):
+        worker = scoring_queue.worker_id()
+        self.stdout.write(f"Scoring worker {worker} started ({ScoringTask.objects.exclude(status='Failed').count()} tasks waiting).")
+
+        totals = {'scored': 0, 'retried': 0, 'failed': 0}
+        try:
+            while True:
+                started = time.perf_counter()
+                claimed, (scored, retried, failed) = scoring_queue.run_batch(worker, options['batch_size'])
+                if claimed:
+                    totals['scored'] += scored
+                    totals['retried'] += retried
+                    totals['failed'] += failed
+                    self.stdout.write(
+                        f"  {claimed} claimed: {scored} scored, {retried} to retry, {failed} failed "
+                        f"in {time.perf_counter() - started:.2f}s"
+                    )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted; unfinished tasks are picked up again when their lease expires.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {totals['scored']} scored, {totals['retried']} retried, {totals['failed']} failed."
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from recruitment.utils import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the analytics rollups (daily stats and score histograms) from the job and application tables'
+
+    def handle(self, *args, **options):
+        days, buckets = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {days} company-days and {buckets} score buckets written. "
+            f"Recorded rejection counts were kept (rejected applications are deleted)."
+        ))
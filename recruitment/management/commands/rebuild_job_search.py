@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from recruitment.utils import job_search
+
+
+class Command(BaseCommand):
+    help = 'Refills the full-text job search index from the job and company tables'
+
+    def handle(self, *args, **options):
+        if not job_search.available():
+            self.stdout.write("Full-text search needs SQLite; other databases search without an index.")
+            return
+        indexed = job_search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Done: {indexed} jobs indexed."))
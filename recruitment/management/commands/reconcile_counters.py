@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from recruitment.utils import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recounts the job, application and decision counters on jobs and companies and corrects any drift'
+
+    def handle(self, *args, **options):
+        corrected = rollups.reconcile_counters()
+        self.stdout.write(self.style.SUCCESS(f"Done: {corrected} jobs and companies corrected."))
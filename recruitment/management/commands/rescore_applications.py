@@ -0,0 +1,143 @@
+from django.core.management.base import BaseCommand, CommandError
+import json
+import os
+import time
+from recruitment.models import Application
+from recruitment.utils import model_store, resume_store, rollups
+from recruitment.utils.parser_pool import ParserPool
+from recruitment.utils.ranker import get_ranker
+
+
+class Command(BaseCommand):
+    help = 'Re-computes Application.ranking_score with the currently published model'
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group(required=True)
+        scope.add_argument('--job', type=int, help='Only re-score applications for this JobListing id')
+        scope.add_argument('--company', type=int, help='Only re-score applications for jobs of this Company id')
+        scope.add_argument('--all', action='store_true', help='Re-score every application')
+
+        parser.add_argument('--batch-size', type=int, default=1000, help='Resumes per predict_proba call')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows per bulk_update statement')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Sandboxed processes parsing resumes the store has not seen')
+        parser.add_argument('--resume', action='store_true', help='Continue from the last checkpoint of an interrupted run')
+        parser.add_argument('--checkpoint', default=None, help='Checkpoint file (default: recruitment/data/rescore_checkpoint.json)')
+
+    def handle(self, *args, **options):
+        ranker = get_ranker()
+        if not ranker.initialized:
+            raise CommandError("No trained model found. Run 'python manage.py train_resume_model' first.")
+
+        queryset = Application.objects.all()
+        if options['job']:
+            scope = f"job={options['job']}"
+            queryset = queryset.filter(job_id=options['job'])
+        elif options['company']:
+            scope = f"company={options['company']}"
+            queryset = queryset.filter(job__company_id=options['company'])
+        else:
+            scope = 'all'
+
+        checkpoint_path = options['checkpoint'] or os.path.join(model_store.get_data_dir(), 'rescore_checkpoint.json')
+        last_id = 0
+        if options['resume']:
+            last_id = self._read_checkpoint(checkpoint_path, scope, ranker.version)
+            if last_id:
+                self.stdout.write(f"Resuming after application id {last_id}.")
+
+        queryset = queryset.order_by('id').only(
+            'id', 'resume', 'job_id', 'resume_hash', 'parsed_resume_id', *rollups.APPLICATION_FIELDS,
+        )
+        total = queryset.filter(id__gt=last_id).count()
+        self.stdout.write(f"Re-scoring {total} applications ({scope}) with model version {ranker.version}...")
+
+        stats = {'processed': 0, 'scored': 0, 'unparsed': 0, 'parse': 0.0, 'predict': 0.0, 'write': 0.0}
+        started = time.perf_counter()
+
+        # Keyset pagination: each batch is a fresh query, so writes never race
+        # an open cursor and an interrupted run can continue from last_id.
+        pool = ParserPool(workers=options['workers'])
+        try:
+            while True:
+                batch = list(queryset.filter(id__gt=last_id)[:options['batch_size']])
+                if not batch:
+                    break
+                self._process_batch(batch, ranker, pool, options, stats)
+                last_id = batch[-1].id
+                self._write_checkpoint(checkpoint_path, scope, ranker.version, last_id)
+                self._report_progress(stats, total, started)
+        finally:
+            pool.close()
+
+        # Completed runs leave nothing to resume
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        elapsed = time.perf_counter() - started
+        rate = stats['processed'] / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {stats['processed']} processed, {stats['scored']} scored, {stats['unparsed']} without text "
+            f"in {elapsed:.1f}s ({rate:.1f} applications/s)."
+        ))
+        self.stdout.write(
+            f"Time by stage: parse {stats['parse']:.1f}s, predict {stats['predict']:.1f}s, write {stats['write']:.1f}s."
+        )
+        self.stdout.write("Parser outcomes: " + ", ".join(f"{reason} {count}" for reason, count in sorted(pool.stats().items()) if reason != 'workers'))
+
+    def _process_batch(self, batch, ranker, pool, options, stats):
+        # 1. Text and features from the parsed-resume store; only files it
+        # has not seen yet are parsed, in parallel
+        t0 = time.perf_counter()
+        store = resume_store.ensure_parsed(batch, pool=pool)
+        t1 = time.perf_counter()
+
+        # 2. One batched prediction for every resume that produced text
+        parsed = [(application, store[application.id]) for application in batch
+                  if store[application.id] is not None and store[application.id].text]
+        updated = []
+        if parsed:
+            scores, _, _ = ranker.score_resumes(
+                [parsed_resume.text for _, parsed_resume in parsed],
+                [application.job_id for application, _ in parsed],
+                hits=[parsed_resume.features for _, parsed_resume in parsed],
+            )
+            for (application, _), score in zip(parsed, scores):
+                application.ranking_score = float(score)
+                application.score_status = 'Scored'
+                updated.append(application)
+        t2 = time.perf_counter()
+
+        # 3. Write back in chunks
+        if updated:
+            Application.objects.bulk_update(updated, ['ranking_score', 'score_status'], batch_size=options['chunk_size'])
+            rollups.applications_saved(updated)
+        t3 = time.perf_counter()
+
+        stats['processed'] += len(batch)
+        stats['scored'] += len(updated)
+        stats['unparsed'] += len(batch) - len(parsed)
+        stats['parse'] += t1 - t0
+        stats['predict'] += t2 - t1
+        stats['write'] += t3 - t2
+
+    def _report_progress(self, stats, total, started):
+        elapsed = time.perf_counter() - started
+        rate = stats['processed'] / elapsed if elapsed else 0.0
+        self.stdout.write(f"  {stats['processed']}/{total} applications ({rate:.1f}/s)")
+
+    def _read_checkpoint(self, path, scope, version):
+        try:
+            with open(path) as f:
+                checkpoint = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return 0
+        if checkpoint.get('scope') != scope or checkpoint.get('model_version') != version:
+            self.stdout.write(self.style.WARNING("Checkpoint belongs to a different scope or model version; starting over."))
+            return 0
+        return int(checkpoint.get('last_id', 0))
+
+    def _write_checkpoint(self, path, scope, version, last_id):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'scope': scope, 'model_version': version, 'last_id': last_id}, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,15 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from recruitment.utils import resume_storage
+
+
+class Command(BaseCommand):
+    help = 'Deletes stored resume files that no application has referenced for the grace period (run it daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, help='Defaults to RESUME_SWEEP_GRACE_HOURS')
+
+    def handle(self, *args, **options):
+        grace = timedelta(hours=options['grace_hours']) if options['grace_hours'] is not None else None
+        deleted = resume_storage.sweep(grace)
+        self.stdout.write(self.style.SUCCESS(f"Done: {deleted} unreferenced resume files deleted."))
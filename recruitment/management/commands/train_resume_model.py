@@ -2,89 +2,269 @@ from django.core.management.base import BaseCommand
 import pandas as pd
 import numpy as np
 import os
+import json
+import time
 import joblib
-from sklearn.model_selection import train_test_split
+from contextlib import contextmanager
+from sklearn.model_selection import train_test_split, cross_validate, StratifiedKFold
 from sklearn.preprocessing import LabelEncoder, OneHotEncoder
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.compose import ColumnTransformer
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
 from django.conf import settings
+from recruitment.utils import model_store
 
 class Command(BaseCommand):
     help = 'Trains the Random Forest Resume Ranking Model'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=3, help='Number of published model versions to keep on disk')
+        parser.add_argument('--no-bundle', action='store_true', help='Only write the pickles, not the memory-mappable bundle')
+        parser.add_argument('--dense', action='store_true', help='Legacy mode: densify the TF-IDF matrix into a wide DataFrame')
+        parser.add_argument('--n-jobs', type=int, default=-1, help='Cores used to fit the forest (-1 = all)')
+        parser.add_argument('--n-estimators', type=int, default=100, help='Number of trees')
+        parser.add_argument('--test-size', type=float, default=0.2, help='Hold-out fraction used for evaluation (0 disables it)')
+        parser.add_argument('--cv', type=int, default=0, help='Also report k-fold cross-validated metrics')
+        parser.add_argument('--no-publish', action='store_true', help='Write the new version but keep serving the current one')
+
+    @contextmanager
+    def _stage(self, name):
+        start = time.perf_counter()
+        yield
+        self.timings[name] = time.perf_counter() - start
+
     def handle(self, *args, **kwargs):
         self.stdout.write("Starting model training...")
-        
+        self.timings = {}
+
         # Define paths
         base_dir = settings.BASE_DIR
         data_path = os.path.join(base_dir, 'recruitment', 'data', 'AI_Resume_Screening.csv')
-        model_dir = os.path.join(base_dir, 'recruitment', 'data')
-        
+
         if not os.path.exists(data_path):
             self.stdout.write(self.style.ERROR(f"Data file not found at {data_path}"))
             self.stdout.write(self.style.WARNING("Please upload 'AI_Resume_Screening.csv' to recruitment/data/"))
             return
 
         # 1. Load Data
-        df = pd.read_csv(data_path)
+        with self._stage('load'):
+            df = pd.read_csv(data_path)
         self.stdout.write(f"Loaded {len(df)} records.")
 
-        # 2. TF-IDF on Skills
+        # 2. Build features
+        with self._stage('features'):
+            if kwargs['dense']:
+                X, tfidf_vectorizer = self._dense_features(df)
+            else:
+                X = df.copy()
+                tfidf_vectorizer = None
+
+            # Adjust features as per dataset
+            drop_cols = ['Resume_ID', 'Name', 'Recruiter Decision']
+            # Ensure these columns exist
+            available_drop_cols = [col for col in drop_cols if col in X.columns]
+            y = X['Recruiter Decision']
+            X = X.drop(available_drop_cols, axis=1)
+            # Fill missing
+            X['Certifications'] = X['Certifications'].fillna('None')
+
+        # 3. Encode Target
+        label_encoder = LabelEncoder()
+        y_encoded = label_encoder.fit_transform(y)
+
+        def make_preprocessor():
+            categorical_features = ['Education', 'Certifications', 'Job Role']
+            # Filter categorical features that might not exist in X
+            categorical_features = [col for col in categorical_features if col in X.columns]
+            if kwargs['dense']:
+                passthrough_features = [col for col in X.columns if col not in categorical_features]
+                return ColumnTransformer(
+                    transformers=[
+                        ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features),
+                        ('passthrough', 'passthrough', passthrough_features)
+                    ]
+                )
+            # Sparse mode: TF-IDF runs inside the preprocessor on the raw
+            # 'Skills' text and the output stays a CSR matrix end to end.
+            passthrough_features = [col for col in X.columns if col not in categorical_features + ['Skills']]
+            return ColumnTransformer(
+                transformers=[
+                    ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features),
+                    ('skills', TfidfVectorizer(stop_words='english'), 'Skills'),
+                    ('passthrough', 'passthrough', passthrough_features)
+                ],
+                sparse_threshold=1.0
+            )
+
+        def make_model():
+            return RandomForestClassifier(
+                n_estimators=kwargs['n_estimators'],
+                n_jobs=kwargs['n_jobs'],
+                random_state=42
+            )
+
+        positive_idx = list(label_encoder.classes_).index('Hire') if 'Hire' in label_encoder.classes_ else 0
+        metrics = {'records': len(df), 'mode': 'dense' if kwargs['dense'] else 'sparse'}
+
+        # 4. Evaluate on a stratified hold-out split
+        if kwargs['test_size'] > 0:
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y_encoded, test_size=kwargs['test_size'], random_state=42, stratify=y_encoded
+            )
+            with self._stage('holdout_fit'):
+                holdout_pre = make_preprocessor()
+                holdout_model = make_model().fit(holdout_pre.fit_transform(X_train), y_train)
+            with self._stage('holdout_predict'):
+                proba = holdout_model.predict_proba(holdout_pre.transform(X_test))
+            metrics['holdout'] = self._classification_metrics(y_test, proba, positive_idx)
+            self.stdout.write(f"Hold-out ({len(y_test)} rows): " + self._format_metrics(metrics['holdout']))
+
+        # 5. Optional k-fold cross-validation
+        if kwargs['cv'] > 1:
+            from sklearn.pipeline import make_pipeline
+            with self._stage('cross_validation'):
+                scores = cross_validate(
+                    make_pipeline(make_preprocessor(), make_model()),
+                    X, y_encoded,
+                    cv=StratifiedKFold(n_splits=kwargs['cv'], shuffle=True, random_state=42),
+                    scoring=['accuracy', 'f1_macro', 'roc_auc'] if len(label_encoder.classes_) == 2 else ['accuracy', 'f1_macro'],
+                )
+            metrics['cv'] = {
+                key[len('test_'):]: {'mean': float(np.mean(value)), 'std': float(np.std(value))}
+                for key, value in scores.items() if key.startswith('test_')
+            }
+            self.stdout.write(f"{kwargs['cv']}-fold CV: " + ", ".join(
+                f"{name}={value['mean']:.3f}±{value['std']:.3f}" for name, value in metrics['cv'].items()
+            ))
+
+        # 6. Train the final model on all records
+        self.stdout.write("Training Random Forest Classifier...")
+        with self._stage('fit'):
+            preprocessor = make_preprocessor()
+            X_processed = preprocessor.fit_transform(X)
+            model = make_model().fit(X_processed, y_encoded)
+        if tfidf_vectorizer is None:
+            tfidf_vectorizer = preprocessor.named_transformers_['skills']
+
+        # Serve single-threaded: per-request batches are tiny and thread
+        # start-up would dominate.
+        model.set_params(n_jobs=None)
+
+        # 7. Save Artifacts into a fresh version directory
+        with self._stage('save'):
+            model_dir = model_store.create_version_dir()
+            joblib.dump(model, os.path.join(model_dir, 'rf_model.pkl'))
+            joblib.dump(preprocessor, os.path.join(model_dir, 'preprocessor.pkl'))
+            joblib.dump(tfidf_vectorizer, os.path.join(model_dir, 'tfidf.pkl'))
+            joblib.dump(label_encoder, os.path.join(model_dir, 'label_encoder.pkl'))
+
+            # Save feature columns to help with inference alignment if needed
+            # (Though column transformer handles most of it, we need to know input columns)
+            joblib.dump(X.columns.tolist(), os.path.join(model_dir, 'feature_columns.pkl'))
+
+            # Single memory-mappable bundle shared by all web workers
+            if not kwargs['no_bundle']:
+                model_store.write_bundle(model_dir, model, preprocessor, tfidf_vectorizer, label_encoder, X.columns.tolist())
+
+        # 8. Measure inference latency through the same path the web app uses
+        with self._stage('latency'):
+            metrics['latency'] = self._measure_latency(model_dir, df)
+        self.stdout.write("Inference: " + ", ".join(f"{k}={v:.2f}" for k, v in metrics['latency'].items()))
+
+        metrics['timings'] = self.timings
+        with open(os.path.join(model_dir, 'metrics.json'), 'w') as f:
+            json.dump(metrics, f, indent=2)
+        self._compare_with_active(metrics)
+
+        self.stdout.write("Wall time by stage: " + ", ".join(f"{k} {v:.2f}s" for k, v in self.timings.items()))
+
+        # 9. Publish. Running web workers pick the new version up on their next request.
+        version = os.path.basename(model_dir)
+        if kwargs['no_publish']:
+            self.stdout.write(self.style.WARNING(f"Model version {version} written to {model_dir} but not published."))
+            return
+
+        model_store.publish_version(model_dir)
+        removed = model_store.prune_versions(keep=kwargs['keep'])
+        if removed:
+            self.stdout.write(f"Removed old model versions: {', '.join(removed)}")
+
+        self.stdout.write(self.style.SUCCESS(f"Model version {version} trained and published to {model_dir}"))
+
+    def _dense_features(self, df):
+        # TF-IDF on Skills
         tfidf_vectorizer = TfidfVectorizer(stop_words='english')
         skills_tfidf_matrix = tfidf_vectorizer.fit_transform(df['Skills'])
         skills_tfidf_df = pd.DataFrame(
-            skills_tfidf_matrix.toarray(), 
+            skills_tfidf_matrix.toarray(),
             columns=['skill_tfidf_' + col for col in tfidf_vectorizer.get_feature_names_out()]
         )
 
-        # 3. Integrate Features
-        df_processed = pd.concat([df.drop('Skills', axis=1), skills_tfidf_df], axis=1)
+        # Integrate Features
+        return pd.concat([df.drop('Skills', axis=1), skills_tfidf_df], axis=1), tfidf_vectorizer
 
-        # 4. Define X and y
-        # Adjust features as per dataset
-        drop_cols = ['Resume_ID', 'Name', 'Recruiter Decision']
-        # Ensure these columns exist
-        available_drop_cols = [col for col in drop_cols if col in df_processed.columns]
-        X = df_processed.drop(available_drop_cols, axis=1)
-        y = df_processed['Recruiter Decision']
+    def _classification_metrics(self, y_true, proba, positive_idx):
+        y_pred = proba.argmax(axis=1)
+        result = {
+            'accuracy': float(accuracy_score(y_true, y_pred)),
+            'f1_macro': float(f1_score(y_true, y_pred, average='macro')),
+        }
+        if proba.shape[1] == 2:
+            result['roc_auc'] = float(roc_auc_score(y_true == positive_idx, proba[:, positive_idx]))
+        return result
 
-        # 5. Encode Target
-        label_encoder = LabelEncoder()
-        y_encoded = label_encoder.fit_transform(y)
+    def _format_metrics(self, values):
+        return ", ".join(f"{name}={value:.3f}" for name, value in values.items())
 
-        # 6. Preprocessing (OneHot)
-        # Fill missing
-        X['Certifications'] = X['Certifications'].fillna('None')
-        
-        categorical_features = ['Education', 'Certifications', 'Job Role']
-        # Filter categorical features that might not exist in X
-        categorical_features = [col for col in categorical_features if col in X.columns]
-        
-        passthrough_features = [col for col in X.columns if col not in categorical_features]
-
-        preprocessor = ColumnTransformer(
-            transformers=[
-                ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features),
-                ('passthrough', 'passthrough', passthrough_features)
-            ]
-        )
+    def _measure_latency(self, model_dir, df, repeats=50):
+        from recruitment.utils.ranker import Ranker
 
-        X_processed = preprocessor.fit_transform(X)
+        ranker = Ranker(model_dir=model_dir, version=os.path.basename(model_dir))
+        texts = [f"{row['Skills']} {row['Education']} {row['Job Role']}" for _, row in df.head(100).iterrows()]
 
-        # 7. Train Model
-        self.stdout.write("Training Random Forest Classifier...")
-        model = RandomForestClassifier(random_state=42)
-        model.fit(X_processed, y_encoded)
-
-        # 8. Save Artifacts
-        joblib.dump(model, os.path.join(model_dir, 'rf_model.pkl'))
-        joblib.dump(preprocessor, os.path.join(model_dir, 'preprocessor.pkl'))
-        joblib.dump(tfidf_vectorizer, os.path.join(model_dir, 'tfidf.pkl'))
-        joblib.dump(label_encoder, os.path.join(model_dir, 'label_encoder.pkl'))
-        
-        # Save feature columns to help with inference alignment if needed
-        # (Though column transformer handles most of it, we need to know input columns)
-        joblib.dump(X.columns.tolist(), os.path.join(model_dir, 'feature_columns.pkl'))
-
-        self.stdout.write(self.style.SUCCESS(f"Model trained and saved to {model_dir}"))
+        ranker.predict_scores(texts[:1])  # warm-up
+        single = []
+        for i in range(repeats):
+            start = time.perf_counter()
+            ranker.predict_scores([texts[i % len(texts)]])
+            single.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        ranker.predict_scores(texts)
+        batch = time.perf_counter() - start
+
+        return {
+            'single_p50_ms': float(np.percentile(single, 50) * 1000),
+            'single_p99_ms': float(np.percentile(single, 99) * 1000),
+            'batch100_ms': batch * 1000,
+            'batch100_resumes_per_s': len(texts) / batch,
+        }
+
+    def _compare_with_active(self, metrics):
+        # Flag regressions against the version currently being served
+        current_version, current_dir = model_store.active_version()
+        try:
+            with open(os.path.join(current_dir, 'metrics.json')) as f:
+                previous = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+
+        lines = []
+        for section, key, higher_is_better in (
+            ('holdout', 'accuracy', True),
+            ('holdout', 'roc_auc', True),
+            ('latency', 'single_p50_ms', False),
+            ('latency', 'batch100_ms', False),
+        ):
+            old = previous.get(section, {}).get(key)
+            new = metrics.get(section, {}).get(key)
+            if old is None or new is None:
+                continue
+            worse = new < old if higher_is_better else new > old * 1.1
+            line = f"{section}.{key}: {old:.3f} -> {new:.3f}"
+            lines.append(self.style.WARNING(line + " (worse)") if worse else line)
+        if lines:
+            self.stdout.write(f"Compared with active version {current_version}:")
+            for line in lines:
+                self.stdout.write("  " + line)
@@ -0,0 +1,125 @@
+import threading
+import time
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+# Per-view SQL instrumentation (QUERY_INSTRUMENTATION = True). Every request
+# counts its queries and their time through connection.execute_wrapper and
+# adds them to the totals of the view it resolved to. Requests that exceed
+# the view's budget in recruitment.urls.QUERY_BUDGETS are printed at once;
+# the worst views by average query count are printed every
+# QUERY_REPORT_EVERY requests and are included in /health/details/ (staff only).
+
+
+class QueryRecorder:
+    """
+    execute_wrapper that counts queries and the time spent in them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - started
+            self.count += 1
+
+
+class QueryStats:
+    def __init__(self):
+        self.views = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def record(self, view, queries, sql_time, total_time):
+        with self._lock:
+            entry = self.views.setdefault(view, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'sql_time': 0.0, 'total_time': 0.0, 'over_budget': 0,
+            })
+            entry['requests'] += 1
+            entry['queries'] += queries
+            entry['max_queries'] = max(entry['max_queries'], queries)
+            entry['sql_time'] += sql_time
+            entry['total_time'] += total_time
+            self.requests += 1
+            return self.requests
+
+    def mark_over_budget(self, view):
+        with self._lock:
+            self.views[view]['over_budget'] += 1
+
+    def worst(self, limit=5):
+        """
+        Views with the highest average query count, with their averages.
+        """
+        with self._lock:
+            rows = [
+                {
+                    'view': view,
+                    'requests': entry['requests'],
+                    'avg_queries': entry['queries'] / entry['requests'],
+                    'max_queries': entry['max_queries'],
+                    'avg_sql_ms': 1000 * entry['sql_time'] / entry['requests'],
+                    'avg_total_ms': 1000 * entry['total_time'] / entry['requests'],
+                    'over_budget': entry['over_budget'],
+                }
+                for view, entry in self.views.items()
+            ]
+        rows.sort(key=lambda row: (row['avg_queries'], row['avg_total_ms']), reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        with self._lock:
+            self.views.clear()
+            self.requests = 0
+
+
+query_stats = QueryStats()
+
+
+def query_budget(view_name):
+    from recruitment.urls import QUERY_BUDGETS
+
+    return QUERY_BUDGETS.get(view_name)
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.report_every = getattr(settings, 'QUERY_REPORT_EVERY', 500)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        total_time = time.perf_counter() - started
+
+        match = request.resolver_match
+        if match is None:
+            return response  # 404s and the like
+        view = match.view_name
+        requests = query_stats.record(view, recorder.count, recorder.time, total_time)
+
+        budget = query_budget(view)
+        if budget is not None and recorder.count > budget:
+            query_stats.mark_over_budget(view)
+            print(
+                f"Query budget exceeded: {view} ran {recorder.count} queries (budget {budget}), "
+                f"{1000 * recorder.time:.1f}ms SQL, {1000 * total_time:.1f}ms total for {request.path}"
+            )
+        if self.report_every and requests % self.report_every == 0:
+            print("Worst views by queries per request:")
+            for row in query_stats.worst():
+                print(
+                    f"  {row['view']}: {row['avg_queries']:.1f} avg / {row['max_queries']} max queries, "
+                    f"{row['avg_sql_ms']:.1f}ms SQL, {row['avg_total_ms']:.1f}ms total over {row['requests']} requests"
+                )
+        return response
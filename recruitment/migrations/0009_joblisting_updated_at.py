@@ -0,0 +1,17 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recruitment', '0008_merge_20260107_0903'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='joblisting',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recruitment', '0009_joblisting_updated_at'),
+    ]
+
+    operations = [
+        # Existing applications were scored inline when they were submitted
+        migrations.AddField(
+            model_name='application',
+            name='score_status',
+            field=models.CharField(choices=[('Pending', 'Pending'), ('Scored', 'Scored'), ('Failed', 'Failed')], default='Scored', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='application',
+            name='score_status',
+            field=models.CharField(choices=[('Pending', 'Pending'), ('Scored', 'Scored'), ('Failed', 'Failed')], default='Pending', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ScoringTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('Queued', 'Queued'), ('Running', 'Running'), ('Failed', 'Failed')], default='Queued', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('available_at', models.DateTimeField(help_text='Not picked up before this time (retry backoff)')),
+                ('locked_until', models.DateTimeField(blank=True, help_text='Lease of the worker running this task', null=True)),
+                ('worker', models.CharField(blank=True, default='', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('application', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='scoring_task', to='recruitment.application')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'available_at'], name='recruitment_status_b9d77f_idx')],
+            },
+        ),
+    ]
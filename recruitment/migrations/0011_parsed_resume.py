@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recruitment', '0010_scoring_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='resume_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.CreateModel(
+            name='ParsedResume',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(help_text='sha256 of the resume file', max_length=64)),
+                ('parser_version', models.PositiveIntegerField()),
+                ('text', models.TextField(blank=True, default='')),
+                ('features', models.JSONField(default=dict, help_text='Education, job role, certifications, skills, experience years')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('content_hash', 'parser_version'), name='unique_parsed_resume')],
+            },
+        ),
+        migrations.AddField(
+            model_name='application',
+            name='parsed_resume',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='applications', to='recruitment.parsedresume'),
+        ),
+    ]
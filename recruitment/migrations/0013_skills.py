@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:14
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copies of recruitment.utils.keywords.SKILLS and
+# recruitment.utils.skills.normalize as of this migration, so later edits to
+# either do not change what it seeds.
+SKILLS = [
+    (['python'], 'Python'),
+    (['sql'], 'SQL'),
+    (['java'], 'Java'),
+    (['javascript', 'js'], 'JavaScript'),
+    (['typescript'], 'TypeScript'),
+    (['c++'], 'C++'),
+    (['c#'], 'C#'),
+    (['react', 'reactjs', 'react.js'], 'React'),
+    (['angular'], 'Angular'),
+    (['vue', 'vuejs', 'vue.js'], 'Vue'),
+    (['node', 'nodejs', 'node.js'], 'Node.js'),
+    (['html', 'html5'], 'HTML'),
+    (['css', 'css3'], 'CSS'),
+    (['django'], 'Django'),
+    (['flask'], 'Flask'),
+    (['spring boot'], 'Spring Boot'),
+    (['machine learning'], 'Machine Learning'),
+    (['deep learning'], 'Deep Learning'),
+    (['nlp', 'natural language processing'], 'NLP'),
+    (['tensorflow'], 'TensorFlow'),
+    (['pytorch'], 'Pytorch'),
+    (['scikit-learn', 'sklearn'], 'scikit-learn'),
+    (['pandas'], 'Pandas'),
+    (['numpy'], 'NumPy'),
+    (['ethical hacking'], 'Ethical Hacking'),
+    (['cybersecurity', 'cyber security'], 'Cybersecurity'),
+    (['networking'], 'Networking'),
+    (['linux'], 'Linux'),
+    (['docker'], 'Docker'),
+    (['kubernetes', 'k8s'], 'Kubernetes'),
+    (['aws', 'amazon web services'], 'AWS'),
+    (['azure'], 'Azure'),
+    (['git'], 'Git'),
+]
+
+
+def normalize(name):
+    return re.sub(r'\s+', ' ', name or '').strip().lower()
+
+
+def seed_skills(apps, schema_editor):
+    # Canonical skills and aliases from the keyword vocabulary, so job skills
+    # saved before the first backfill_skills run already resolve aliases.
+    Skill = apps.get_model('recruitment', 'Skill')
+    SkillAlias = apps.get_model('recruitment', 'SkillAlias')
+    for spellings, label in SKILLS:
+        skill, _ = Skill.objects.get_or_create(name=label)
+        for alias in {normalize(label), *map(normalize, spellings)}:
+            SkillAlias.objects.get_or_create(alias=alias, defaults={'skill': skill})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recruitment', '0012_stored_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='joblisting',
+            name='skills',
+            field=models.ManyToManyField(blank=True, related_name='jobs', to='recruitment.skill'),
+        ),
+        migrations.AddField(
+            model_name='parsedresume',
+            name='skills',
+            field=models.ManyToManyField(blank=True, related_name='resumes', to='recruitment.skill'),
+        ),
+        migrations.CreateModel(
+            name='SkillAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(help_text="Normalised spelling, e.g. 'sklearn'", max_length=100, unique=True)),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='recruitment.skill')),
+            ],
+            options={
+                'verbose_name_plural': 'skill aliases',
+            },
+        ),
+        migrations.RunPython(seed_skills, migrations.RunPython.noop),
+    ]
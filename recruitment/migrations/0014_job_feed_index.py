@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recruitment', '0013_skills'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='joblisting',
+            index=models.Index(fields=['-created_at', '-id'], name='job_feed_idx'),
+        ),
+    ]
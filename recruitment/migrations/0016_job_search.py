@@ -0,0 +1,49 @@
+from django.db import migrations
+
+# FTS5 index over job title, description, required skills and company name
+# (see recruitment/utils/job_search.py). SQLite only; on other databases
+# search falls back to icontains and this migration does nothing.
+#
+# recruitment.signals keeps the index in step with later writes. Triggers
+# are not used: SQLite migrations alter a table by rebuilding it, which
+# drops them (and the company one breaks the rebuild's foreign key check).
+
+CREATE = [
+    """
+    CREATE VIRTUAL TABLE recruitment_job_search USING fts5(
+        title, description, skills, company,
+        tokenize = 'porter unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    INSERT INTO recruitment_job_search (rowid, title, description, skills, company)
+    SELECT job.id, job.title, job.description, job.required_skills, company.name
+    FROM recruitment_joblisting job
+    JOIN recruitment_company company ON company.id = job.company_id
+    """,
+]
+
+DROP = [
+    'DROP TABLE IF EXISTS recruitment_job_search',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recruitment', '0015_application_review_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE), _run(DROP)),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recruitment', '0016_job_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='decided_at',
+            field=models.DateTimeField(blank=True, help_text='When the application was accepted or rejected', null=True),
+        ),
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('jobs_posted', models.IntegerField(default=0)),
+                ('applications', models.IntegerField(default=0)),
+                ('accepted', models.IntegerField(default=0)),
+                ('rejected', models.IntegerField(default=0)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='recruitment.company')),
+            ],
+            options={
+                'verbose_name_plural': 'daily stats',
+                'indexes': [models.Index(fields=['day'], name='daily_stats_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('company', 'day'), name='daily_stats_company_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScoreBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_buckets', to='recruitment.company')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('company', 'bucket'), name='score_bucket_company_bucket')],
+            },
+        ),
+    ]
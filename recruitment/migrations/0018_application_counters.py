@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:42
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def count_applications(apps, schema_editor):
+    # Start the counters from the current tables; signals keep them from here
+    JobListing = apps.get_model('recruitment', 'JobListing')
+    Company = apps.get_model('recruitment', 'Company')
+    Application = apps.get_model('recruitment', 'Application')
+
+    def per_job(**filters):
+        counts = (
+            Application.objects.filter(job=OuterRef('pk'), **filters)
+            .values('job').annotate(n=Count('id')).values('n')
+        )
+        return Coalesce(Subquery(counts), 0)
+
+    def per_company(field):
+        sums = (
+            JobListing.objects.filter(company=OuterRef('pk'))
+            .values('company').annotate(n=Sum(field)).values('n')
+        )
+        return Coalesce(Subquery(sums), 0)
+
+    JobListing.objects.update(application_count=per_job(), pending_count=per_job(status='Pending'))
+    jobs = JobListing.objects.filter(company=OuterRef('pk')).values('company').annotate(n=Count('id')).values('n')
+    Company.objects.update(
+        job_count=Coalesce(Subquery(jobs), 0),
+        application_count=per_company('application_count'),
+        pending_count=per_company('pending_count'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recruitment', '0017_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='application_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='job_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='pending_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='joblisting',
+            name='application_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='joblisting',
+            name='pending_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_applications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recruitment', '0019_deleted_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedfile',
+            name='touched_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Last stored, referenced or released'),
+        ),
+        migrations.AddIndex(
+            model_name='storedfile',
+            index=models.Index(fields=['ref_count', 'touched_at'], name='stored_file_sweep_idx'),
+        ),
+    ]
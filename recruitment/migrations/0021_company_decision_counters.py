@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:42
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def count_decisions(apps, schema_editor):
+    # Start the totals from the daily rollups; signals keep them from here
+    Company = apps.get_model('recruitment', 'Company')
+    DailyStats = apps.get_model('recruitment', 'DailyStats')
+    Application = apps.get_model('recruitment', 'Application')
+
+    def daily_total(field):
+        sums = (
+            DailyStats.objects.filter(company=OuterRef('pk'))
+            .values('company').annotate(n=Sum(field)).values('n')
+        )
+        return Coalesce(Subquery(sums), 0)
+
+    accepted = (
+        Application.objects.filter(job__company=OuterRef('pk'), status='Accepted')
+        .values('job__company').annotate(n=Count('id')).values('n')
+    )
+    Company.objects.update(
+        received_count=daily_total('applications'),
+        rejected_count=daily_total('rejected'),
+        accepted_count=Coalesce(Subquery(accepted), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recruitment', '0020_stored_file_sweep'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='accepted_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='received_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='rejected_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_decisions, migrations.RunPython.noop),
+    ]
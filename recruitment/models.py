@@ -1,7 +1,27 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+from .utils.resume_storage import resume_storage
 
-class Company(models.Model):
+class CountedModel(models.Model):
+    # Counter columns only change through F() updates (utils/rollups.py).
+    # A plain save() of an edited row would write back the counts read
+    # with it, so it leaves them out unless they are named in update_fields.
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and not kwargs.get('force_insert') and not self._state.adding:
+            skipped = set(self.counter_fields) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+class Company(CountedModel):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='company')
     name = models.CharField(max_length=255)
     description = models.TextField()
@@ -9,16 +29,46 @@ class Company(models.Model):
     location = models.CharField(max_length=255)
     # Using FileField to avoid Pillow dependency initially, can switch to ImageField later
     logo = models.FileField(upload_to='company_logos/', blank=True, null=True)
+    # Counters maintained by recruitment.signals (see utils/rollups.py);
+    # `python manage.py reconcile_counters` corrects any drift
+    job_count = models.IntegerField(default=0)
+    application_count = models.IntegerField(default=0)
+    pending_count = models.IntegerField(default=0)
+    # All-time totals of the DailyStats columns, for the analytics page
+    received_count = models.IntegerField(default=0)
+    accepted_count = models.IntegerField(default=0)
+    rejected_count = models.IntegerField(default=0)
+    counter_fields = ('job_count', 'application_count', 'pending_count', 'received_count', 'accepted_count', 'rejected_count')
 
     def __str__(self):
         return self.name
 
-class JobListing(models.Model):
+class Skill(models.Model):
+    # Canonical skill; every spelling that means it is a SkillAlias.
+    # See recruitment/utils/skills.py.
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+class SkillAlias(models.Model):
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='aliases')
+    alias = models.CharField(max_length=100, unique=True, help_text="Normalised spelling, e.g. 'sklearn'")
+
+    class Meta:
+        verbose_name_plural = 'skill aliases'
+
+    def __str__(self):
+        return f"{self.alias} -> {self.skill}"
+
+class JobListing(CountedModel):
     # Job Listing Model updated
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='jobs')
     title = models.CharField(max_length=255)
     description = models.TextField()
     required_skills = models.TextField(help_text="Comma-separated skills")
+    # Derived from required_skills on save (recruitment.signals)
+    skills = models.ManyToManyField(Skill, related_name='jobs', blank=True)
     salary = models.CharField(max_length=100, blank=True)
     
     JOB_TYPE_CHOICES = [
@@ -37,6 +87,17 @@ class JobListing(models.Model):
     application_start_date = models.DateField(null=True, blank=True, help_text="Date when applications start opening")
     deadline = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Maintained like the Company counters
+    application_count = models.IntegerField(default=0)
+    pending_count = models.IntegerField(default=0)
+    counter_fields = ('application_count', 'pending_count')
+
+    class Meta:
+        indexes = [
+            # Applicant job feed: newest first, keyset-paginated
+            models.Index(fields=['-created_at', '-id'], name='job_feed_idx'),
+        ]
 
     def formatted_created_at(self):
         return self.created_at.strftime('%Y-%m-%d')
@@ -44,6 +105,56 @@ class JobListing(models.Model):
     def __str__(self):
         return self.title
 
+class DeletedJob(models.Model):
+    # Tombstone for a deleted JobListing, so the job index of every worker
+    # (recruitment/utils/job_index.py) drops it on its next refresh. Kept
+    # for job_index.TOMBSTONE_RETENTION.
+    job_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Job {self.job_id} deleted {self.deleted_at}"
+
+class ParsedResume(models.Model):
+    # Text and keyword features extracted from one resume file, shared by
+    # every application that uploaded identical bytes. A new PARSER_VERSION
+    # (recruitment/utils/resume_store.py) makes old rows stale; they are
+    # rebuilt lazily the next time the resume is needed.
+    content_hash = models.CharField(max_length=64, help_text="sha256 of the resume file")
+    parser_version = models.PositiveIntegerField()
+    text = models.TextField(blank=True, default="")
+    features = models.JSONField(default=dict, help_text="Education, job role, certifications, skills, experience years")
+    skills = models.ManyToManyField(Skill, related_name='resumes', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['content_hash', 'parser_version'], name='unique_parsed_resume'),
+        ]
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} (parser v{self.parser_version})"
+
+class StoredFile(models.Model):
+    # One row per file in the content-addressed resume storage, counting
+    # the applications that reference it. Maintained by recruitment.signals;
+    # rebuilt by `python manage.py dedupe_resumes`. Files without references
+    # are deleted by `python manage.py sweep_resumes`.
+    name = models.CharField(max_length=255, unique=True, help_text="Storage path, e.g. resumes/ab/<sha256>.pdf")
+    content_hash = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    touched_at = models.DateTimeField(default=timezone.now, help_text="Last stored, referenced or released")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ref_count', 'touched_at'], name='stored_file_sweep_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
+
 class Application(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='applications')
     job = models.ForeignKey(JobListing, on_delete=models.CASCADE, related_name='applications')
@@ -56,7 +167,9 @@ class Application(models.Model):
     available_interview_date = models.DateTimeField(null=True, blank=True)
     cover_letter = models.TextField(blank=True, default="")
     
-    resume = models.FileField(upload_to='resumes/')
+    resume = models.FileField(upload_to='resumes/', storage=resume_storage)
+    resume_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    parsed_resume = models.ForeignKey(ParsedResume, on_delete=models.SET_NULL, null=True, blank=True, related_name='applications')
     ranking_score = models.FloatField(default=0.0)
     STATUS_CHOICES = [
         ('Pending', 'Pending'),
@@ -64,7 +177,87 @@ class Application(models.Model):
         ('Rejected', 'Rejected'),
     ]
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    SCORE_STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Scored', 'Scored'),
+        ('Failed', 'Failed'),
+    ]
+    score_status = models.CharField(max_length=20, choices=SCORE_STATUS_CHOICES, default='Pending')
     applied_at = models.DateTimeField(auto_now_add=True)
+    decided_at = models.DateTimeField(null=True, blank=True, help_text="When the application was accepted or rejected")
+
+    class Meta:
+        indexes = [
+            # Reviewing a job's applicants: best score first, and per status
+            models.Index(fields=['job', 'ranking_score'], name='application_job_score_idx'),
+            models.Index(fields=['job', 'status'], name='application_job_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.full_name} - {self.job.title}"
+
+class ScoringTask(models.Model):
+    # Database-backed queue entry: one per application waiting to be scored.
+    # Drained by `python manage.py process_scoring_queue`.
+    application = models.OneToOneField(Application, on_delete=models.CASCADE, related_name='scoring_task')
+    STATUS_CHOICES = [
+        ('Queued', 'Queued'),
+        ('Running', 'Running'),
+        ('Failed', 'Failed'),
+    ]
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Queued')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    available_at = models.DateTimeField(help_text="Not picked up before this time (retry backoff)")
+    locked_until = models.DateTimeField(null=True, blank=True, help_text="Lease of the worker running this task")
+    worker = models.CharField(max_length=64, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"Scoring task for application {self.application_id} ({self.status})"
+
+class DailyStats(models.Model):
+    # Analytics rollup per company and day, kept up to date by
+    # recruitment.signals and rebuilt by `python manage.py rebuild_analytics`.
+    # Jobs count the rows that exist, by the day they were posted.
+    # `applications` counts those received each day and `rejected` the
+    # rejections made each day; rejected applications are deleted, so
+    # neither goes down again.
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    jobs_posted = models.IntegerField(default=0)
+    applications = models.IntegerField(default=0)
+    accepted = models.IntegerField(default=0)
+    rejected = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'daily stats'
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'day'], name='daily_stats_company_day'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='daily_stats_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.company_id} on {self.day}"
+
+class ScoreBucket(models.Model):
+    # Scored applications per company in tenths of the ranking score
+    # (bucket 0 is 0-10%, 9 is 90-100%); maintained like DailyStats.
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='score_buckets')
+    bucket = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'bucket'], name='score_bucket_company_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.company_id}: {self.bucket * 10}-{self.bucket * 10 + 10}%"
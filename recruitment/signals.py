@@ -0,0 +1,124 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from .models import Company, JobListing, Application
+from .utils.job_index import loaded_job_index, record_deletion
+from .utils import resume_storage, skills, rollups, job_search
+
+
+@receiver(post_save, sender=JobListing)
+def index_job(sender, instance, **kwargs):
+    # Only maintain an index this process has already built; others are
+    # built from the database on first use.
+    index = loaded_job_index()
+    if index is not None:
+        transaction.on_commit(lambda: index.upsert(instance))
+
+
+@receiver(post_init, sender=JobListing)
+def remember_required_skills(sender, instance, **kwargs):
+    instance._synced_skills = instance.__dict__.get('required_skills')
+
+
+@receiver(post_save, sender=JobListing)
+def sync_skills(sender, instance, created, raw=False, **kwargs):
+    # Keep JobListing.skills in step with the required_skills text
+    if raw or 'required_skills' not in instance.__dict__:
+        return
+    if created or instance.required_skills != instance._synced_skills:
+        skills.sync_job_skills(instance)
+        instance._synced_skills = instance.required_skills
+
+
+@receiver(post_delete, sender=JobListing)
+def unindex_job(sender, instance, **kwargs):
+    # Other workers drop it on their next refresh
+    record_deletion(instance.pk)
+    index = loaded_job_index()
+    if index is not None:
+        job_id = instance.pk
+        transaction.on_commit(lambda: index.remove(job_id))
+
+
+@receiver(post_save, sender=JobListing)
+def index_job_for_search(sender, instance, raw=False, **kwargs):
+    if not raw:
+        job_search.index_job(instance)
+
+
+@receiver(post_delete, sender=JobListing)
+def unindex_job_for_search(sender, instance, **kwargs):
+    job_search.unindex_job(instance.pk)
+
+
+@receiver(post_init, sender=Company)
+def remember_company_name(sender, instance, **kwargs):
+    instance._indexed_name = instance.__dict__.get('name')
+
+
+@receiver(post_save, sender=Company)
+def rename_company_for_search(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created and instance.name != instance._indexed_name:
+        job_search.rename_company(instance)
+    instance._indexed_name = instance.name
+
+
+@receiver(post_init, sender=JobListing)
+def remember_job_rollup(sender, instance, **kwargs):
+    instance._rollup_values = rollups.snapshot(instance, rollups.JOB_FIELDS)
+
+
+@receiver(post_save, sender=JobListing)
+def count_job(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        rollups.job_saved(instance, created)
+
+
+@receiver(post_delete, sender=JobListing)
+def uncount_job(sender, instance, **kwargs):
+    rollups.job_deleted(instance)
+
+
+@receiver(post_init, sender=Application)
+def remember_application_rollup(sender, instance, **kwargs):
+    instance._rollup_values = rollups.snapshot(instance, rollups.APPLICATION_FIELDS)
+
+
+@receiver(post_save, sender=Application)
+def count_application(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        rollups.applications_saved([instance], created)
+
+
+@receiver(post_delete, sender=Application)
+def uncount_application(sender, instance, **kwargs):
+    rollups.applications_deleted([instance])
+
+
+def _resume_name(value):
+    return getattr(value, 'name', value) or ''
+
+
+@receiver(post_init, sender=Application)
+def remember_resume(sender, instance, **kwargs):
+    # Read the raw value so deferred resumes are not loaded just for this
+    instance._stored_resume = _resume_name(instance.__dict__.get('resume'))
+
+
+@receiver(post_save, sender=Application)
+def count_resume_reference(sender, instance, created, **kwargs):
+    name = _resume_name(instance.__dict__.get('resume'))
+    if created:
+        resume_storage.retain(name)
+    elif 'resume' in instance.__dict__ and name != instance._stored_resume:
+        # The resume was replaced
+        resume_storage.retain(name)
+        resume_storage.release(instance._stored_resume)
+    instance._stored_resume = name
+
+
+@receiver(post_delete, sender=Application)
+def release_resume(sender, instance, **kwargs):
+    # Other applications may share the file; it is only deleted with the
+    # last reference
+    resume_storage.release(_resume_name(instance.__dict__.get('resume')))
@@ -1,3 +1,1290 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from . import urls as recruitment_urls
+from .middleware import query_stats
+from .models import Company, JobListing, Application, DailyStats, ScoreBucket, DeletedJob, ParsedResume, ScoringTask, SkillAlias, StoredFile
+from .utils import forest, job_search, model_store, resume_storage, resume_store, rollups, scoring_queue, skills
+from .utils.job_index import JobIndex, TOMBSTONE_RETENTION
+from .utils.keywords import matcher as keyword_matcher
+from .utils.pagination import encode_cursor
+from .utils.ranker import Ranker
 
-# Create your tests here.
+COMPANIES = 3
+JOBS_PER_COMPANY = 12
+APPLICANTS = 15
+
+
+def seed_portal():
+    """
+    A small but realistic portal: several companies with a dozen jobs each
+    and applicants who applied to many of them. Large enough that one query
+    per row in any list blows a view's budget.
+    """
+    User = get_user_model()
+    # Hashed once: the default hasher is deliberately slow, and no test
+    # logs in with a password
+    password = make_password('pw')
+    today = timezone.now().date()
+    hr_users, jobs = [], []
+    for c in range(COMPANIES):
+        hr = User.objects.create(username=f'hr{c}', password=password, email=f'hr{c}@example.com', is_hr=True)
+        company = Company.objects.create(user=hr, name=f'Company {c}', description='We hire.', location='Remote')
+        hr_users.append(hr)
+        for j in range(JOBS_PER_COMPANY):
+            jobs.append(JobListing.objects.create(
+                company=company,
+                title=f'Engineer {c}-{j}',
+                description='Build and run services.',
+                required_skills='python, django, sql, docker',
+                job_type='Part Time' if j % 3 == 0 else 'Full Time',
+                work_mode='Remote' if j % 2 else 'On Site',
+                deadline=today + timedelta(days=30),
+            ))
+
+    applicants = []
+    for a in range(APPLICANTS):
+        applicant = User.objects.create(username=f'applicant{a}', password=password, email=f'a{a}@example.com', is_applicant=True)
+        applicants.append(applicant)
+        for job in jobs[a % 5::4]:
+            Application.objects.create(
+                user=applicant,
+                job=job,
+                full_name=f'Applicant {a}' if a % 4 else '',
+                email=applicant.email,
+                resume=f'resumes/{a:02x}/{a:064x}.pdf',
+                ranking_score=(a * 7 % 100) / 100 if a % 5 else 0.0,
+                score_status='Scored' if a % 5 else 'Pending',
+            )
+    return hr_users, applicants, jobs
+
+
+class PortalTestCase(TestCase):
+    """Tests that run against seed_portal() data."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hr_users, cls.applicants, cls.jobs = seed_portal()
+
+
+class JobIndexRefreshTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        hr = get_user_model().objects.create(username='indexhr', is_hr=True)
+        cls.company = Company.objects.create(user=hr, name='Index Co', description='', location='Remote')
+
+    def post(self, title):
+        return JobListing.objects.create(
+            company=self.company, title=title, description='', required_skills='go',
+            deadline=timezone.now().date() + timedelta(days=7),
+        )
+
+    def test_refresh_applies_other_workers_changes_without_rebuilding(self):
+        kept, deleted = self.post('Kept'), self.post('Deleted')
+        stale = DeletedJob.objects.create(job_id=0)
+        DeletedJob.objects.filter(pk=stale.pk).update(deleted_at=timezone.now() - 2 * TOMBSTONE_RETENTION)
+        index = JobIndex().build()
+        added = self.post('Added')
+        deleted.delete()
+        self.assertFalse(DeletedJob.objects.filter(pk=stale.pk).exists())
+
+        index._checked_at = 0.0
+        with mock.patch.object(JobIndex, 'build', side_effect=AssertionError('rebuilt')):
+            with CaptureQueriesContext(connection) as queries:
+                index.refresh()
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(set(index._state.row_of), {kept.pk, added.pk})
+
+    def test_idle_index_rebuilds_off_the_request(self):
+        index = JobIndex().build()
+        index._checked_at = 0.0
+        index._synced_at -= 2 * TOMBSTONE_RETENTION
+        with mock.patch.object(JobIndex, '_rebuild_in_background') as rebuild:
+            with CaptureQueriesContext(connection) as queries:
+                index.refresh()
+        rebuild.assert_called_once()
+        self.assertEqual(len(queries), 0)
+
+
+class SmartMatchingTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        hr = get_user_model().objects.create(username='matchhr', is_hr=True)
+        company = Company.objects.create(user=hr, name='Match Co', description='', location='Remote')
+        job = JobListing.objects.create(
+            company=company, title='Rust engineer', description='Systems work', required_skills='rust',
+            deadline=timezone.now().date() + timedelta(days=7),
+        )
+        self.applicant = get_user_model().objects.create(username='matcher', is_applicant=True)
+        self.path = os.path.join(media.name, 'resumes', 'cv.txt')
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as f:
+            f.write('rust systems engineer')
+        Application.objects.create(user=self.applicant, job=job, resume='resumes/cv.txt')
+        JobListing.objects.create(
+            company=company, title='Rust developer', description='Systems work', required_skills='rust',
+            deadline=timezone.now().date() + timedelta(days=7),
+        )
+
+    def test_unparsed_resumes_are_queued_not_parsed_in_the_request(self):
+        client = Client()
+        client.force_login(self.applicant)
+        with mock.patch.object(resume_store, 'extract', side_effect=AssertionError('parsed in the request')), \
+                mock.patch.object(resume_store, 'parse_later') as parse_later:
+            response = client.get(reverse('smart_matching'))
+        parse_later.assert_called_once_with([self.path])
+        self.assertTrue(response.context['reading_resumes'])
+
+        ParsedResume.objects.create(
+            content_hash=resume_store.file_hash(self.path), parser_version=resume_store.PARSER_VERSION,
+            text='rust systems engineer',
+        )
+        response = client.get(reverse('smart_matching'))
+        self.assertFalse(response.context['reading_resumes'])
+        self.assertEqual([job.title for job in response.context['recommended_jobs']], ['Rust developer'])
+
+
+class FlatForestTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import numpy as np
+        from sklearn.ensemble import RandomForestClassifier
+
+        rng = np.random.default_rng(0)
+        X = rng.random((600, 40))
+        X[X < 0.7] = 0.0  # mostly zeros, like TF-IDF columns
+        y = (X[:, 0] + X[:, 3] - X[:, 7] > 0.2).astype(int) + (X[:, 11] > 0.5)
+        cls.model = RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0).fit(X, y)
+        cls.X = rng.random((forest.BATCH_BY_TREE_THRESHOLD + 200, 40))
+        cls.X[cls.X < 0.7] = 0.0
+
+    def assertSameProba(self, flat, X):
+        import numpy as np
+
+        self.assertTrue(np.array_equal(flat.predict_proba(X), self.model.predict_proba(X)))
+
+    def test_matches_sklearn_bit_for_bit(self):
+        import scipy.sparse as sp
+
+        flat = forest.FlatForest.from_sklearn(self.model)
+        self.assertEqual(list(flat.classes_), list(self.model.classes_))
+        for rows in (1, 50, len(self.X)):  # all trees at once, then tree by tree
+            with self.subTest(rows=rows):
+                self.assertSameProba(flat, self.X[:rows])
+                self.assertSameProba(flat, sp.csr_matrix(self.X[:rows]))
+
+    def test_memory_mapped_copy_matches(self):
+        import scipy.sparse as sp
+
+        with tempfile.TemporaryDirectory() as directory:
+            forest.FlatForest.from_sklearn(self.model).save(directory)
+            flat = forest.FlatForest.load(directory, self.model.classes_, self.model.n_features_in_)
+            self.assertSameProba(flat, self.X[:100])
+            self.assertSameProba(flat, sp.csr_matrix(self.X[:100]))
+            del flat  # release the memory maps before the directory goes
+
+
+class TrainedModelTestCase(SimpleTestCase):
+    """
+    Tests with their own BASE_DIR, holding a copy of the training data and
+    two small models trained from it by train_resume_model (not published):
+    `dense_dir` (--dense) and `sparse_dir`.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import shutil
+        from django.conf import settings
+        from django.core.management import call_command
+
+        cls.base_dir = cls.enterClassContext(tempfile.TemporaryDirectory())
+        data_dir = os.path.join(cls.base_dir, 'recruitment', 'data')
+        os.makedirs(data_dir)
+        shutil.copy(os.path.join(settings.BASE_DIR, 'recruitment', 'data', 'AI_Resume_Screening.csv'), data_dir)
+        cls.enterClassContext(override_settings(BASE_DIR=cls.base_dir))
+
+        root = model_store.get_models_root()
+        trained = {}
+        for dense in (True, False):
+            before = set(os.listdir(root)) if os.path.isdir(root) else set()
+            with open(os.devnull, 'w') as devnull:
+                call_command(
+                    'train_resume_model', dense=dense, n_estimators=5, n_jobs=1, test_size=0, no_publish=True,
+                    stdout=devnull,
+                )
+            (version,) = set(os.listdir(root)) - before
+            trained[dense] = os.path.join(root, version)
+        cls.dense_dir, cls.sparse_dir = trained[True], trained[False]
+
+    def resume_texts(self, n=40):
+        import pandas as pd
+
+        rows = pd.read_csv(os.path.join(self.base_dir, 'recruitment', 'data', 'AI_Resume_Screening.csv')).head(n)
+        return [f"{row['Skills']} {row['Education']} {row['Job Role']}" for _, row in rows.iterrows()] + [
+            'kotlin and rust, 7 years, nothing the vocabulary knows',
+            '',
+        ]
+
+
+class RankerSparsePathTests(TrainedModelTestCase):
+
+    def test_sparse_plan_scores_like_the_dense_path(self):
+        import numpy as np
+        import scipy.sparse as sp
+
+        texts = self.resume_texts()
+        for model_dir in (self.dense_dir, self.sparse_dir):
+            for evaluator in ('sklearn', 'flat'):
+                with self.subTest(model=os.path.basename(model_dir), evaluator=evaluator):
+                    sparse = Ranker(model_dir=model_dir, sparse=True, evaluator=evaluator, artifact_format='pickle')
+                    dense = Ranker(model_dir=model_dir, sparse=False, evaluator=evaluator, artifact_format='pickle')
+                    self.assertIsNotNone(sparse._sparse_plan)
+                    self.assertTrue(sp.issparse(sparse.encode(texts)))
+                    if model_dir == self.dense_dir:
+                        self.assertFalse(sp.issparse(dense.encode(texts)))
+                    self.assertTrue(np.array_equal(sparse.predict_scores(texts), dense.predict_scores(texts)))
+
+
+class KeywordMatcherTests(SimpleTestCase):
+
+    def skills(self, text, matcher=keyword_matcher):
+        return matcher.match(text)['skills']
+
+    def test_keywords_only_match_whole_words(self):
+        self.assertEqual(self.skills('JavaScript and TypeScript'), ['JavaScript', 'TypeScript'])
+        self.assertEqual(keyword_matcher.match('Senior JavaScript engineer')['job_role'], 'Developer')
+        self.assertEqual(self.skills('Java, Spring Boot'), ['Java', 'Spring Boot'])
+        self.assertEqual(self.skills('pythonic code, reactive streams, gitlab'), [])
+        self.assertEqual(keyword_matcher.match('Research at Abcam')['education'], 'Unknown')
+
+    def test_single_letter_skills_stay_inside_word_boundaries(self):
+        from .utils import keywords
+
+        with mock.patch.object(keywords, 'SKILLS', keywords.SKILLS + [(['r'], 'R')]):
+            matcher = keywords.KeywordMatcher()
+        self.assertEqual(self.skills('Statistics in R and Python', matcher), ['Python', 'R'])
+        self.assertEqual(self.skills('Reporting for a rare RNA project', matcher), [])
+
+    def test_punctuated_and_multi_word_skills(self):
+        self.assertEqual(self.skills('C++ and C#, Node.js.'), ['C#', 'C++', 'Node.js'])
+        self.assertEqual(self.skills('nodejs; react.js; vue'), ['Node.js', 'React', 'Vue'])
+        self.assertEqual(self.skills('machine learning and natural language processing'), ['Machine Learning', 'NLP'])
+        self.assertEqual(self.skills('scikit-learn/sklearn on k8s'), ['Kubernetes', 'scikit-learn'])
+
+    def test_batch_matches_one_by_one(self):
+        texts = ['Java dev, 5 years', 'JavaScript, 3+ yrs', '', 'C++ / node.js, B.Tech', 'javajava']
+        self.assertEqual(keyword_matcher.match_batch(texts), [keyword_matcher.match(text) for text in texts])
+
+
+class LRUCacheTests(SimpleTestCase):
+
+    def test_evicts_least_recently_used_and_counts(self):
+        from .utils.score_cache import LRUCache
+
+        cache = LRUCache(max_bytes=30, sizeof=len)
+        for key in 'abc':
+            cache.put(key, key * 10)
+        self.assertEqual(cache.get('a'), 'a' * 10)  # now the most recently used
+        self.assertIsNone(cache.get('z'))
+        cache.put('d', 'd' * 10)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual([cache.get(key) for key in 'acd'], ['a' * 10, 'c' * 10, 'd' * 10])
+        self.assertEqual(cache.stats(), {
+            'entries': 3, 'bytes': 30, 'max_bytes': 30,
+            'hits': 4, 'misses': 2, 'evictions': 1, 'hit_rate': 4 / 6,
+        })
+
+    def test_sizes_replacements_and_oversized_values(self):
+        from .utils.score_cache import LRUCache
+
+        cache = LRUCache(max_bytes=30, sizeof=len)
+        cache.put('a', 'a' * 10)
+        cache.put('a', 'a' * 20)  # replaces, and its old size is given back
+        cache.put('b', 'b' * 10)
+        self.assertEqual((cache.stats()['bytes'], cache.stats()['evictions']), (30, 0))
+        cache.put('huge', 'x' * 31)  # never cached, and evicts nothing
+        self.assertIsNone(cache.get('huge'))
+        self.assertEqual(cache.get('a'), 'a' * 20)
+        cache.put('c', 'c' * 15)  # b goes first, then a
+        self.assertEqual(cache.stats()['entries'], 1)
+        self.assertEqual(cache.stats()['evictions'], 2)
+
+
+class SharedRankerReloadTests(TrainedModelTestCase):
+
+    def setUp(self):
+        # A fresh process-wide Ranker for this test only
+        self.enterContext(mock.patch('recruitment.utils.ranker._shared_ranker', None))
+        self.enterContext(mock.patch('recruitment.utils.ranker._shared_key', None))
+
+    def test_follows_the_current_pointer(self):
+        from .utils.ranker import get_ranker
+
+        model_store.publish_version(self.dense_dir)
+        first = get_ranker()
+        self.assertEqual((first.model_dir, first.initialized), (self.dense_dir, True))
+        self.assertIs(get_ranker(), first)
+
+        # Publishing makes a process that already loaded a model switch
+        model_store.publish_version(self.sparse_dir)
+        second = get_ranker()
+        self.assertEqual((second.model_dir, second.version), (self.sparse_dir, os.path.basename(self.sparse_dir)))
+        self.assertTrue(second.initialized)
+
+        # A version that fails to load leaves the last good one in place
+        broken = model_store.create_version_dir()
+        with open(os.path.join(broken, 'rf_model.pkl'), 'wb') as f:
+            f.write(b'not a pickle')
+        model_store.publish_version(broken)
+        self.assertIs(get_ranker(), second)
+        with mock.patch('recruitment.utils.ranker.Ranker') as build:
+            self.assertIs(get_ranker(), second)
+        build.assert_not_called()  # nor retried on every request
+
+
+class BatchScoringTests(TrainedModelTestCase, TestCase):
+
+    def setUp(self):
+        import docx
+        from .utils.parser_pool import InlineParser
+
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        os.makedirs(os.path.join(media.name, 'resumes'))
+        self.enterContext(mock.patch.object(resume_store, 'get_parser_pool', return_value=InlineParser()))
+        ranker = Ranker(model_dir=self.dense_dir, artifact_format='pickle')
+        self.enterContext(mock.patch.object(scoring_queue, 'get_ranker', return_value=ranker))
+        # A job index of its own, so this test's jobs do not outlive it
+        self.enterContext(mock.patch('recruitment.utils.job_index._shared_index', None))
+
+        job = make_job('Batch', required_skills='python, sql, machine learning')
+        applicant = get_user_model().objects.create(username='batched', is_applicant=True)
+        self.applications = []
+        for i, text in enumerate(self.resume_texts(6)[:6]):
+            document = docx.Document()
+            document.add_paragraph(text)
+            document.save(os.path.join(media.name, 'resumes', f'cv{i}.docx'))
+            self.applications.append(
+                Application.objects.create(user=applicant, job=job, resume=f'resumes/cv{i}.docx')
+            )
+        self.unreadable = Application.objects.create(user=applicant, job=job, resume='resumes/missing.pdf')
+        self.applications.insert(3, self.unreadable)
+
+    def test_batch_scores_match_one_by_one(self):
+        errors = scoring_queue.score_applications(self.applications)
+        self.assertEqual(errors, {self.unreadable.id: "Resume file could not be read or parsed"})
+
+        readable = [application for application in self.applications if application != self.unreadable]
+        scored = Application.objects.filter(id__in=[application.id for application in readable])
+        self.assertEqual({application.score_status for application in scored}, {'Scored'})
+        batch = {application.id: application.ranking_score for application in scored}
+        self.assertGreater(len(set(batch.values())), 1)  # the resumes really score differently
+
+        for application in readable:
+            with self.subTest(resume=application.resume.name):
+                application = Application.objects.get(pk=application.pk)
+                self.assertEqual(scoring_queue.score_applications([application]), {})
+                application.refresh_from_db()
+                self.assertEqual(application.ranking_score, batch[application.id])
+
+        self.unreadable.refresh_from_db()
+        self.assertEqual((self.unreadable.score_status, self.unreadable.ranking_score), ('Pending', 0.0))
+
+
+class ResumeTextTests(TestCase):
+
+    def test_upload_and_saved_file_give_the_same_text(self):
+        import docx
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .utils.resume_parser import parse_resume, parse_uploaded_resume
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cv.docx')
+            document = docx.Document()
+            document.add_paragraph('Senior Python Developer')
+            document.save(path)
+            with open(path, 'rb') as f:
+                upload = SimpleUploadedFile('cv.docx', f.read())
+            text = parse_resume(path)
+        self.assertIn('Senior Python Developer', text)
+        self.assertEqual(parse_uploaded_resume(upload), text)
+
+
+class ParseFailureTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        os.makedirs(os.path.join(media.name, 'resumes'))
+        with open(os.path.join(media.name, 'resumes', 'cv.txt'), 'w') as f:
+            f.write('python developer')
+
+    def test_timeouts_are_not_stored(self):
+        from .utils.parser_pool import InlineParser, ParserPool
+
+        job = make_job('Timeout')
+        applicant = get_user_model().objects.create(username='slow', is_applicant=True)
+        application = Application.objects.create(user=applicant, job=job, resume='resumes/cv.txt')
+
+        # Far less time than a worker needs to start and answer
+        pool = ParserPool(workers=1, timeout=0.001)
+        try:
+            self.assertEqual(resume_store.ensure_parsed([application], pool=pool), {application.id: None})
+            self.assertEqual(pool.stats().get('timeout'), 1)
+        finally:
+            pool.close()
+        self.assertFalse(ParsedResume.objects.exists())
+
+        # The next attempt parses the file again
+        self.assertIsNotNone(resume_store.ensure_parsed([application], pool=InlineParser())[application.id])
+
+    def test_failed_uploads_are_not_cached(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .utils import score_cache
+        from .utils.parser_pool import ParseFailed
+
+        pool = mock.Mock()
+        pool.parse.side_effect = ParseFailed('timeout', 'cv.txt')
+        with mock.patch.object(score_cache, 'get_parser_pool', return_value=pool):
+            for _ in range(2):
+                result = score_cache.score_upload(SimpleUploadedFile('cv.txt', b'parse failure test'), 'python')
+                self.assertEqual(result, {'score': None, 'matched_skills': [], 'missing_skills': ['python']})
+        self.assertEqual(pool.parse.call_count, 2)
+
+
+class ResumeUploadTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def score(self, name, content, client=None):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .utils import score_cache
+
+        client = client or Client()
+        upload = SimpleUploadedFile(name, content)
+        with mock.patch.object(score_cache, 'score_upload') as score_upload:
+            response = client.post(reverse('resume_scorer'), {'skills': 'python', 'resume': upload})
+        return response, score_upload
+
+    def messages(self, response):
+        from django.contrib.messages import get_messages
+
+        return [str(message) for message in get_messages(response.wsgi_request)]
+
+    def test_wrong_magic_bytes_are_rejected(self):
+        response, score_upload = self.score('cv.pdf', b'GIF89a' + b'\0' * 4096)
+        self.assertIn('This file is not a valid PDF document.', self.messages(response))
+        score_upload.assert_not_called()
+
+    def test_oversize_upload_is_dropped_mid_stream(self):
+        from django.core.files.uploadhandler import SkipFile
+        from django.test import RequestFactory
+        from .utils.uploads import ResumeUploadHandler
+
+        request = RequestFactory().post('/')
+        handler = ResumeUploadHandler(request)
+        handler.new_file('resume', 'cv.pdf', 'application/pdf', None)
+        with override_settings(RESUME_MAX_UPLOAD_BYTES=4096):
+            self.assertIsNone(handler.receive_data_chunk(b'%PDF-' + b'x' * 3000, 0))
+            with self.assertRaises(SkipFile):
+                handler.receive_data_chunk(b'x' * 3000, 3005)
+        self.assertIn('too large', request.upload_errors['resume'])
+        self.assertNotIn('file', handler.__dict__)
+
+    def test_short_file_rejected_when_complete(self):
+        # Under HEAD_BYTES the handler can only judge the file in
+        # file_complete, after which the next handler hands the view an
+        # empty file; the recorded error must still win.
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        job = make_job('Upload')
+        applicant = get_user_model().objects.create(username='uploader', is_applicant=True, email='u@example.com')
+        client = Client()
+        client.force_login(applicant)
+        form = {'full_name': 'Up Loader', 'email': 'u@example.com', 'phone': '123'}
+
+        response = client.post(reverse('job_detail', args=[job.pk]), {**form, 'resume': SimpleUploadedFile('cv.pdf', b'not a pdf')})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['form'].errors['resume'], ['This file is not a valid PDF document.'])
+        self.assertFalse(Application.objects.filter(user=applicant).exists())
+
+        response = client.post(reverse('job_detail', args=[job.pk]), {**form, 'resume': SimpleUploadedFile('cv.pdf', b'%PDF-1.4 short')})
+        self.assertRedirects(response, reverse('applicant_dashboard'), fetch_redirect_response=False)
+        self.assertTrue(Application.objects.filter(user=applicant).exists())
+
+    def test_csrf_is_still_enforced(self):
+        response, score_upload = self.score('cv.txt', b'python', client=Client(enforce_csrf_checks=True))
+        self.assertEqual(response.status_code, 403)
+        score_upload.assert_not_called()
+
+
+class ResumeStorageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.job = make_job('Storage')
+        cls.applicant = get_user_model().objects.create(username='stored', is_applicant=True)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def apply(self, content, name='cv.pdf'):
+        from django.core.files.base import ContentFile
+
+        return Application.objects.create(user=self.applicant, job=self.job, resume=ContentFile(content, name=name))
+
+    def refs(self, name):
+        return StoredFile.objects.get(name=name).ref_count
+
+    def exists(self, name):
+        return resume_storage.resume_storage().exists(name)
+
+    def test_applications_share_one_counted_file(self):
+        first, second = self.apply(b'%PDF same cv'), self.apply(b'%PDF same cv')
+        name = first.resume.name
+        self.assertEqual(second.resume.name, name)
+        self.assertEqual(self.refs(name), 2)
+
+        first.delete()
+        self.assertEqual(self.refs(name), 1)
+        second.delete()
+        self.assertEqual(self.refs(name), 0)
+        # Released files stay until the sweep, and then only after the grace period
+        self.assertTrue(self.exists(name))
+        self.assertEqual(resume_storage.sweep(), 0)
+        self.assertTrue(self.exists(name))
+        self.assertEqual(resume_storage.sweep(timedelta(0)), 1)
+        self.assertFalse(self.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+    def test_replacing_a_resume_moves_the_reference(self):
+        from django.core.files.base import ContentFile
+
+        application = self.apply(b'%PDF old cv')
+        old = application.resume.name
+        application.resume = ContentFile(b'%PDF new cv', name='new.pdf')
+        application.save()
+        self.assertEqual((self.refs(old), self.refs(application.resume.name)), (0, 1))
+
+    def test_upload_after_release_survives_the_sweep(self):
+        application = self.apply(b'%PDF reused cv')
+        name = application.resume.name
+        application.delete()
+        StoredFile.objects.filter(name=name).update(touched_at=timezone.now() - timedelta(days=2))
+
+        # The same CV is uploaded again before the sweep runs
+        self.apply(b'%PDF reused cv')
+        self.assertEqual(resume_storage.sweep(timedelta(hours=1)), 0)
+        self.assertTrue(self.exists(name))
+        self.assertEqual(self.refs(name), 1)
+
+    def test_retain_race_keeps_the_transaction_usable(self):
+        from django.db import transaction
+        from django.db.models.query import QuerySet
+
+        name = self.apply(b'%PDF raced cv').resume.name
+        real_update = QuerySet.update
+        missed = []
+
+        def update(queryset, **changes):
+            # The row does not exist yet when first updated, then another
+            # request creates it before this one does
+            if not missed:
+                missed.append(True)
+                return 0
+            return real_update(queryset, **changes)
+
+        with transaction.atomic():
+            with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update):
+                resume_storage.retain(name)
+            self.assertEqual(self.refs(name), 2)
+
+    def test_dedupe_leaves_unreferenced_files_to_the_sweep(self):
+        from django.core.management import call_command
+
+        orphan = self.apply(b'%PDF orphaned cv').resume.name
+        # e.g. the application was removed with a raw delete, skipping signals
+        Application.objects.filter(resume=orphan)._raw_delete(connection.alias)
+        call_command('dedupe_resumes', stdout=open(os.devnull, 'w'))
+        self.assertEqual(self.refs(orphan), 0)
+        self.assertTrue(self.exists(orphan))
+        self.assertEqual(resume_storage.sweep(timedelta(0)), 1)
+        self.assertFalse(self.exists(orphan))
+
+
+def make_job(name, **fields):
+    """A company with one open job, for tests that need little data."""
+    hr = get_user_model().objects.create(username=f'{name}-hr', is_hr=True)
+    company = Company.objects.create(user=hr, name=f'{name} Co', description='', location='Remote')
+    fields.setdefault('deadline', timezone.now().date() + timedelta(days=7))
+    fields.setdefault('required_skills', '')
+    return JobListing.objects.create(company=company, title=name, description='', **fields)
+
+
+@override_settings(SCORING_MAX_ATTEMPTS=2, SCORING_RETRY_BACKOFF_SECONDS=30, SCORING_LEASE_SECONDS=60, PARSER_TIMEOUT_SECONDS=1)
+class ScoringQueueTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        job = make_job('Queue')
+        applicant = get_user_model().objects.create(username='queued', is_applicant=True)
+        cls.applications = [
+            Application.objects.create(user=applicant, job=job, resume=f'resumes/queued{i}.pdf') for i in range(3)
+        ]
+
+    def setUp(self):
+        for application in self.applications:
+            scoring_queue.enqueue(application)
+
+    def expire_leases(self):
+        ScoringTask.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+
+    def test_claims_are_exclusive_until_the_lease_expires(self):
+        first = scoring_queue.claim('a', 2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(scoring_queue.claim('b', 5)), 1)
+        self.assertEqual(scoring_queue.claim('c', 5), [])
+        # 60s setting, but never less than the parser timeout for every task
+        self.assertGreaterEqual(first[0].locked_until - timezone.now(), timedelta(seconds=2 * 1 + 59))
+
+        self.expire_leases()
+        reclaimed = scoring_queue.claim('c', 5)
+        self.assertEqual(len(reclaimed), 3)
+        self.assertEqual(sorted(task.attempts for task in reclaimed), [2, 2, 2])
+
+    def test_failures_back_off_then_fail(self):
+        errors = {application.id: 'boom' for application in self.applications}
+        with mock.patch.object(scoring_queue, 'score_applications', return_value=errors):
+            self.assertEqual(scoring_queue.run_batch('a', 5), (3, (0, 3, 0)))
+            task = ScoringTask.objects.get(application=self.applications[0])
+            self.assertEqual((task.status, task.last_error), ('Queued', 'boom'))
+            self.assertAlmostEqual((task.available_at - timezone.now()).total_seconds(), 30, delta=5)
+            self.assertEqual(scoring_queue.claim('a', 5), [])
+
+            ScoringTask.objects.update(available_at=timezone.now())
+            self.assertEqual(scoring_queue.run_batch('a', 5), (3, (0, 0, 3)))
+        self.assertEqual(set(ScoringTask.objects.values_list('status', flat=True)), {'Failed'})
+        self.assertEqual(
+            set(Application.objects.filter(pk__in=[a.pk for a in self.applications]).values_list('score_status', flat=True)),
+            {'Failed'},
+        )
+
+    def test_expired_worker_does_not_overwrite_the_new_owner(self):
+        stale = scoring_queue.claim('a', 5)
+        self.expire_leases()
+        scoring_queue.claim('b', 5)
+        errors = {self.applications[0].id: 'boom'}
+        with mock.patch.object(scoring_queue, 'score_applications', return_value=errors):
+            self.assertEqual(scoring_queue.process(stale), (0, 0, 0))
+        self.assertEqual(ScoringTask.objects.filter(status='Running', worker='b').count(), 3)
+
+
+class SkillVocabularyTests(TestCase):
+
+    def test_seeded_aliases_are_normalized(self):
+        # Seeded by migration 0013 from its frozen vocabulary
+        seeded = list(SkillAlias.objects.values_list('alias', flat=True))
+        self.assertTrue(seeded)
+        for alias in seeded:
+            self.assertEqual(alias, skills.normalize(alias))
+        # and every label the keyword matcher reports resolves through them
+        from .utils.keywords import SKILLS
+
+        labels = [label for _, label in SKILLS]
+        self.assertEqual([skill.name for skill in skills.resolve(labels, create=False)], labels)
+
+
+class SkillQueryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        skills.seed_vocabulary()
+        cls.backend = make_job('Backend', required_skills='Python, Django, Docker')
+        cls.ml = make_job('ML', required_skills='python, sklearn')
+        cls.web = make_job('Web', required_skills='Django')
+
+        applicant = get_user_model().objects.create(username='skilled', is_applicant=True)
+        resumes = [
+            ParsedResume.objects.create(content_hash=str(i) * 64, parser_version=1, features={'skills': labels})
+            for i, labels in enumerate([['Python', 'Docker', 'Kubernetes'], ['Python'], ['Docker', 'Kubernetes']])
+        ]
+        skills.link_parsed_resumes(resumes)
+        cls.applications = [
+            Application.objects.create(user=applicant, job=job, resume=f'resumes/skilled{i}.pdf', parsed_resume=parsed)
+            for i, (job, parsed) in enumerate([(cls.backend, resumes[0]), (cls.backend, resumes[1]), (cls.ml, resumes[2])])
+        ]
+
+    def titles(self, jobs):
+        return sorted(job.title for job in jobs)
+
+    def test_jobs_requiring_every_skill(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(self.titles(skills.jobs_requiring('django', 'docker')), ['Backend'])
+        self.assertEqual(self.titles(skills.jobs_requiring('Django')), ['Backend', 'Web'])
+        self.assertEqual(self.titles(skills.jobs_requiring('Python')), ['Backend', 'ML'])
+
+    def test_aliases_name_the_same_skill(self):
+        self.assertEqual(self.titles(skills.jobs_requiring('scikit-learn')), ['ML'])
+        self.assertEqual(self.titles(skills.jobs_requiring('  SKLearn ')), ['ML'])
+
+    def test_unknown_or_missing_skills_match_nothing(self):
+        self.assertEqual(list(skills.jobs_requiring('django', 'cobol')), [])
+        self.assertEqual(list(skills.jobs_requiring()), [])
+        self.assertEqual(list(skills.applications_with('cobol')), [])
+
+    def test_editing_required_skills_resyncs_the_job(self):
+        self.web.required_skills = 'Django, Docker'
+        self.web.save()
+        self.assertEqual(self.titles(skills.jobs_requiring('django', 'docker')), ['Backend', 'Web'])
+        self.assertEqual(self.titles(skills.jobs_requiring('django')), ['Backend', 'Web'])
+
+    def test_applications_with_every_skill(self):
+        first, second, third = self.applications
+        self.assertEqual(list(skills.applications_with('python', 'docker')), [first])
+        self.assertEqual(set(skills.applications_with('k8s')), {first, third})
+        self.assertEqual(set(skills.applications_with('python')), {first, second})
+        self.assertEqual(list(skills.applications_with('docker', job=self.ml)), [third])
+        self.assertEqual(list(skills.applications_with('python', job=self.web)), [])
+
+
+class QueryBudgetTests(PortalTestCase):
+    """
+    Every view in recruitment/urls.py must stay within its declared query
+    budget (QUERY_BUDGETS) on seeded data, so N+1 patterns fail here.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.staff = get_user_model().objects.create(username='ops', is_staff=True)
+
+    def request_plan(self):
+        # (url name, args, user to log in as or None, method)
+        hr = self.hr_users[0]
+        job = hr.company.jobs.first()
+        application = job.applications.first()
+        return [
+            ('home', [], None, 'get'),
+            ('search_jobs', [], None, 'get'),
+            ('dashboard_redirect', [], hr, 'get'),
+            ('hr_dashboard', [], hr, 'get'),
+            ('applicant_dashboard', [], self.applicants[1], 'get'),
+            ('create_company', [], hr, 'get'),
+            ('post_job', [], hr, 'get'),
+            ('job_detail', [job.pk], self.applicants[1], 'get'),
+            ('view_applicants', [job.pk], hr, 'get'),
+            ('application_detail', [application.pk], hr, 'get'),
+            ('update_application_status', [application.pk, 'Accepted'], hr, 'get'),
+            ('about', [], None, 'get'),
+            ('services', [], None, 'get'),
+            ('contact', [], None, 'get'),
+            ('resume_scorer', [], None, 'get'),
+            ('smart_matching', [], self.applicants[1], 'get'),
+            ('analytics_dashboard', [], None, 'get'),
+            ('secure_recruiting', [], None, 'get'),
+            ('health_check', [], None, 'get'),
+            ('health_details', [], self.staff, 'get'),
+        ]
+
+    def test_every_view_declares_a_budget(self):
+        names = {pattern.name for pattern in recruitment_urls.urlpatterns if pattern.name}
+        self.assertEqual(set(), names - set(recruitment_urls.QUERY_BUDGETS))
+        self.assertEqual(names, {name for name, _, _, _ in self.request_plan()})
+
+    def test_views_stay_within_query_budget(self):
+        for name, args, user, method in self.request_plan():
+            with self.subTest(view=name):
+                client = Client()
+                if user is not None:
+                    client.force_login(user)
+                with CaptureQueriesContext(connection) as queries:
+                    response = getattr(client, method)(reverse(name, args=args))
+                self.assertLess(response.status_code, 500)
+                budget = recruitment_urls.QUERY_BUDGETS[name]
+                self.assertLessEqual(
+                    len(queries), budget,
+                    f"{name} ran {len(queries)} queries (budget {budget}):\n"
+                    + "\n".join(query['sql'] for query in queries.captured_queries),
+                )
+
+    def test_list_views_do_not_grow_with_rows(self):
+        # One more applicant on every job must not add queries to the lists
+        hr = self.hr_users[0]
+        job = hr.company.jobs.first()
+        counts = []
+        for extra in range(2):
+            client = Client()
+            client.force_login(hr)
+            with CaptureQueriesContext(connection) as queries:
+                client.get(reverse('view_applicants', args=[job.pk]))
+                client.get(reverse('hr_dashboard'))
+            counts.append(len(queries))
+            applicant = get_user_model().objects.create(username=f'late{extra}', is_applicant=True)
+            for each in hr.company.jobs.all():
+                Application.objects.create(user=applicant, job=each, full_name='', resume='resumes/late.pdf')
+        self.assertEqual(counts[0], counts[1])
+
+
+@override_settings(JOB_FEED_PAGE_SIZE=5)
+class JobFeedTests(PortalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Not open: past deadline, and not yet accepting applications
+        today = timezone.now().date()
+        JobListing.objects.filter(pk=cls.jobs[0].pk).update(deadline=today - timedelta(days=1))
+        JobListing.objects.filter(pk=cls.jobs[1].pk).update(application_start_date=today + timedelta(days=3))
+
+    def walk(self, **filters):
+        client = Client()
+        client.force_login(self.applicants[1])
+        seen, pages, params = [], 0, dict(filters)
+        while True:
+            response = client.get(reverse('applicant_dashboard'), params)
+            page = response.context['jobs']
+            seen.extend(job.pk for job in page)
+            pages += 1
+            if not page.has_next:
+                return seen, pages
+            params['after'] = page.next_cursor
+
+    def test_pages_cover_open_jobs_once_newest_first(self):
+        seen, pages = self.walk()
+        expected = list(
+            JobListing.objects.exclude(pk__in=[self.jobs[0].pk, self.jobs[1].pk])
+            .order_by('-created_at', '-id').values_list('pk', flat=True)
+        )
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, -(-len(expected) // 5))
+
+    def test_filters_apply_to_every_page(self):
+        seen, _ = self.walk(job_type='Part Time', work_mode='Remote')
+        jobs = JobListing.objects.filter(pk__in=seen)
+        self.assertTrue(seen)
+        self.assertEqual({(job.job_type, job.work_mode) for job in jobs}, {('Part Time', 'Remote')})
+
+    def test_later_pages_cost_the_same(self):
+        client = Client()
+        client.force_login(self.applicants[1])
+        first = client.get(reverse('applicant_dashboard'))
+        with CaptureQueriesContext(connection) as page_one:
+            client.get(reverse('applicant_dashboard'))
+        with CaptureQueriesContext(connection) as page_two:
+            client.get(reverse('applicant_dashboard'), {'after': first.context['jobs'].next_cursor})
+        self.assertEqual(len(page_one), len(page_two))
+
+    def test_bad_cursor_shows_first_page(self):
+        client = Client()
+        client.force_login(self.applicants[1])
+        response = client.get(reverse('applicant_dashboard'), {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['jobs'].is_first)
+
+        # Well-formed, but a number where created_at's datetime belongs
+        wrong_types = encode_cursor([5, 1])
+        response = client.get(reverse('applicant_dashboard'), {'after': wrong_types})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['jobs'].is_first)
+        response = client.get(reverse('search_jobs'), {'after': wrong_types})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['results'].is_first)
+
+
+@override_settings(APPLICANT_PAGE_SIZE=2)
+class ApplicantReviewTests(PortalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.hr = cls.hr_users[0]
+        cls.job = cls.jobs[1]  # applicants with scores on both sides of 50%
+        accepted = cls.job.applications.order_by('id').first()
+        accepted.status = 'Accepted'
+        accepted.save()
+
+    def setUp(self):
+        self.client.force_login(self.hr)
+
+    def walk(self, **filters):
+        seen, params = [], dict(filters)
+        while True:
+            response = self.client.get(reverse('view_applicants', args=[self.job.pk]), params)
+            page = response.context['applications']
+            seen.extend(app.pk for app in page)
+            if not page.has_next:
+                return seen
+            params['after'] = page.next_cursor
+
+    def test_pages_cover_applications_best_first(self):
+        expected = list(self.job.applications.order_by('-ranking_score', '-id').values_list('pk', flat=True))
+        self.assertGreater(len(expected), 2)
+        self.assertEqual(self.walk(), expected)
+
+    def test_requeued_applications_lose_their_old_rank(self):
+        best = self.job.applications.order_by('-ranking_score').first()
+        scoring_queue.enqueue(best)
+        best.refresh_from_db()
+        self.assertEqual((best.score_status, best.ranking_score), ('Pending', 0.0))
+        ranked = self.walk()
+        scored = self.job.applications.filter(ranking_score__gt=0).count()
+        self.assertGreater(scored, 0)
+        self.assertGreaterEqual(ranked.index(best.pk), scored)
+
+    def test_status_and_score_filters(self):
+        accepted = self.walk(status='Accepted')
+        self.assertEqual(accepted, list(self.job.applications.filter(status='Accepted').values_list('pk', flat=True)))
+        strong = Application.objects.filter(pk__in=self.walk(min_score=50))
+        self.assertTrue(strong)
+        self.assertTrue(all(app.ranking_score >= 0.5 and app.score_status == 'Scored' for app in strong))
+
+    def test_status_tab_counts(self):
+        response = self.client.get(reverse('view_applicants', args=[self.job.pk]))
+        tabs = {value: count for value, _, count in response.context['status_tabs']}
+        self.assertEqual(tabs[''], self.job.applications.count())
+        self.assertEqual(tabs['Accepted'], 1)
+
+    def test_details_load_separately(self):
+        application = self.job.applications.first()
+        Application.objects.filter(pk=application.pk).update(cover_letter='I would love to join the team.')
+        listing = self.client.get(reverse('view_applicants', args=[self.job.pk]))
+        self.assertNotContains(listing, 'I would love to join the team.')
+        detail = self.client.get(reverse('application_detail', args=[application.pk]))
+        self.assertContains(detail, 'I would love to join the team.')
+
+        other_hr = self.client_class()
+        other_hr.force_login(self.hr_users[1])
+        response = other_hr.get(reverse('application_detail', args=[application.pk]))
+        self.assertRedirects(response, reverse('hr_dashboard'), fetch_redirect_response=False)
+
+
+class JobSearchTests(PortalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.company = cls.hr_users[0].company
+        today = timezone.now().date()
+        cls.kafka = JobListing.objects.create(
+            company=cls.company, title='Kafka Platform Engineer',
+            description='Run streaming pipelines. <script>alert(1)</script>',
+            required_skills='kafka, java', job_type='Full Time', work_mode='Remote',
+            deadline=today + timedelta(days=10),
+        )
+        cls.mention = JobListing.objects.create(
+            company=cls.company, title='Backend Developer',
+            description='Our services publish events to Kafka among many other things we do every day.',
+            required_skills='go', job_type='Part Time', work_mode='On Site',
+            deadline=today + timedelta(days=10),
+        )
+        cls.closed = JobListing.objects.create(
+            company=cls.company, title='Kafka Administrator', description='Keep the brokers healthy.',
+            required_skills='kafka', deadline=today - timedelta(days=1),
+        )
+
+    def ids(self, text, **filters):
+        return [job.pk for job in job_search.search_jobs(text, **filters)]
+
+    def test_ranks_title_matches_first_and_skips_closed_jobs(self):
+        self.assertEqual(self.ids('kafka'), [self.kafka.pk, self.mention.pk])
+        self.assertIn(self.closed.pk, self.ids('kafka', open_only=False))
+
+    def test_ranks_only_the_newest_matches(self):
+        self.assertFalse(job_search.search_jobs('kafka').truncated)
+        with override_settings(JOB_SEARCH_CANDIDATES=1):
+            results = job_search.search_jobs('kafka')
+            self.assertEqual([job.pk for job in results], [self.mention.pk])
+            self.assertTrue(results.truncated)
+            response = self.client.get(reverse('search_jobs'), {'q': 'kafka'})
+        self.assertContains(response, 'More than 1 jobs match')
+        self.assertNotContains(self.client.get(reverse('search_jobs'), {'q': 'kafka'}), 'More than')
+
+    def test_filters_and_prefix_matching(self):
+        self.assertEqual(self.ids('kaf', work_mode='Remote'), [self.kafka.pk])
+        self.assertEqual(self.ids('kafka', job_type='Part Time'), [self.mention.pk])
+        self.assertEqual(self.ids('kafka pipelines'), [self.kafka.pk])
+
+    def test_index_follows_writes(self):
+        job = self.jobs[0]
+        self.assertNotIn(job.pk, self.ids('elixir'))
+        job.required_skills = 'elixir, phoenix'
+        job.save()
+        self.assertEqual(self.ids('elixir'), [job.pk])
+
+        company = job.company
+        company.name = 'Zyxwv Labs'
+        company.save()
+        self.assertIn(job.pk, self.ids('zyxwv'))
+
+        job.delete()
+        self.assertEqual(self.ids('elixir'), [])
+
+    def test_snippets_are_highlighted_and_escaped(self):
+        job = job_search.search_jobs('streaming')[0]
+        self.assertIn('<mark>streaming</mark>', job.snippet_html)
+        self.assertNotIn('<script>', job.snippet_html)
+        self.assertIn('&lt;script&gt;', job.snippet_html)
+
+    def test_query_syntax_is_searched_literally(self):
+        for text in ['"', 'kafka AND (', 'NEAR(a b)', '*', 'title:kafka', '']:
+            with self.subTest(text=text):
+                job_search.search_jobs(text)
+
+    def test_search_page(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('search_jobs'), {'q': 'kafka', 'work_mode': 'Remote'})
+        self.assertContains(response, '<mark>Kafka</mark> Platform Engineer', html=False)
+        self.assertNotContains(response, 'Backend Developer')
+        self.assertLessEqual(len(queries), recruitment_urls.QUERY_BUDGETS['search_jobs'])
+
+    @override_settings(JOB_SEARCH_PAGE_SIZE=10)
+    def test_listing_pages_by_keyset(self):
+        seen, params = [], {'include_closed': '1'}
+        while True:
+            response = self.client.get(reverse('search_jobs'), params)
+            results = response.context['results']
+            seen.extend(job.pk for job in results)
+            if not results.has_next:
+                break
+            params['after'] = results.next_cursor
+        self.assertEqual(seen, list(JobListing.objects.order_by('-created_at', '-id').values_list('pk', flat=True)))
+
+    @override_settings(JOB_SEARCH_PAGE_SIZE=10)
+    def test_search_page_number_is_capped(self):
+        last_page = job_search.candidates() // 10
+        with mock.patch.object(job_search, 'search_jobs', return_value=job_search.Results()) as search:
+            response = self.client.get(reverse('search_jobs'), {'q': 'engineer', 'page': '999999999'})
+        self.assertEqual(response.context['page'], last_page)
+        self.assertEqual(search.call_args.kwargs['offset'], (last_page - 1) * 10)
+
+
+class AnalyticsRollupTests(PortalTestCase):
+
+    def rollup_rows(self):
+        daily = {
+            (row.company_id, row.day): (row.jobs_posted, row.applications, row.accepted, row.rejected)
+            for row in DailyStats.objects.all()
+            if (row.jobs_posted, row.applications, row.accepted, row.rejected) != (0, 0, 0, 0)
+        }
+        buckets = {(row.company_id, row.bucket): row.count for row in ScoreBucket.objects.exclude(count=0)}
+        return daily, buckets
+
+    def assertMatchesRebuild(self):
+        maintained = self.rollup_rows()
+        rollups.rebuild()
+        self.assertEqual(maintained, self.rollup_rows())
+
+    def test_signals_match_a_rebuild(self):
+        self.assertTrue(DailyStats.objects.exists())
+        self.assertMatchesRebuild()
+
+        hr = self.hr_users[0]
+        client = Client()
+        client.force_login(hr)
+        job = hr.company.jobs.order_by('id')[1]
+        accept, reject = job.applications.order_by('id')[:2]
+        client.get(reverse('update_application_status', args=[accept.pk, 'Accepted']))
+        client.get(reverse('update_application_status', args=[reject.pk, 'Rejected']))
+        self.assertFalse(Application.objects.filter(pk=reject.pk).exists())
+
+        # Re-scoring moves applications between histogram buckets
+        rescored = list(job.applications.all())
+        for application in rescored:
+            application.ranking_score = 0.95
+            application.score_status = 'Scored'
+        Application.objects.bulk_update(rescored, ['ranking_score', 'score_status'])
+        rollups.applications_saved(rescored)
+        scoring_queue.enqueue(rescored[0])
+
+        self.jobs[-1].delete()  # and its applications
+        self.assertMatchesRebuild()
+
+        self.assertEqual(DailyStats.objects.filter(company=hr.company).aggregate(n=Sum('rejected'))['n'], 1)
+
+    def test_rejected_applications_stay_received(self):
+        job = make_job('Rejecting')
+        application = Application.objects.create(user=self.applicants[0], job=job, full_name='', resume='resumes/r.pdf')
+        client = Client()
+        client.force_login(job.company.user)
+        client.get(reverse('update_application_status', args=[application.pk, 'Rejected']))
+        self.assertFalse(Application.objects.filter(pk=application.pk).exists())
+
+        day = DailyStats.objects.get(company=job.company, day=timezone.localdate())
+        self.assertEqual((day.applications, day.rejected), (1, 1))
+        self.assertMatchesRebuild()
+        company = Company.objects.get(pk=job.company_id)
+        self.assertEqual((company.received_count, company.rejected_count), (1, 1))
+        self.assertEqual(rollups.reconcile_counters(), 0)
+
+    def test_dashboard_reads_rollups(self):
+        response = self.client.get(reverse('analytics_dashboard'))
+        self.assertEqual(response.context['total_jobs'], JobListing.objects.count())
+        self.assertEqual(response.context['total_applications'], Application.objects.count())
+        self.assertEqual(sum(response.context['series']['applications']), Application.objects.count())
+        self.assertEqual(response.context['companies_count'], Company.objects.count())
+
+        # Rollup rows from before the window shown are never read
+        old = timezone.localdate() - timedelta(days=400)
+        DailyStats.objects.create(company=self.hr_users[0].company, day=old, applications=7, accepted=5, rejected=2)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('analytics_dashboard'))
+        # All-time totals, from the company counters
+        self.assertEqual(response.context['total_accepted'], Application.objects.filter(status='Accepted').count())
+        self.assertEqual(response.context['total_applications'], Application.objects.count())
+        daily_stats = [query['sql'] for query in queries.captured_queries if 'recruitment_dailystats' in query['sql']]
+        self.assertEqual(len(daily_stats), 1)
+        self.assertIn('"day" >=', daily_stats[0])
+        self.assertEqual(
+            sum(response.context['histogram']['counts']), Application.objects.filter(score_status='Scored').count(),
+        )
+
+        # More applications do not cost more queries
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(reverse('analytics_dashboard'))
+        for job in self.jobs:
+            Application.objects.create(user=self.applicants[0], job=job, full_name='', resume='resumes/late.pdf')
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(reverse('analytics_dashboard'))
+        self.assertEqual(len(before), len(after))
+        self.assertNotIn('recruitment_application', ' '.join(query['sql'] for query in after.captured_queries))
+
+
+class ApplicationCounterTests(PortalTestCase):
+
+    def test_counters_follow_writes(self):
+        hr = self.hr_users[0]
+        client = Client()
+        client.force_login(hr)
+        job = hr.company.jobs.order_by('id')[1]
+        accept, reject = job.applications.order_by('id')[:2]
+        client.get(reverse('update_application_status', args=[accept.pk, 'Accepted']))
+        client.get(reverse('update_application_status', args=[reject.pk, 'Rejected']))
+        Application.objects.create(user=self.applicants[0], job=job, full_name='', resume='resumes/late.pdf')
+        hr.company.jobs.order_by('id').last().delete()
+
+        job.refresh_from_db()
+        self.assertEqual(job.application_count, job.applications.count())
+        self.assertEqual(job.pending_count, job.applications.filter(status='Pending').count())
+        company = Company.objects.get(pk=hr.company.pk)
+        self.assertEqual(company.job_count, company.jobs.count())
+        self.assertEqual(company.application_count, Application.objects.filter(job__company=company).count())
+        self.assertEqual(rollups.reconcile_counters(), 0)
+
+    def test_editing_keeps_counters(self):
+        # Both rows are read before the applications arrive, as in an edit form
+        job = JobListing.objects.get(pk=self.jobs[0].pk)
+        company = Company.objects.get(pk=job.company_id)
+        for applicant in self.applicants[:3]:
+            Application.objects.create(user=applicant, job=job, full_name='', resume='resumes/late.pdf')
+        JobListing.objects.create(
+            company=company, title='Another', description='', required_skills='', deadline=job.deadline,
+        )
+
+        job.title = 'Renamed'
+        job.save()
+        company.description = 'Edited.'
+        company.save()
+
+        job.refresh_from_db()
+        company.refresh_from_db()
+        self.assertEqual((job.title, company.description), ('Renamed', 'Edited.'))
+        self.assertEqual(job.application_count, job.applications.count())
+        self.assertEqual(company.job_count, company.jobs.count())
+        self.assertEqual(company.application_count, Application.objects.filter(job__company=company).count())
+        self.assertEqual(rollups.reconcile_counters(), 0)
+
+    def test_reconcile_fixes_drift(self):
+        job = self.jobs[0]
+        JobListing.objects.filter(pk=job.pk).update(application_count=999, pending_count=-3)
+        Company.objects.filter(pk=job.company_id).update(job_count=0)
+        self.assertEqual(rollups.reconcile_counters(), 2)
+        job.refresh_from_db()
+        self.assertEqual(job.application_count, job.applications.count())
+        self.assertEqual(rollups.reconcile_counters(), 0)
+
+    def test_hr_dashboard_reads_counters(self):
+        client = Client()
+        client.force_login(self.hr_users[0])
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('hr_dashboard'))
+        company = self.hr_users[0].company
+        self.assertEqual(response.context['total_applicants'], Application.objects.filter(job__company=company).count())
+        self.assertEqual(response.context['total_jobs'], company.jobs.count())
+        self.assertNotIn('recruitment_application', ' '.join(query['sql'] for query in queries.captured_queries))
+
+
+@override_settings(QUERY_INSTRUMENTATION=True)
+class QueryBudgetMiddlewareTests(PortalTestCase):
+
+    def setUp(self):
+        query_stats.reset()
+
+    def test_records_queries_per_view(self):
+        client = Client()  # builds its middleware chain with the setting on
+        client.force_login(self.hr_users[0])
+        client.get(reverse('hr_dashboard'))
+        client.get(reverse('hr_dashboard'))
+        client.get(reverse('about'))
+
+        rows = {row['view']: row for row in query_stats.worst(limit=10)}
+        self.assertEqual(rows['hr_dashboard']['requests'], 2)
+        self.assertGreater(rows['hr_dashboard']['avg_queries'], 0)
+        self.assertLess(rows['about']['max_queries'], rows['hr_dashboard']['max_queries'])
+        self.assertEqual(list(rows)[0], 'hr_dashboard')
+
+    def test_reports_requests_over_budget(self):
+        client = Client()
+        client.force_login(self.hr_users[0])
+        with mock.patch.dict(recruitment_urls.QUERY_BUDGETS, {'hr_dashboard': 0}):
+            client.get(reverse('hr_dashboard'))
+        rows = {row['view']: row for row in query_stats.worst(limit=10)}
+        self.assertEqual(rows['hr_dashboard']['over_budget'], 1)
+
+    def test_query_stats_are_for_staff_only(self):
+        client = Client()
+        client.get(reverse('about'))
+        health = client.get(reverse('health_check')).json()
+        self.assertEqual(health, {'status': 'ok'})
+
+        self.assertEqual(client.get(reverse('health_details')).status_code, 302)
+        client.force_login(self.hr_users[0])
+        self.assertEqual(client.get(reverse('health_details')).status_code, 302)
+
+        client.force_login(get_user_model().objects.create(username='ops', is_staff=True))
+        details = client.get(reverse('health_details')).json()
+        self.assertEqual((details['status'], details['database']), ('ok', True))
+        self.assertIn('about', [row['view'] for row in details['slowest_views']])
+        self.assertIn('score_cache', details)
+
+    def test_database_outage_fails_readiness_not_liveness(self):
+        client = Client()
+        client.force_login(get_user_model().objects.create(username='ops', is_staff=True))
+        with mock.patch('recruitment.views._database_ok', return_value=False):
+            self.assertEqual(client.get(reverse('health_check')).status_code, 200)
+            response = client.get(reverse('health_details'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual((response.json()['status'], response.json()['database']), ('error', False))
@@ -5,6 +5,7 @@ from django.http import JsonResponse
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('jobs/search/', views.search_jobs, name='search_jobs'),
     path('dashboard/', views.dashboard_redirect, name='dashboard_redirect'),
     path('dashboard/hr/', views.hr_dashboard, name='hr_dashboard'),
     path('dashboard/applicant/', views.applicant_dashboard, name='applicant_dashboard'),
@@ -12,6 +13,7 @@ urlpatterns = [
     path('post-job/', views.post_job, name='post_job'),
     path('job/<int:pk>/', views.job_detail, name='job_detail'),
     path('job/<int:job_id>/applicants/', views.view_applicants, name='view_applicants'),
+    path('application/<int:application_id>/', views.application_detail, name='application_detail'),
     path('application/<int:application_id>/status/<str:status>/', views.update_application_status, name='update_application_status'),
     path('about/', views.about, name='about'),
     path('services/', views.services, name='services'),
@@ -23,4 +25,32 @@ urlpatterns = [
     path('services/analytics/', views.analytics_dashboard, name='analytics_dashboard'),
     path('services/security/', views.secure_recruiting, name='secure_recruiting'),
     path('health/', views.health_check, name='health_check'),
+    path('health/details/', views.health_details, name='health_details'),
 ]
+
+# Most SQL queries each view may run for one request. Enforced by
+# recruitment/tests.py on seeded data and reported at runtime by
+# QueryBudgetMiddleware; a view whose count grows with the rows it
+# lists will not fit.
+QUERY_BUDGETS = {
+    'home': 2,
+    'search_jobs': 5,
+    'dashboard_redirect': 3,
+    'hr_dashboard': 4,
+    'applicant_dashboard': 8,
+    'create_company': 4,
+    'post_job': 4,
+    'job_detail': 9,
+    'view_applicants': 8,
+    'application_detail': 3,
+    'update_application_status': 10,
+    'about': 2,
+    'services': 2,
+    'contact': 2,
+    'resume_scorer': 2,
+    'smart_matching': 10,
+    'analytics_dashboard': 3,
+    'secure_recruiting': 2,
+    'health_check': 2,
+    'health_details': 3,
+}
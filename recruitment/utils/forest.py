@@ -0,0 +1,166 @@
+import copy
+import os
+import numpy as np
+import scipy.sparse as sp
+
+# All trees of a fitted RandomForestClassifier flattened into a handful of
+# contiguous arrays. Unlike sklearn's Tree objects (which copy their node
+# arrays into private memory when unpickled), these arrays can be loaded with
+# np.load(mmap_mode='r'), so every worker process on a host shares one copy
+# through the page cache.
+
+ARRAY_NAMES = ('children_left', 'children_right', 'feature', 'threshold', 'value', 'roots', 'used_features')
+LEAF = -1
+# Up to this many samples all trees are walked together; larger batches go
+# tree by tree so finished samples drop out of the working set.
+BATCH_BY_TREE_THRESHOLD = 1024
+
+
+class _EveryNode:
+    # Stands in for a fitted Tree whose predict() lands on every node once
+    def __init__(self, tree):
+        self.tree = tree
+
+    def predict(self, X):
+        return self.tree.value[:, 0, :]
+
+
+def _node_probabilities(estimator):
+    """
+    What DecisionTreeClassifier.predict_proba returns for a sample ending in
+    each node. Older scikit-learn renormalises the stored values there and
+    newer versions return them as they are, so let the installed version do
+    it: any other arithmetic can differ in the last bit.
+    """
+    stub = copy.copy(estimator)
+    stub.tree_ = _EveryNode(estimator.tree_)
+    sample = np.zeros((1, estimator.n_features_in_), dtype=np.float32)
+    return np.asarray(stub.predict_proba(sample, check_input=False), dtype=np.float64)
+
+
+class FlatForest:
+    """
+    Array-backed stand-in for a fitted RandomForestClassifier. Exposes the
+    parts of its interface Ranker needs: predict_proba, classes_ and
+    n_features_in_.
+    """
+
+    def __init__(self, arrays, classes, n_features_in):
+        self.children_left = arrays['children_left']
+        self.children_right = arrays['children_right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.used_features = arrays['used_features']
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = n_features_in
+
+    @classmethod
+    def from_sklearn(cls, model):
+        lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            left = tree.children_left.astype(np.int32)
+            right = tree.children_right.astype(np.int32)
+            is_leaf = left == LEAF
+            lefts.append(np.where(is_leaf, LEAF, left + offset))
+            rights.append(np.where(is_leaf, LEAF, right + offset))
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+
+            values.append(_node_probabilities(estimator))
+
+            roots.append(offset)
+            offset += tree.node_count
+
+        feature = np.concatenate(features)
+        is_leaf = np.concatenate(lefts) == LEAF
+        # Only gather the input columns some split actually looks at
+        used_features = np.unique(feature[~is_leaf]).astype(np.int32)
+        remap = np.zeros(model.n_features_in_, dtype=np.int32)
+        remap[used_features] = np.arange(len(used_features), dtype=np.int32)
+
+        arrays = {
+            'children_left': np.concatenate(lefts),
+            'children_right': np.concatenate(rights),
+            'feature': np.where(is_leaf, 0, remap[feature]).astype(np.int32),
+            'threshold': np.concatenate(thresholds),
+            'value': np.ascontiguousarray(np.concatenate(values)),
+            'roots': np.array(roots, dtype=np.int32),
+            'used_features': used_features,
+        }
+        return cls(arrays, model.classes_, model.n_features_in_)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(getattr(self, name)))
+
+    @classmethod
+    def load(cls, directory, classes, n_features_in, mmap_mode='r'):
+        arrays = {
+            name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+            for name in ARRAY_NAMES
+        }
+        return cls(arrays, classes, n_features_in)
+
+    def _gather(self, X):
+        # sklearn evaluates splits on float32 inputs; do the same so
+        # thresholds compare identically.
+        if sp.issparse(X):
+            X = X.tocsc()[:, self.used_features].toarray()
+        else:
+            X = np.asarray(X)[:, self.used_features]
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def predict_proba(self, X):
+        X = self._gather(X)
+        if X.shape[0] <= BATCH_BY_TREE_THRESHOLD:
+            return self._predict_all_trees(X)
+        return self._predict_tree_by_tree(X)
+
+    def _predict_tree_by_tree(self, X):
+        # One tree at a time, all samples at once. The active set shrinks as
+        # samples reach leaves, which suits large batches.
+        n_samples = X.shape[0]
+        rows = np.arange(n_samples)
+        proba = np.zeros((n_samples, self.value.shape[1]), dtype=np.float64)
+
+        for root in self.roots:
+            node = np.full(n_samples, root, dtype=np.int32)
+            active = rows if self.children_left[root] != LEAF else rows[:0]
+            while len(active):
+                current = node[active]
+                go_left = X[active, self.feature[current]] <= self.threshold[current]
+                child = np.where(go_left, self.children_left[current], self.children_right[current])
+                node[active] = child
+                # A node is a leaf when its children are LEAF
+                active = active[self.children_left[child] != LEAF]
+            proba += self.value[node]
+
+        proba /= len(self.roots)
+        return proba
+
+    def _predict_all_trees(self, X):
+        # Every tree at once: one (n_samples, n_trees) node matrix advanced a
+        # level per step, so a single resume costs ~depth NumPy calls instead
+        # of n_trees * depth.
+        n_samples = X.shape[0]
+        node = np.broadcast_to(self.roots, (n_samples, len(self.roots))).copy()
+        sample = np.broadcast_to(np.arange(n_samples)[:, np.newaxis], node.shape)
+        internal = self.children_left[node] != LEAF
+        while internal.any():
+            current = node[internal]
+            go_left = X[sample[internal], self.feature[current]] <= self.threshold[current]
+            node[internal] = np.where(go_left, self.children_left[current], self.children_right[current])
+            internal = self.children_left[node] != LEAF
+
+        # Accumulate tree by tree, in order, like RandomForestClassifier does
+        leaf_values = self.value[node]
+        proba = np.zeros((n_samples, self.value.shape[1]), dtype=np.float64)
+        for t in range(leaf_values.shape[1]):
+            proba += leaf_values[:, t]
+        proba /= len(self.roots)
+        return proba
@@ -0,0 +1,231 @@
+import re
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+# Full-text job search. On SQLite, migration 0016 creates an FTS5 table,
+# recruitment_job_search, with one row per JobListing (rowid = job id)
+# holding its title, description, required skills and company name.
+# recruitment.signals keeps it in step with job and company saves and
+# deletes; writes that bypass them (queryset.update(), raw SQL) need
+# `python manage.py rebuild_job_search`. Triggers would cover those too,
+# but SQLite migrations rebuild a table to alter it, which drops them.
+# Results are ranked by bm25 with matches in the title weighted highest.
+# Other databases fall back to a plain icontains filter.
+#
+# bm25 has to score every match before the best can be picked, which for a
+# word in a fifth of a million listings takes half a second. Only the
+# newest JOB_SEARCH_CANDIDATES matches (by job id) are ranked: finding where
+# they start walks the index in rowid order without scoring anything, so
+# broad queries cost about what selective ones do. An older job can then
+# match better and still not be shown; results say when that happened
+# (Results.truncated) and the search page tells the user to narrow it.
+
+TABLE = 'recruitment_job_search'
+
+# bm25 column weights: title, description, skills, company
+WEIGHTS = (10.0, 1.0, 5.0, 3.0)
+
+# Query words considered; more rarely narrows anything and costs a lookup each
+MAX_TERMS = 8
+
+# highlight()/snippet() mark matches with these; they cannot occur in the
+# escaped text, so the markup is added after escaping
+_OPEN, _CLOSE = '\x02', '\x03'
+
+
+class Results(list):
+    """
+    search_jobs() results. `truncated` is True when more jobs matched than
+    the newest candidates() that were ranked.
+    """
+    truncated = False
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def candidates():
+    """Newest matching jobs that are ranked; older matches are not shown."""
+    return getattr(settings, 'JOB_SEARCH_CANDIDATES', 5000)
+
+
+def terms(text):
+    return re.findall(r'\w+', (text or '').lower())[:MAX_TERMS]
+
+
+def match_expression(text):
+    """
+    The FTS5 query for what a user typed: every word must match, the last
+    one as a prefix while it is still being typed ("pyth" finds python).
+    Words are quoted, so FTS5 syntax in the input is searched for literally.
+    Returns '' when there is nothing to search for.
+    """
+    words = terms(text)
+    if not words:
+        return ''
+    quoted = [f'"{word}"' for word in words]
+    if text == text.rstrip():
+        quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _marked(text):
+    html = escape(text or '').replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>')
+    return mark_safe(html)
+
+
+def search_jobs(text, job_type='', work_mode='', open_only=True, limit=20, offset=0):
+    """
+    JobListings matching `text`, best first, with the company loaded and
+    `title_html` / `snippet_html` (matches in <mark>) and `search_rank` set.
+    Two queries against the index and one for the rows.
+    """
+    if not available():
+        return _fallback(text, job_type, work_mode, open_only, limit, offset)
+    match = match_expression(text)
+    if not match:
+        return Results()
+
+    conditions = [f'{TABLE} MATCH %s']
+    params = [match]
+    if job_type:
+        conditions.append('job.job_type = %s')
+        params.append(job_type)
+    if work_mode:
+        conditions.append('job.work_mode = %s')
+        params.append(work_mode)
+    if open_only:
+        conditions.append('job.deadline >= %s')
+        params.append(timezone.now().date().isoformat())
+    where = ' AND '.join(conditions)
+
+    with connection.cursor() as cursor:
+        # 1. Newest match that is not among the candidates, if any
+        cursor.execute(
+            f"""
+            SELECT {TABLE}.rowid FROM {TABLE}
+            JOIN recruitment_joblisting job ON job.id = {TABLE}.rowid
+            WHERE {where}
+            ORDER BY {TABLE}.rowid DESC
+            LIMIT 1 OFFSET %s
+            """,
+            params + [candidates()],
+        )
+        row = cursor.fetchone()
+        truncated = row is not None
+        after_id = row[0] if truncated else 0
+
+        # 2. Rank those, with highlights for the page shown
+        cursor.execute(
+            f"""
+            SELECT {TABLE}.rowid,
+                   bm25({TABLE}, {', '.join(map(str, WEIGHTS))}) AS search_rank,
+                   highlight({TABLE}, 0, %s, %s),
+                   snippet({TABLE}, 1, %s, %s, '…', 24)
+            FROM {TABLE}
+            JOIN recruitment_joblisting job ON job.id = {TABLE}.rowid
+            WHERE {where} AND {TABLE}.rowid > %s
+            ORDER BY search_rank
+            LIMIT %s OFFSET %s
+            """,
+            [_OPEN, _CLOSE, _OPEN, _CLOSE] + params + [after_id, limit, offset],
+        )
+        rows = cursor.fetchall()
+
+    from recruitment.models import JobListing
+
+    jobs = JobListing.objects.select_related('company').in_bulk([row[0] for row in rows])
+    results = Results()
+    results.truncated = truncated
+    for job_id, rank, title, snippet in rows:
+        job = jobs.get(job_id)
+        if job is None:
+            continue  # deleted in between
+        job.search_rank = rank
+        job.title_html = _marked(title)
+        job.snippet_html = _marked(snippet)
+        results.append(job)
+    return results
+
+
+def _fallback(text, job_type, work_mode, open_only, limit, offset):
+    from recruitment.models import JobListing
+
+    words = terms(text)
+    if not words:
+        return Results()
+    jobs = JobListing.objects.select_related('company')
+    for word in words:
+        jobs = jobs.filter(
+            Q(title__icontains=word) | Q(description__icontains=word)
+            | Q(required_skills__icontains=word) | Q(company__name__icontains=word)
+        )
+    if job_type:
+        jobs = jobs.filter(job_type=job_type)
+    if work_mode:
+        jobs = jobs.filter(work_mode=work_mode)
+    if open_only:
+        jobs = jobs.filter(deadline__gte=timezone.now().date())
+    results = Results(jobs.order_by('-created_at', '-id')[offset:offset + limit])
+    for job in results:
+        job.search_rank = None
+        job.title_html = escape(job.title)
+        job.snippet_html = escape(' '.join(job.description.split()[:24]))
+    return results
+
+
+def index_job(job):
+    """
+    Adds or replaces a job's entry in the search table.
+    """
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [job.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, title, description, skills, company) VALUES (%s, %s, %s, %s, %s)',
+            [job.pk, job.title, job.description, job.required_skills, job.company.name],
+        )
+
+
+def unindex_job(job_id):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [job_id])
+
+
+def rename_company(company):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {TABLE} SET company = %s WHERE rowid IN (SELECT id FROM recruitment_joblisting WHERE company_id = %s)',
+            [company.name, company.pk],
+        )
+
+
+def rebuild():
+    """
+    Refills the search table from the job and company tables, for use
+    after writes that bypassed the signals (e.g. queryset.update()).
+    Returns the number of jobs indexed.
+    """
+    if not available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(
+            f"""
+            INSERT INTO {TABLE} (rowid, title, description, skills, company)
+            SELECT job.id, job.title, job.description, job.required_skills, company.name
+            FROM recruitment_joblisting job
+            JOIN recruitment_company company ON company.id = job.company_id
+            """
+        )
+        return cursor.rowcount
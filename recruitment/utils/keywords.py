@@ -0,0 +1,203 @@
+import re
+
+# Keyword vocabulary for structured resume features. Each entry is
+# (spellings, label); one spelling may feed several categories (e.g. 'python'
+# is both a skill and a hint for the job role).
+#
+# Labels for education, role and certifications use the spellings found in
+# AI_Resume_Screening.csv so the model's OneHotEncoder recognises them.
+# Within a category the earliest entry wins, mirroring the old chain of
+# `if ... in text` checks.
+
+EDUCATION = [
+    (['b.tech', 'btech', 'b. tech', 'b tech'], 'B.Tech'),
+    (['m.tech', 'mtech', 'm. tech', 'm tech'], 'M.Tech'),
+    (['bca'], 'BCA'),
+    (['mca'], 'MCA'),
+    (['bsc', 'b.sc', 'b. sc'], 'B.Sc'),
+    (['msc', 'm.sc', 'm. sc'], 'M.Sc'),
+    (['mba'], 'MBA'),
+    (['phd', 'ph.d', 'ph. d'], 'PhD'),
+    (['bachelor', 'bachelors', "bachelor's"], 'Bachelor'),
+    (['master', 'masters', "master's"], 'Master'),
+    (['diploma'], 'Diploma'),
+]
+
+JOB_ROLES = [
+    (['data scientist'], 'Data Scientist'),
+    (['ai researcher', 'machine learning researcher'], 'AI Researcher'),
+    (['cybersecurity analyst', 'cyber security analyst', 'security analyst'], 'Cybersecurity Analyst'),
+    (['software engineer'], 'Software Engineer'),
+    (['python'], 'Python Developer'),
+    (['java'], 'Java Developer'),
+    (['web'], 'Web Developer'),
+]
+DEFAULT_JOB_ROLE = 'Developer'
+
+CERTIFICATIONS = [
+    (['aws certified', 'aws certification'], 'AWS Certified'),
+    (['google ml', 'google machine learning'], 'Google ML'),
+    (['deep learning specialization'], 'Deep Learning Specialization'),
+]
+DEFAULT_CERTIFICATION = 'None'
+
+SKILLS = [
+    (['python'], 'Python'),
+    (['sql'], 'SQL'),
+    (['java'], 'Java'),
+    (['javascript', 'js'], 'JavaScript'),
+    (['typescript'], 'TypeScript'),
+    (['c++'], 'C++'),
+    (['c#'], 'C#'),
+    (['react', 'reactjs', 'react.js'], 'React'),
+    (['angular'], 'Angular'),
+    (['vue', 'vuejs', 'vue.js'], 'Vue'),
+    (['node', 'nodejs', 'node.js'], 'Node.js'),
+    (['html', 'html5'], 'HTML'),
+    (['css', 'css3'], 'CSS'),
+    (['django'], 'Django'),
+    (['flask'], 'Flask'),
+    (['spring boot'], 'Spring Boot'),
+    (['machine learning'], 'Machine Learning'),
+    (['deep learning'], 'Deep Learning'),
+    (['nlp', 'natural language processing'], 'NLP'),
+    (['tensorflow'], 'TensorFlow'),
+    (['pytorch'], 'Pytorch'),
+    (['scikit-learn', 'sklearn'], 'scikit-learn'),
+    (['pandas'], 'Pandas'),
+    (['numpy'], 'NumPy'),
+    (['ethical hacking'], 'Ethical Hacking'),
+    (['cybersecurity', 'cyber security'], 'Cybersecurity'),
+    (['networking'], 'Networking'),
+    (['linux'], 'Linux'),
+    (['docker'], 'Docker'),
+    (['kubernetes', 'k8s'], 'Kubernetes'),
+    (['aws', 'amazon web services'], 'AWS'),
+    (['azure'], 'Azure'),
+    (['git'], 'Git'),
+]
+
+# "5 years", "3+ yrs", "2.5 years" (the largest mention wins)
+EXPERIENCE_YEARS = r'(?P<years>\d{1,2}(?:\.\d)?)\+?\s?(?:years?|yrs?)'
+MAX_EXPERIENCE_YEARS = 50
+
+# Separator used to scan a whole batch in one pass; it can never be part of
+# a keyword match.
+_BATCH_SEPARATOR = '\n\x00\n'
+
+
+def _trie_pattern(words):
+    """
+    Regex matching exactly `words`, longest first, built from a character trie.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A word may end here, but only after trying to continue it
+        return f'(?:{body})?' if '' in node else body
+
+    return emit(trie)
+
+
+class KeywordMatcher:
+    """
+    Extracts education, job role, certification, skill hits and years of
+    experience from resume text with a single compiled regular expression,
+    in one pass and without per-keyword loops. Keywords only match whole
+    words, so 'bca' no longer matches inside 'abcam' and 'java' does not
+    match 'javascript'.
+    """
+
+    def __init__(self):
+        categories = (
+            ('education', EDUCATION),
+            ('job_role', JOB_ROLES),
+            ('certifications', CERTIFICATIONS),
+            ('skills', SKILLS),
+        )
+
+        # Every spelling maps to the (category, priority, label) tags it
+        # stands for.
+        self._tags = {}
+        for category, entries in categories:
+            for priority, (spellings, label) in enumerate(entries):
+                for spelling in spellings:
+                    self._tags.setdefault(spelling, []).append((category, priority, label))
+
+        # The spellings are compiled as a trie rather than a flat alternation
+        # so the regex engine never retries shared prefixes; the trie also
+        # prefers the longest spelling ('deep learning specialization' over
+        # 'deep learning').
+        self._regex = re.compile(
+            rf'(?<![a-z0-9])(?:{EXPERIENCE_YEARS}|{_trie_pattern(self._tags)})(?![a-z0-9])'
+        )
+
+    def _empty_hits(self):
+        return {'education': None, 'job_role': None, 'certifications': None, 'skills': set(), 'experience_years': 0.0}
+
+    def _add(self, hits, m):
+        years = m.group('years')
+        if years is not None:
+            years = float(years)
+            if years <= MAX_EXPERIENCE_YEARS:
+                hits['experience_years'] = max(hits['experience_years'], years)
+            return
+        for category, priority, label in self._tags[m.group()]:
+            if category == 'skills':
+                hits['skills'].add(label)
+            elif hits[category] is None or priority < hits[category][0]:
+                hits[category] = (priority, label)
+
+    def _finish(self, hits):
+        return {
+            'education': hits['education'][1] if hits['education'] else 'Unknown',
+            'job_role': hits['job_role'][1] if hits['job_role'] else DEFAULT_JOB_ROLE,
+            'certifications': hits['certifications'][1] if hits['certifications'] else DEFAULT_CERTIFICATION,
+            'skills': sorted(hits['skills']),
+            'experience_years': hits['experience_years'],
+        }
+
+    def match(self, text):
+        hits = self._empty_hits()
+        for m in self._regex.finditer(text.lower()):
+            self._add(hits, m)
+        return self._finish(hits)
+
+    def match_batch(self, texts):
+        """
+        Matches a list of resumes with one scan over their concatenation.
+        """
+        # Lower-case each resume first: lower() can change a string's length,
+        # which would shift the offsets.
+        texts = [text.lower() for text in texts]
+        if not texts:
+            return []
+
+        # Offset at which each following resume starts; matches arrive in
+        # order, so a single cursor assigns them to their resume.
+        ends = []
+        offset = 0
+        for text in texts:
+            offset += len(text) + len(_BATCH_SEPARATOR)
+            ends.append(offset)
+
+        hits = [self._empty_hits() for _ in texts]
+        doc = 0
+        for m in self._regex.finditer(_BATCH_SEPARATOR.join(texts)):
+            while m.start() >= ends[doc]:
+                doc += 1
+            self._add(hits[doc], m)
+        return [self._finish(h) for h in hits]
+
+
+# Compiled once per process
+matcher = KeywordMatcher()
@@ -0,0 +1,181 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import joblib
+from django.conf import settings
+from .forest import FlatForest
+
+# Layout of published model artifacts:
+#
+#   recruitment/data/models/<version>/rf_model.pkl, preprocessor.pkl, ...
+#   recruitment/data/models/CURRENT   <- name of the active <version>
+#
+# A version directory is never modified once it has been published. Training
+# writes a new directory and then atomically replaces CURRENT, so readers see
+# either the old or the new artifact set, never a mix of both.
+
+MODELS_DIRNAME = 'models'
+POINTER_NAME = 'CURRENT'
+
+# Single-bundle format, written next to the pickles of a version:
+#
+#   <version>/bundle/manifest.json     format, classes, array shapes
+#   <version>/bundle/components.joblib tfidf, preprocessor, label encoder
+#   <version>/bundle/forest/*.npy      flattened trees (see utils/forest.py)
+#
+# Everything is stored uncompressed so it can be opened with mmap_mode='r'
+# and shared read-only by every worker process through the page cache.
+BUNDLE_DIRNAME = 'bundle'
+BUNDLE_FORMAT = 1
+
+
+def get_data_dir():
+    return os.path.join(settings.BASE_DIR, 'recruitment', 'data')
+
+
+def get_models_root():
+    return os.path.join(get_data_dir(), MODELS_DIRNAME)
+
+
+def _pointer_path():
+    return os.path.join(get_models_root(), POINTER_NAME)
+
+
+def pointer_key():
+    """
+    Cheap fingerprint of the CURRENT pointer (inode + mtime).
+    os.replace() always produces a new inode, so any publish changes the key.
+    Returns None when no versioned artifacts exist (legacy flat layout).
+    """
+    try:
+        st = os.stat(_pointer_path())
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns)
+
+
+def active_version():
+    """
+    Returns (version, directory) of the artifact set that should be served.
+    Falls back to the legacy flat files in recruitment/data/ when nothing has
+    been published yet.
+    """
+    try:
+        with open(_pointer_path()) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        version = ''
+
+    if version:
+        version_dir = os.path.join(get_models_root(), version)
+        if os.path.isdir(version_dir):
+            return version, version_dir
+    return 'legacy', get_data_dir()
+
+
+def create_version_dir():
+    """
+    Creates an empty, uniquely named staging directory for a new artifact set.
+    The directory name doubles as the model version.
+    """
+    root = get_models_root()
+    os.makedirs(root, exist_ok=True)
+    prefix = time.strftime('%Y%m%d%H%M%S-')
+    return tempfile.mkdtemp(prefix=prefix, dir=root)
+
+
+def publish_version(version_dir):
+    """
+    Atomically makes version_dir the active artifact set.
+    """
+    root = get_models_root()
+    version = os.path.basename(os.path.normpath(version_dir))
+    fd, tmp_path = tempfile.mkstemp(prefix='.CURRENT-', dir=root)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, _pointer_path())
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return version
+
+
+def prune_versions(keep=3):
+    """
+    Deletes old version directories, keeping the newest `keep` ones and
+    always keeping the active version.
+    """
+    root = get_models_root()
+    if not os.path.isdir(root):
+        return []
+    current, _ = active_version()
+    versions = sorted(
+        name for name in os.listdir(root)
+        if os.path.isdir(os.path.join(root, name))
+    )
+    removed = []
+    for name in versions[:-keep] if keep > 0 else versions:
+        if name == current:
+            continue
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        removed.append(name)
+    return removed
+
+
+def write_bundle(version_dir, model, preprocessor, tfidf, label_encoder, feature_columns):
+    bundle_dir = os.path.join(version_dir, BUNDLE_DIRNAME)
+    os.makedirs(bundle_dir, exist_ok=True)
+
+    forest = FlatForest.from_sklearn(model)
+    forest.save(os.path.join(bundle_dir, 'forest'))
+    joblib.dump(
+        {
+            'preprocessor': preprocessor,
+            'tfidf': tfidf,
+            'label_encoder': label_encoder,
+            'feature_columns': feature_columns,
+        },
+        os.path.join(bundle_dir, 'components.joblib'),
+    )
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'classes': [int(c) for c in model.classes_],
+        'n_features_in': int(model.n_features_in_),
+        'n_trees': len(model.estimators_),
+        'n_nodes': int(len(forest.threshold)),
+    }
+    with open(os.path.join(bundle_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return bundle_dir
+
+
+def has_bundle(version_dir):
+    return os.path.exists(os.path.join(version_dir, BUNDLE_DIRNAME, 'manifest.json'))
+
+
+def load_bundle(version_dir, mmap_mode='r'):
+    """
+    Opens a bundle written by write_bundle. Large numeric arrays are
+    memory-mapped read-only rather than copied into this process.
+    """
+    bundle_dir = os.path.join(version_dir, BUNDLE_DIRNAME)
+    with open(os.path.join(bundle_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported model bundle format: {manifest.get('format')}")
+
+    components = joblib.load(os.path.join(bundle_dir, 'components.joblib'), mmap_mode=mmap_mode)
+    components['model'] = FlatForest.load(
+        os.path.join(bundle_dir, 'forest'),
+        classes=manifest['classes'],
+        n_features_in=manifest['n_features_in'],
+        mmap_mode=mmap_mode,
+    )
+    return components
@@ -0,0 +1,94 @@
+import base64
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+# Keyset ("seek") pagination. Instead of OFFSET, which makes the database
+# walk past every earlier row, each page starts strictly after the sort key
+# of the previous page's last row, so page 500 costs the same as page 1 and
+# rows inserted meanwhile never shift or repeat entries.
+#
+# `ordering` is a list of field names as for order_by() ('-created_at',
+# 'id'); it must end in a unique field so the key is total. The cursor
+# handed to templates is the last row's key, JSON-encoded and base64'd.
+
+
+def encode_cursor(values):
+    raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """
+    The key values in `cursor`, converted back to Python types, or None if
+    the cursor is missing or malformed (which then means "first page").
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(ordering):
+        return None
+    converted = []
+    for name, value in zip(ordering, values):
+        try:
+            field = model._meta.get_field(name.lstrip('-'))
+            converted.append(field.to_python(value) if value is not None else None)
+        except FieldDoesNotExist:
+            converted.append(value)  # an annotation; JSON types are enough
+        except (ValidationError, TypeError, ValueError):
+            # A crafted cursor, e.g. a number where a datetime belongs
+            return None
+    return converted
+
+
+def _after(ordering, values):
+    # (a > x) OR (a = x AND b > y) OR ... with the direction of each field
+    condition = Q()
+    for i, (name, value) in enumerate(zip(ordering, values)):
+        field = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        term = Q(**{f'{field}__{lookup}': value})
+        for earlier, earlier_value in zip(ordering[:i], values[:i]):
+            term &= Q(**{earlier.lstrip('-'): earlier_value})
+        condition |= term
+    return condition
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, is_first):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.is_first = is_first
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def keyset_page(queryset, ordering, cursor=None, page_size=20):
+    """
+    One page of `queryset` in `ordering`, starting after `cursor`.
+    Runs a single query (page_size + 1 rows, to know if there is more).
+    """
+    values = decode_cursor(cursor, queryset.model, ordering)
+    queryset = queryset.order_by(*ordering)
+    if values is not None:
+        queryset = queryset.filter(_after(ordering, values))
+    items = list(queryset[:page_size + 1])
+
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, name.lstrip('-')) for name in ordering])
+    return KeysetPage(items, next_cursor, is_first=values is None)
@@ -0,0 +1,275 @@
+import atexit
+import io
+import multiprocessing
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from . import resume_parser
+
+# Resume parsing runs in a small pool of long-lived worker processes instead
+# of inside the web worker. A malformed or hostile PDF can make pypdf or
+# pdfminer spin or allocate without bound; in the pool it only costs one
+# parse slot:
+#
+#   - each file gets PARSER_TIMEOUT_SECONDS of wall-clock time, after which
+#     the worker is killed and replaced;
+#   - each worker's address space is capped at PARSER_MEMORY_LIMIT_MB
+#     (RLIMIT_AS, where the platform supports it), so runaway allocation ends
+#     in a MemoryError inside the worker rather than the OOM killer;
+#   - workers are recycled after PARSER_MAX_TASKS_PER_WORKER files.
+#
+# Outcomes are counted per reason (ok, empty, timeout, memory, crash, error).
+# The last four raise ParseFailed: they say nothing about the file, may not
+# happen on a retry, and so must never be stored as its text.
+
+FAILURES = ('timeout', 'memory', 'crash', 'error')
+
+
+class ParseFailed(Exception):
+    def __init__(self, reason, filename=None):
+        super().__init__(f"Parsing {filename or 'resume'} failed ({reason})")
+        self.reason = reason
+
+
+def _limit_memory(limit_bytes):
+    if not limit_bytes:
+        return
+    try:
+        import resource
+    except ImportError:
+        return  # e.g. Windows: run without a cap
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, limit_bytes))
+    except (ValueError, OSError) as e:
+        print(f"Could not limit parser memory: {e}")
+
+
+def _worker_main(conn, memory_limit_bytes):
+    _limit_memory(memory_limit_bytes)
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        source, filename, max_pages, max_chars, plain_text_fallback = job
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        try:
+            text = resume_parser.extract_text(
+                source, filename=filename, max_pages=max_pages, max_chars=max_chars,
+                plain_text_fallback=plain_text_fallback,
+            )
+        except MemoryError:
+            # The heap may be in a bad state; report and let the pool replace us
+            conn.send(('memory', ''))
+            return
+        except Exception as e:
+            conn.send(('error', str(e)))
+            continue
+        conn.send(('ok' if text.strip() else 'empty', text))
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.tasks = 0
+
+
+class ParserPool:
+    """
+    Fixed-size pool of sandboxed parser processes. parse() is thread-safe and
+    blocks until a worker is free; map() keeps every worker busy.
+    """
+
+    def __init__(self, workers=None, timeout=None, memory_limit_mb=None, max_tasks_per_worker=None):
+        self.size = max(1, workers or getattr(settings, 'PARSER_POOL_WORKERS', 2))
+        self.timeout = timeout or getattr(settings, 'PARSER_TIMEOUT_SECONDS', 30)
+        memory_limit_mb = memory_limit_mb if memory_limit_mb is not None else getattr(settings, 'PARSER_MEMORY_LIMIT_MB', 1024)
+        self.memory_limit_bytes = memory_limit_mb * 1024 * 1024
+        self.max_tasks_per_worker = max_tasks_per_worker or getattr(settings, 'PARSER_MAX_TASKS_PER_WORKER', 200)
+        self.counts = Counter()
+        self._counts_lock = threading.Lock()
+        # 'spawn' so workers never inherit the web process's threads, locks
+        # or database connections.
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = queue.Queue()
+        self._closed = False
+        for _ in range(self.size):
+            self._idle.put(self._start_worker())
+
+    def _start_worker(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child_conn, self.memory_limit_bytes), daemon=True)
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def _stop_worker(self, worker, graceful=False):
+        try:
+            if graceful:
+                worker.conn.send(None)
+                worker.process.join(1)
+        except (OSError, ValueError):
+            pass
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(1)
+        worker.conn.close()
+
+    def _count(self, reason):
+        with self._counts_lock:
+            self.counts[reason] += 1
+
+    def parse(self, source, filename=None, max_pages=None, max_chars=None, plain_text_fallback=False):
+        """
+        Text of a resume given as a path, bytes or a file-like object (read
+        in full and sent to the worker); "" if the file has none. Raises
+        ParseFailed on a timeout, crash, memory limit or error.
+        """
+        if hasattr(source, 'temporary_file_path'):
+            # Spooled to disk by the upload handler: let the worker read it
+            filename = filename or source.name
+            source = source.temporary_file_path()
+        elif not isinstance(source, (str, bytes)):
+            filename = filename or getattr(source, 'name', None)
+            source.seek(0)
+            source = source.read()
+        if filename is None and isinstance(source, str):
+            filename = source
+        max_pages, max_chars = resume_parser._budgets(max_pages, max_chars)
+        job = (source, filename, max_pages, max_chars, plain_text_fallback)
+
+        worker = self._idle.get()
+        replace = False
+        try:
+            try:
+                worker.conn.send(job)
+                if worker.conn.poll(self.timeout):
+                    reason, text = worker.conn.recv()
+                else:
+                    reason, text = 'timeout', ''
+                    print(f"Parsing {filename} timed out after {self.timeout}s; restarting parser worker.")
+            except (EOFError, OSError, BrokenPipeError):
+                # Killed from outside (OOM killer, segfault in a C extension...)
+                reason, text = 'crash', ''
+                print(f"Parser worker died while parsing {filename}; restarting it.")
+            worker.tasks += 1
+            replace = reason in ('timeout', 'crash', 'memory') or worker.tasks >= self.max_tasks_per_worker
+            if reason == 'memory':
+                print(f"Parsing {filename} exceeded the parser memory limit; restarting parser worker.")
+            self._count(reason)
+        finally:
+            if replace or not worker.process.is_alive():
+                self._stop_worker(worker, graceful=not replace)
+                worker = self._start_worker()
+            self._idle.put(worker)
+        if reason in FAILURES:
+            raise ParseFailed(reason, filename)
+        return text
+
+    def map(self, sources, filenames=None):
+        """
+        Texts for many sources, in order, with None for those that failed
+        (see parse). `filenames` (aligned with sources) is needed when the
+        sources are bytes.
+        """
+        sources = list(sources)
+        filenames = list(filenames) if filenames is not None else [None] * len(sources)
+        if len(sources) <= 1:
+            return [_parse_or_none(self, source, filename) for source, filename in zip(sources, filenames)]
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(lambda source, filename: _parse_or_none(self, source, filename), sources, filenames))
+
+    def stats(self):
+        with self._counts_lock:
+            return {'workers': self.size, **self.counts}
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._stop_worker(worker, graceful=True)
+
+
+class InlineParser:
+    """
+    Same interface, parsing in the calling process (PARSER_POOL_ENABLED = False).
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def parse(self, source, filename=None, max_pages=None, max_chars=None, plain_text_fallback=False):
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        try:
+            text = resume_parser.extract_text(
+                source, filename=filename, max_pages=max_pages, max_chars=max_chars,
+                plain_text_fallback=plain_text_fallback,
+            )
+        except MemoryError:
+            self.counts['memory'] += 1
+            raise ParseFailed('memory', filename)
+        except Exception as e:
+            print(f"Error parsing {filename}: {e}")
+            self.counts['error'] += 1
+            raise ParseFailed('error', filename)
+        self.counts['ok' if text.strip() else 'empty'] += 1
+        return text
+
+    def map(self, sources, filenames=None):
+        sources = list(sources)
+        filenames = list(filenames) if filenames is not None else [None] * len(sources)
+        return [_parse_or_none(self, source, filename) for source, filename in zip(sources, filenames)]
+
+    def stats(self):
+        return {'workers': 0, **self.counts}
+
+    def close(self):
+        pass
+
+
+def _parse_or_none(pool, source, filename):
+    try:
+        return pool.parse(source, filename)
+    except ParseFailed:
+        return None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_parser_pool():
+    """
+    Process-wide parser pool, started on first use.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if getattr(settings, 'PARSER_POOL_ENABLED', True):
+                    _pool = ParserPool()
+                    atexit.register(_pool.close)
+                else:
+                    _pool = InlineParser()
+    return _pool
+
+
+def parse(source, **kwargs):
+    return get_parser_pool().parse(source, **kwargs)
+
+
+def pool_stats():
+    # Does not start the pool just to report on it
+    return _pool.stats() if _pool is not None else None
@@ -3,146 +3,350 @@ import pandas as pd
 import numpy as np
 import os
 import re
+import threading
+import scipy.sparse as sp
+from sklearn.preprocessing import FunctionTransformer
 from django.conf import settings
+from . import model_store
+from .forest import FlatForest
+from .job_index import job_relevance
+from .keywords import matcher as keyword_matcher
+
+TFIDF_PREFIX = 'skill_tfidf_'
+# Largest batch the 'auto' evaluator sends to the flat forest
+FLAT_EVALUATOR_MAX_BATCH = 256
 
 class Ranker:
-    def __init__(self):
-        self.model_dir = os.path.join(settings.BASE_DIR, 'recruitment', 'data')
+    def __init__(self, model_dir=None, version=None, sparse=True, evaluator=None, artifact_format=None):
+        if model_dir is None:
+            version, model_dir = model_store.active_version()
+        self.model_dir = model_dir
+        self.version = version or 'legacy'
         self.model = None
         self.preprocessor = None
         self.tfidf = None
         self.label_encoder = None
+        self.artifact_format = None
+        self.positive_idx = 0
+        self.sparse = sparse
+        # 'auto' (flat evaluator for small batches), 'flat' or 'sklearn'
+        self.evaluator = evaluator or getattr(settings, 'RANKER_EVALUATOR', 'auto')
+        self.requested_format = artifact_format or getattr(settings, 'RANKER_ARTIFACT_FORMAT', 'bundle')
+        self.flat_model = None
+        self._sparse_plan = None
+        self._skills_in_preprocessor = False
         self.initialized = False
         self._load_models()
 
     def _load_models(self):
         try:
+            if self._use_bundle():
+                components = model_store.load_bundle(self.model_dir)
+                self.model = components['model']
+                self.preprocessor = components['preprocessor']
+                self.tfidf = components['tfidf']
+                self.label_encoder = components['label_encoder']
+                self._finish_loading('bundle')
+                return
+
             rf_path = os.path.join(self.model_dir, 'rf_model.pkl')
             if os.path.exists(rf_path):
                 self.model = joblib.load(rf_path)
                 self.preprocessor = joblib.load(os.path.join(self.model_dir, 'preprocessor.pkl'))
                 self.tfidf = joblib.load(os.path.join(self.model_dir, 'tfidf.pkl'))
                 self.label_encoder = joblib.load(os.path.join(self.model_dir, 'label_encoder.pkl'))
-                self.initialized = True
-                print("Resume Ranking Models loaded successfully.")
+                self._finish_loading('pickle')
             else:
                 print("Resume Ranking Models not found. Please train the model first.")
         except Exception as e:
             print(f"Error loading models: {e}")
 
+    def _use_bundle(self):
+        # The memory-mapped bundle lets all gunicorn workers share one copy of
+        # the model; RANKER_ARTIFACT_FORMAT = 'pickle' forces the sklearn objects.
+        if self.requested_format != 'bundle':
+            return False
+        return model_store.has_bundle(self.model_dir)
+
+    def _finish_loading(self, artifact_format):
+        self.artifact_format = artifact_format
+        self.positive_idx = self._positive_index()
+        expected = getattr(self.preprocessor, 'feature_names_in_', [])
+        self._skills_in_preprocessor = 'Skills' in expected
+        self._sparse_plan = self._compile_sparse_plan()
+
+        if isinstance(self.model, FlatForest):
+            self.flat_model = self.model
+        elif self.evaluator in ('auto', 'flat'):
+            self.flat_model = FlatForest.from_sklearn(self.model)
+        self.initialized = True
+        print(f"Resume Ranking Models loaded successfully (version {self.version}, {artifact_format}, {self.evaluator} evaluator).")
+
     def _extract_features(self, text):
         """
         Heuristic extraction of structured features from resume text.
         """
-        text_lower = text.lower()
-        
-        # Education Extraction (Regex for common degrees)
-        education_keywords = ['b.tech', 'm.tech', 'bca', 'mca', 'bsc', 'msc', 'phd', 'bachelor', 'master', 'diploma']
-        education = 'Unknown'
-        for deg in education_keywords:
-            if deg in text_lower:
-                education = deg.upper() # normalization might be needed to match training data
-                break
-        
-        # Simple/Naive Job Role match (This should effectively be the target role)
-        # For now, we return a placeholder. The model's OneHot will likely ignore it if unknown.
-        job_role = 'Developer' 
-        if 'data scientist' in text_lower: job_role = 'Data Scientist'
-        elif 'python' in text_lower: job_role = 'Python Developer'
-        elif 'java' in text_lower: job_role = 'Java Developer'
-        elif 'web' in text_lower: job_role = 'Web Developer'
-        
-        return {
-            'Education': education,
-            'Certifications': 'None', # Difficult to extract without NER
-            'Job Role': job_role,
-            'Skills': text
-        }
+        return self._extract_features_batch([text])[0]
+
+    def _extract_features_batch(self, texts, hits=None):
+        """
+        Structured features for many resumes at once. Education, job role,
+        certifications and experience come from one compiled keyword pass
+        over the whole batch (see utils/keywords.py), unless the caller
+        already has those keyword hits (e.g. from ParsedResume.features).
+        """
+        if hits is None:
+            hits = keyword_matcher.match_batch(texts)
+        features = []
+        for text, resume_hits in zip(texts, hits):
+            features.append({
+                'Education': resume_hits['education'],
+                'Certifications': resume_hits['certifications'],
+                'Job Role': resume_hits['job_role'],
+                'Experience (Years)': resume_hits.get('experience_years', 0.0),
+                'Skills': text
+            })
+        return features
+
+    def _positive_index(self):
+        # LabelEncoder sorts classes alphabetically (Hire, Reject), so look the
+        # positive class up rather than assuming its position.
+        classes = list(self.label_encoder.classes_)
+        if 'Hire' in classes:
+            return classes.index('Hire')
+        if '1' in classes:
+            return classes.index('1')
+        return 0
+
+    @staticmethod
+    def _is_passthrough(transformer):
+        if isinstance(transformer, str):
+            return transformer == 'passthrough'
+        # Newer scikit-learn stores passthrough columns as an identity FunctionTransformer
+        return isinstance(transformer, FunctionTransformer) and transformer.func is None
+
+    def _compile_sparse_plan(self):
+        """
+        Maps every column the fitted ColumnTransformer outputs back to either a
+        structured feature or a TF-IDF vocabulary index, so inference can feed
+        the sparse TF-IDF block straight to the model instead of building a
+        vocabulary-wide dense DataFrame. Returns None for layouts this path
+        does not understand; rank_resumes then uses the dense path.
+        """
+        vocabulary = self.tfidf.vocabulary_
+        plan = []
+        for _, transformer, columns in self.preprocessor.transformers_:
+            if isinstance(transformer, str) and transformer == 'drop':
+                continue
+            if isinstance(columns, str):
+                # A single text column fed to a vectorizer (sparse-trained models)
+                if self._is_passthrough(transformer):
+                    return None
+                plan.append(('transform', transformer, columns))
+                continue
+
+            columns = list(columns)
+            if not columns:
+                continue
+            is_tfidf = [isinstance(col, str) and col.startswith(TFIDF_PREFIX) for col in columns]
+
+            if not self._is_passthrough(transformer):
+                if any(is_tfidf):
+                    return None
+                plan.append(('transform', transformer, columns))
+                continue
+
+            # Passthrough output = hstack([structured, tfidf]) re-ordered to
+            # match the column order seen at fit time.
+            structured = [col for col, tf in zip(columns, is_tfidf) if not tf]
+            with_tfidf = any(is_tfidf)
+            order = []
+            for col, tf in zip(columns, is_tfidf):
+                if tf:
+                    term = col[len(TFIDF_PREFIX):]
+                    if term not in vocabulary:
+                        return None
+                    order.append(len(structured) + vocabulary[term])
+                else:
+                    order.append(structured.index(col))
+            if order == list(range(len(structured) + (len(vocabulary) if with_tfidf else 0))):
+                order = None
+            plan.append(('passthrough', structured, with_tfidf, order))
+        return plan
+
+    def _align_columns(self, df):
+        """
+        Adds structured columns the preprocessor was fitted on but which cannot
+        be extracted from raw resume text (e.g. 'Projects Count'), so the
+        transform does not fail on missing columns.
+        """
+        expected = getattr(self.preprocessor, 'feature_names_in_', [])
+        for col in expected:
+            if col not in df.columns and not col.startswith(TFIDF_PREFIX) and col != 'Skills':
+                df[col] = 0.0
+        return df
+
+    def _transform_dense(self, df, skills_tfidf):
+        skills_tfidf_df = pd.DataFrame(
+            skills_tfidf.toarray(),
+            columns=[TFIDF_PREFIX + col for col in self.tfidf.get_feature_names_out()]
+        )
+        df_processed = pd.concat([df, skills_tfidf_df], axis=1)
+        return self.preprocessor.transform(df_processed)
+
+    def _transform_sparse(self, df, skills_tfidf):
+        blocks = []
+        for step in self._sparse_plan:
+            if step[0] == 'transform':
+                _, transformer, columns = step
+                block = transformer.transform(df[columns])
+                blocks.append(block if sp.issparse(block) else sp.csr_matrix(block))
+            else:
+                _, structured_columns, with_tfidf, order = step
+                block = sp.csr_matrix(df[structured_columns].to_numpy(dtype=np.float64))
+                if with_tfidf:
+                    block = sp.hstack([block, skills_tfidf], format='csr')
+                if order is not None:
+                    block = block[:, order]
+                blocks.append(block)
+        return sp.hstack(blocks, format='csr')
+
+    def encode(self, texts, hits=None):
+        """
+        Turns resume texts into the feature matrix the model was trained on.
+        """
+        return self.encode_features(pd.DataFrame(self._extract_features_batch(list(texts), hits)))
+
+    def encode_features(self, df, skills_tfidf=None):
+        """
+        Second half of encode(): extracted features -> model input matrix.
+        `skills_tfidf` is the vectorizer output for df['Skills'], if already
+        computed; models trained in sparse mode ignore it.
+        """
+        # 1. TF-IDF feature generation (kept sparse). Models trained in sparse
+        # mode run the vectorizer inside the preprocessor instead.
+        if self._skills_in_preprocessor:
+            skills_tfidf = None
+        else:
+            skills = df.pop('Skills')
+            if skills_tfidf is None:
+                skills_tfidf = self.tfidf.transform(skills)
+
+        # 2. Preprocessing (OneHot + Passthrough)
+        df = self._align_columns(df)
+        if self.sparse and self._sparse_plan is not None:
+            return self._transform_sparse(df, skills_tfidf)
+        if self._skills_in_preprocessor:
+            return self.preprocessor.transform(df)
+        return self._transform_dense(df, skills_tfidf)
+
+    def predict_scores(self, texts, hits=None):
+        """
+        Returns the 'Hire' probability for each resume text, in input order.
+        Raises on failure; rank_resumes is the forgiving wrapper used by views.
+        """
+        return self._predict_proba(self.encode(texts, hits))[:, self.positive_idx]
+
+    def _predict_proba(self, X):
+        # The flat evaluator wins on the small batches web requests score;
+        # sklearn's compiled trees win on big offline batches.
+        flat = self.flat_model
+        if flat is not None and (
+            flat is self.model or self.evaluator == 'flat' or X.shape[0] <= FLAT_EVALUATOR_MAX_BATCH
+        ):
+            return flat.predict_proba(X)
+        return self.model.predict_proba(X)
+
+    def score_resumes(self, texts, requirements=None, hits=None):
+        """
+        Scores resume texts, in input order, against optional requirements
+        (free text, a JobListing, or job ids aligned with texts). `hits` are
+        optional precomputed keyword hits aligned with texts.
+
+        Returns (scores, hire_probs, relevance). The final score blends the
+        model's 'Hire' probability with job relevance using
+        RANKER_RELEVANCE_WEIGHT. Either component may be None when it is
+        unavailable, in which case the other one is used on its own.
+        """
+        hire_probs = self.predict_scores(texts, hits) if self.initialized else None
+        relevance = job_relevance(texts, requirements)
+        return self.blend(hire_probs, relevance), hire_probs, relevance
+
+    @staticmethod
+    def blend(hire_probs, relevance):
+        """
+        Final score from the two components; see score_resumes.
+        """
+        if relevance is None:
+            return hire_probs
+        if hire_probs is None:
+            return relevance
+        weight = getattr(settings, 'RANKER_RELEVANCE_WEIGHT', 0.5)
+        return (1 - weight) * hire_probs + weight * relevance
 
     def rank_resumes(self, resumes, requirements):
         """
         resumes: List of dictionaries [{'filename': 'name', 'text': 'content'}, ...]
-        requirements: String containing job requirements (used here as context if needed)
+        requirements: Job requirements as free text or a JobListing
         """
         if not resumes:
             return []
 
-        # fallback if model not loaded
-        if not self.initialized:
-            print("Model not initialized, returning empty results.")
-            return []
-
-        results = []
-        
-        # Prepare Data for Prediction
-        data_records = []
-        for resume in resumes:
-            features = self._extract_features(resume['text'])
-            data_records.append(features)
-        
-        df = pd.DataFrame(data_records)
-        
         try:
-            # 1. TF-IDF feature generation
-            # Transform 'Skills' using the loaded vectorizer
-            skills_tfidf = self.tfidf.transform(df['Skills'])
-            skills_tfidf_df = pd.DataFrame(
-                skills_tfidf.toarray(), 
-                columns=['skill_tfidf_' + col for col in self.tfidf.get_feature_names_out()]
-            )
-            
-            # 2. Integrate features
-            # Drop Skills as in training
-            df_processed = pd.concat([df.drop('Skills', axis=1), skills_tfidf_df], axis=1)
-            
-            # 3. Preprocessing (OneHot + Passthrough)
-            # The preprocessor expects the exact same columns as training (minus dropped ones)
-            # We need to ensure df_processed has the columns the preprocessor expects.
-            # ColumnTransformer is robust if columns map correctly by name.
-            
-            X_encoded = self.preprocessor.transform(df_processed)
-            
-            # 4. Prediction
-            # Probabilities for class 1 (Hire)
-            # Check classes_ to be sure index 1 is 'Hire' or similar positive class
-            # Assuming encoded classes [0, 1] or ['Hire', 'Reject'] -> [0, 1]
-            # Usually label encoder sorts alphabetically: Hire, Reject -> Hire=0, Reject=1?
-            # Or Reject, Hire? 
-            # Recruiter Decision: Hire, Reject. 
-            # H comes before R. So 0=Hire, 1=Reject.
-            # Wait, usually we want probability of "Hire".
-            # If 0=Hire, we want proba[:, 0].
-            # I should verify this mapping.
-            
-            # For now, assume a higher score is better.
-            scores = self.model.predict_proba(X_encoded)
-            
-            # Determine which index corresponds to 'Hire' (or positive sentiment)
-            # If label encoder classes are ['Hire', 'Reject'], then index 0 is Hire.
-            # If we want "Hire" probability, we take index 0.
-            # If ['Reject', 'Hire'], index 1 is Hire.
-            # Let's inspect classes if possible, but safely assume we want the 'Hire' class.
-            
-            positive_idx = 0
-            if 'Hire' in self.label_encoder.classes_:
-                positive_idx = list(self.label_encoder.classes_).index('Hire')
-            elif '1' in self.label_encoder.classes_:
-                positive_idx = list(self.label_encoder.classes_).index('1')
-            
-            hire_probs = scores[:, positive_idx]
-            
-            for i, resume in enumerate(resumes):
-                results.append({
-                    'filename': resume['filename'],
-                    'score': float(hire_probs[i]), # ensure native float
-                    'text': resume['text']
-                })
-                
-            # Sort by score descending
-            results.sort(key=lambda x: x['score'], reverse=True)
-            
+            scores, hire_probs, relevance = self.score_resumes([resume['text'] for resume in resumes], requirements)
         except Exception as e:
             print(f"Prediction failed: {e}")
             return []
 
-        return results
\ No newline at end of file
+        # fallback if model not loaded and nothing to match against
+        if scores is None:
+            print("Model not initialized, returning empty results.")
+            return []
+
+        results = []
+        for i, resume in enumerate(resumes):
+            results.append({
+                'filename': resume['filename'],
+                'score': float(scores[i]), # ensure native float
+                'hire_probability': float(hire_probs[i]) if hire_probs is not None else None,
+                'relevance': float(relevance[i]) if relevance is not None else None,
+                'text': resume['text']
+            })
+
+        # Sort by score descending
+        results.sort(key=lambda x: x['score'], reverse=True)
+        return results
+
+
+# One Ranker per worker process. Loading the pickles is expensive, so views
+# share this instance instead of constructing a Ranker per request.
+_shared_ranker = None
+_shared_key = None
+_shared_lock = threading.Lock()
+
+
+def get_ranker():
+    """
+    Returns the process-wide Ranker, building it lazily on first use.
+
+    Every call stats the published CURRENT pointer; when train_resume_model
+    publishes a new version the replacement Ranker is fully loaded first and
+    then swapped in with a single reference assignment. Requests already
+    holding the old instance finish with it, so nobody sees a mix of old and
+    new artifacts.
+    """
+    global _shared_ranker, _shared_key
+
+    key = model_store.pointer_key()
+    ranker = _shared_ranker
+    if ranker is not None and key == _shared_key:
+        return ranker
+
+    with _shared_lock:
+        if _shared_ranker is None or key != _shared_key:
+            candidate = Ranker()
+            # Keep serving the previous model if the new one failed to load
+            if candidate.initialized or _shared_ranker is None or not _shared_ranker.initialized:
+                _shared_ranker = candidate
+            _shared_key = key
+        return _shared_ranker
@@ -0,0 +1,128 @@
+import hashlib
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+from .job_index import get_job_index, vectorize
+from . import resume_store
+
+# Only the most recent uploads describe the applicant well enough, and
+# parsing is the expensive step, so cap how many resumes feed the profile.
+MAX_RESUMES = 3
+VECTOR_TTL = 24 * 60 * 60
+RECOMMENDATION_TTL = 60 * 60
+
+
+def _applicant_inputs(user):
+    """
+    Cheap description of everything a user's recommendations depend on:
+    their resume files, profile text and the jobs they already applied to.
+    """
+    from recruitment.models import Application
+
+    applications = Application.objects.filter(user=user).order_by('-applied_at').values_list('job_id', 'resume')
+    applied_job_ids = set()
+    resumes = []
+    for job_id, resume in applications:
+        applied_job_ids.add(job_id)
+        if resume and resume not in resumes and len(resumes) < MAX_RESUMES:
+            resumes.append(resume)
+
+    profile = getattr(user, 'profile', None)
+    bio = getattr(profile, 'bio', '') or ''
+    profile_resume = getattr(profile, 'resume', None)
+    if profile_resume and profile_resume.name and profile_resume.name not in resumes:
+        resumes.insert(0, profile_resume.name)
+
+    signature = hashlib.sha1(repr((resumes, bio)).encode('utf-8')).hexdigest()
+    return resumes, bio, applied_job_ids, signature
+
+
+def _applicant_vector(user, resumes, bio, signature):
+    """
+    The user's combined resume + profile vector, cached until the inputs
+    change, and whether some resumes are still being parsed. Resumes are
+    never parsed here: unparsed ones are queued (resume_store.parse_later)
+    and left out, and the vector is not cached until they are in.
+    """
+    from django.core.files.storage import default_storage
+
+    key = f'smart_match:vector:{user.pk}:{signature}'
+    vector = cache.get(key)
+    if vector is not None:
+        return vector, False
+
+    texts = [bio]
+    unparsed = []
+    for name in resumes:
+        try:
+            path = default_storage.path(name)
+            parsed = resume_store.stored_for_file(path)
+        except Exception as e:
+            print(f"Could not read resume {name}: {e}")
+            continue
+        if parsed is None:
+            unparsed.append(path)
+        else:
+            texts.append(parsed.text)
+
+    text = ' '.join(t for t in texts if t)
+    vector = vectorize([text]) if text.strip() else False
+    if unparsed:
+        resume_store.parse_later(unparsed)
+    else:
+        cache.set(key, vector, VECTOR_TTL)
+    return vector, bool(unparsed)
+
+
+def recommend_jobs(user, k=10):
+    """
+    Top-k open jobs for an applicant, ranked by similarity between their
+    resumes/profile and each job, excluding jobs they already applied to.
+    Each returned JobListing carries a `match_score` percentage. Returns
+    (jobs, reading), where `reading` means some resumes are still being
+    parsed and the matches do not reflect them yet.
+
+    Results are cached per user and keyed on a signature of the inputs and
+    the job index version, so a new resume, profile edit, application or
+    job posting naturally produces a fresh result.
+    """
+    from recruitment.models import JobListing
+
+    resumes, bio, applied_job_ids, signature = _applicant_inputs(user)
+    if not resumes and not bio.strip():
+        return [], False
+
+    index = get_job_index()
+    today = timezone.now().date()
+    applied_key = hashlib.sha1(repr(sorted(applied_job_ids)).encode('utf-8')).hexdigest()
+    key = f'smart_match:jobs:{user.pk}:{signature}:{applied_key}:{index.version}:{today}:{k}'
+
+    ranked = cache.get(key)
+    reading = False
+    if ranked is None:
+        vector, reading = _applicant_vector(user, resumes, bio, signature)
+        ranked = []
+        if vector is not False:
+            job_ids, scores = index.match_all(vector)
+            if applied_job_ids:
+                keep = ~np.isin(job_ids, list(applied_job_ids))
+                job_ids, scores = job_ids[keep], scores[keep]
+            keep = scores > 0
+            job_ids, scores = job_ids[keep], scores[keep]
+            if len(job_ids) > k:
+                top = np.argpartition(-scores, k)[:k]
+                job_ids, scores = job_ids[top], scores[top]
+            order = np.argsort(-scores, kind='stable')
+            ranked = [(int(job_ids[i]), float(scores[i])) for i in order]
+        if not reading:
+            cache.set(key, ranked, RECOMMENDATION_TTL)
+
+    jobs = JobListing.objects.select_related('company').in_bulk([job_id for job_id, _ in ranked])
+    recommended = []
+    for job_id, score in ranked:
+        job = jobs.get(job_id)
+        if job is None:
+            continue
+        job.match_score = round(score * 100)
+        recommended.append(job)
+    return recommended, reading
@@ -1,27 +1,156 @@
+import io
 import os
-from pdfminer.high_level import extract_text
-import docx
-
-def extract_text_from_pdf(pdf_path):
-    try:
-        return extract_text(pdf_path)
-    except Exception as e:
-        print(f"Error reading PDF {pdf_path}: {e}")
-        return ""
-
-def extract_text_from_docx(docx_path):
-    try:
-        doc = docx.Document(docx_path)
-        return "\n".join([para.text for para in doc.paragraphs])
-    except Exception as e:
-        print(f"Error reading DOCX {docx_path}: {e}")
-        return ""
+from django.conf import settings
 
-def parse_resume(file_path):
-    ext = os.path.splitext(file_path)[1].lower()
-    if ext == '.pdf':
-        return extract_text_from_pdf(file_path)
-    elif ext == '.docx':
-        return extract_text_from_docx(file_path)
+# Single text extraction engine for every resume path (uploads in job_detail,
+# the public resume scorer, background scoring and bulk jobs).
+#
+# Text is produced page by page (paragraph by paragraph for .docx) and
+# collected into a list that is joined once, and extraction stops as soon as
+# the page or character budget is reached, so a 500-page upload costs no more
+# than the first few pages. For PDFs the fast pure-Python pypdf backend is
+# tried first; pdfminer.six, if installed, is the fallback when pypdf raises
+# or finds no text.
+
+PAGE_SEPARATOR = "\n"
+
+
+def _budgets(max_pages, max_chars):
+    if max_pages is None:
+        max_pages = getattr(settings, 'RESUME_MAX_PAGES', 20)
+    if max_chars is None:
+        max_chars = getattr(settings, 'RESUME_MAX_CHARS', 100000)
+    return max_pages, max_chars
+
+
+def _pypdf_pages(source, max_pages):
+    import pypdf
+
+    reader = pypdf.PdfReader(source)
+    for i, page in enumerate(reader.pages):
+        if i >= max_pages:
+            break
+        yield page.extract_text() or ""
+
+
+def _pdfminer_pages(source, max_pages):
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+
+    for layout in extract_pages(source, maxpages=max_pages):
+        yield "".join(element.get_text() for element in layout if isinstance(element, LTTextContainer))
+
+
+def _docx_pages(source, max_pages):
+    import docx
+
+    # .docx has no real pages; each paragraph is a unit and only the
+    # character budget applies.
+    for para in docx.Document(source).paragraphs:
+        yield para.text
+
+
+def _text_pages(source, max_chars):
+    # Enough bytes for max_chars characters of UTF-8
+    data = source.read(max_chars * 4)
+    if isinstance(data, str):
+        yield data
     else:
-        return ""
+        yield data.decode('utf-8', errors='ignore')
+
+
+def _binary_stream(source):
+    # Django's UploadedFile wraps the real file object (BytesIO in memory, a
+    # temporary file on disk); pdfminer only accepts io.IOBase instances.
+    stream = source
+    while not isinstance(stream, io.IOBase) and hasattr(stream, 'file'):
+        stream = stream.file
+    if not isinstance(stream, io.IOBase):
+        source.seek(0)
+        return io.BytesIO(source.read())
+    stream.seek(0)
+    return stream
+
+
+def _collect(pages, max_chars):
+    parts = []
+    total = 0
+    for text in pages:
+        parts.append(text)
+        total += len(text) + len(PAGE_SEPARATOR)
+        if total >= max_chars:
+            break
+    return PAGE_SEPARATOR.join(parts)[:max_chars]
+
+
+def _backends(ext):
+    if ext == '.pdf':
+        backends = [('pypdf', _pypdf_pages)]
+        try:
+            import pdfminer  # noqa: F401 - optional fallback
+            backends.append(('pdfminer', _pdfminer_pages))
+        except ImportError:
+            pass
+        return backends
+    if ext == '.docx':
+        return [('docx', _docx_pages)]
+    return []
+
+
+def extract_text(source, filename=None, max_pages=None, max_chars=None, plain_text_fallback=False):
+    """
+    Text of a resume given as a path or a binary file-like object.
+
+    filename (defaults to the path) decides the format. Unknown formats give
+    "" unless plain_text_fallback is set, in which case the bytes are decoded
+    as UTF-8. Failures are printed and give ""; only MemoryError propagates.
+    """
+    max_pages, max_chars = _budgets(max_pages, max_chars)
+    if filename is None:
+        filename = source if isinstance(source, str) else getattr(source, 'name', '') or ''
+    ext = os.path.splitext(filename)[1].lower()
+
+    backends = _backends(ext)
+    if not backends:
+        if not plain_text_fallback:
+            return ""
+        try:
+            if isinstance(source, str):
+                with open(source, 'rb') as f:
+                    return _collect(_text_pages(f, max_chars), max_chars)
+            source.seek(0)
+            return _collect(_text_pages(source, max_chars), max_chars)
+        except Exception as e:
+            print(f"Error reading resume {filename}: {e}")
+            return ""
+
+    text = ""
+    for name, pages in backends:
+        try:
+            if isinstance(source, str):
+                with open(source, 'rb') as f:
+                    text = _collect(pages(f, max_pages), max_chars)
+            else:
+                text = _collect(pages(_binary_stream(source), max_pages), max_chars)
+        except MemoryError:
+            # Let the parser pool see it and replace the worker
+            raise
+        except Exception as e:
+            print(f"Error reading {ext[1:].upper()} {filename} with {name}: {e}")
+            continue
+        if text.strip():
+            return text
+    return text
+
+
+def parse_resume(file_path):
+    return extract_text(file_path)
+
+
+def parse_uploaded_resume(uploaded_file):
+    """
+    Text of an uploaded (not yet saved) resume, exactly as parse_resume()
+    gives it for the same file. Plain-text files are accepted too, as the
+    public resume scorer does.
+    """
+    return extract_text(uploaded_file, filename=uploaded_file.name, plain_text_fallback=True)
@@ -0,0 +1,174 @@
+import hashlib
+import os
+import re
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Application resumes are stored once per distinct content, under
+#
+#   resumes/<first two hex digits>/<sha256><extension>
+#
+# so a candidate applying to ten jobs with the same CV costs one file. Each
+# file has a StoredFile row counting the applications that reference it
+# (see recruitment.signals). Files are not deleted when the count drops to
+# zero: the same CV may be uploaded again at that very moment, and the
+# upload only takes its reference after the file has been found on disk.
+# `python manage.py sweep_resumes` deletes files that nothing has used for
+# RESUME_SWEEP_GRACE_HOURS instead.
+
+PREFIX = 'resumes'
+HASHED_NAME = re.compile(r'^' + PREFIX + r'/[0-9a-f]{2}/([0-9a-f]{64})(\.[A-Za-z0-9]+)?$')
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hashed_name(content_hash, file_name):
+    ext = os.path.splitext(file_name or '')[1].lower()
+    return f"{PREFIX}/{content_hash[:2]}/{content_hash}{ext}"
+
+
+def content_hash_from_name(name):
+    """
+    The SHA-256 encoded in a content-addressed name, or None for files
+    stored before deduplication.
+    """
+    match = HASHED_NAME.match(name or '')
+    return match.group(1) if match else None
+
+
+def hash_content(content):
+    # ResumeUploadHandler already hashed uploads while they streamed in
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest
+    sha = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        sha.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return sha.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that names files by their SHA-256 and never writes
+    the same content twice. Same location and URLs as the default storage.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is chosen in _save from the content
+        return name
+
+    def _save(self, name, content):
+        content_hash = hash_content(content)
+        target = hashed_name(content_hash, name)
+        # Mark the file as in use before looking for it: a concurrent sweep
+        # has then either deleted it already (and it is written again) or
+        # leaves it alone for the grace period
+        touch(target, content_hash, content.size)
+        if self.exists(target):
+            return target
+        # Write under a unique temporary name and rename into place, so two
+        # requests storing the same new file at once cannot clash; the
+        # loser's rename just replaces identical bytes.
+        partial = super()._save(f"{target}.{uuid.uuid4().hex}.part", content)
+        os.replace(self.path(partial), self.path(target))
+        return target
+
+
+_storage = None
+
+
+def resume_storage():
+    # Callable so migrations refer to it by import path
+    global _storage
+    if _storage is None:
+        _storage = ContentAddressedStorage()
+    return _storage
+
+
+def _increment(name, delta, content_hash=None, size=None):
+    from recruitment.models import StoredFile
+
+    changes = {'touched_at': timezone.now()}
+    if delta:
+        changes['ref_count'] = F('ref_count') + delta
+    if StoredFile.objects.filter(name=name).update(**changes):
+        return
+    try:
+        # Savepoint, so a lost race does not break an enclosing transaction
+        with transaction.atomic():
+            StoredFile.objects.create(
+                name=name,
+                content_hash=content_hash or content_hash_from_name(name) or '',
+                size=size if size is not None else _size(name),
+                ref_count=delta,
+            )
+    except IntegrityError:
+        # Created by a concurrent request in the meantime
+        StoredFile.objects.filter(name=name).update(**changes)
+
+
+def touch(name, content_hash=None, size=None):
+    """
+    Marks a stored file as just used, without adding a reference, so the
+    sweep leaves it alone until the reference is taken.
+    """
+    _increment(name, 0, content_hash, size)
+
+
+def retain(name, size=None):
+    """
+    Records one more reference to a stored file.
+    """
+    if name:
+        _increment(name, 1, size=size)
+
+
+def release(name):
+    """
+    Drops one reference. The file stays until sweep() finds it unused.
+    """
+    from recruitment.models import StoredFile
+
+    if not name:
+        return
+    StoredFile.objects.filter(name=name, ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1, touched_at=timezone.now(),
+    )
+
+
+def sweep(grace=None):
+    """
+    Deletes stored files that have had no references for `grace` (default
+    RESUME_SWEEP_GRACE_HOURS). Returns the number of files deleted.
+    """
+    from recruitment.models import StoredFile
+
+    if grace is None:
+        grace = timedelta(hours=getattr(settings, 'RESUME_SWEEP_GRACE_HOURS', 24))
+    cutoff = timezone.now() - grace
+    unused = StoredFile.objects.filter(ref_count=0, touched_at__lt=cutoff)
+    deleted = 0
+    for name in list(unused.values_list('name', flat=True)):
+        with transaction.atomic():
+            # The row stays locked (on SQLite, the database) until the file
+            # is gone, so an upload of the same content waits for this and
+            # then finds no file and writes it again.
+            if unused.filter(name=name).delete()[0]:
+                resume_storage().delete(name)
+                deleted += 1
+    return deleted
+
+
+def _size(name):
+    try:
+        return resume_storage().size(name)
+    except OSError:
+        return 0
@@ -0,0 +1,197 @@
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.db import IntegrityError
+from .keywords import matcher
+from .parser_pool import ParseFailed, get_parser_pool
+from .resume_storage import content_hash_from_name
+from .skills import link_parsed_resumes
+
+# Bump whenever text extraction or the keyword vocabulary changes in a way
+# that affects stored text or features; existing ParsedResume rows are then
+# ignored and rebuilt on demand.
+PARSER_VERSION = 2
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Background parsing for views that must not wait on the parser (parse_later)
+_background = None
+_queued = set()
+_queued_lock = threading.Lock()
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_file(path):
+    # A missing file just has no hash
+    try:
+        return file_hash(path) if path else ''
+    except OSError:
+        return ''
+
+
+def extract(path):
+    """
+    (text, features) for one resume file, parsed in the sandboxed parser pool.
+    Raises ParseFailed if the pool could not parse it.
+    """
+    text = get_parser_pool().parse(path)
+    return text, matcher.match(text)
+
+
+def _application_path(application):
+    try:
+        return application.resume.path
+    except Exception:
+        return ''
+
+
+def _store(parsed_by_hash, paths_by_hash, pool):
+    # Parse every hash we have no current row for, once, and save the rows
+    from recruitment.models import ParsedResume
+
+    missing = [content_hash for content_hash in paths_by_hash if content_hash not in parsed_by_hash]
+    if not missing:
+        return
+    texts = pool.map([paths_by_hash[content_hash] for content_hash in missing])
+    # Failed parses (None) are not stored, so they are tried again next time
+    parsed = [(content_hash, text) for content_hash, text in zip(missing, texts) if text is not None]
+    if not parsed:
+        return
+    features = matcher.match_batch([text for _, text in parsed])
+    ParsedResume.objects.bulk_create(
+        [
+            ParsedResume(content_hash=content_hash, parser_version=PARSER_VERSION, text=text, features=resume_features)
+            for (content_hash, text), resume_features in zip(parsed, features)
+        ],
+        ignore_conflicts=True,  # another process may have stored the same file meanwhile
+    )
+    stored = list(ParsedResume.objects.filter(
+        content_hash__in=[content_hash for content_hash, _ in parsed], parser_version=PARSER_VERSION,
+    ))
+    link_parsed_resumes(stored)
+    for parsed in stored:
+        parsed_by_hash[parsed.content_hash] = parsed
+
+
+def ensure_parsed(applications, pool=None):
+    """
+    Returns {application id: ParsedResume or None} and links each application
+    to the ParsedResume of its current file.
+
+    Files are always hashed (cheap next to parsing, and free for
+    content-addressed names), so a replaced resume is noticed. Parsing only
+    happens for content that has no row for the current PARSER_VERSION, in
+    the process-wide parser pool unless `pool` is given.
+    """
+    from recruitment.models import Application, ParsedResume
+
+    applications = list(applications)
+    if not applications:
+        return {}
+
+    paths = [_application_path(application) for application in applications]
+    # Content-addressed names carry their hash; only older files are read
+    hashes = [
+        content_hash_from_name(application.resume.name) or _hash_file(path)
+        for application, path in zip(applications, paths)
+    ]
+
+    paths_by_hash = {content_hash: path for content_hash, path in zip(hashes, paths) if content_hash}
+    parsed_by_hash = {
+        parsed.content_hash: parsed
+        for parsed in ParsedResume.objects.filter(content_hash__in=list(paths_by_hash), parser_version=PARSER_VERSION)
+    }
+    _store(parsed_by_hash, paths_by_hash, pool or get_parser_pool())
+
+    result = {}
+    changed = []
+    for application, content_hash in zip(applications, hashes):
+        parsed = parsed_by_hash.get(content_hash)
+        result[application.id] = parsed
+        parsed_id = parsed.id if parsed else None
+        if application.resume_hash != content_hash or application.parsed_resume_id != parsed_id:
+            application.resume_hash = content_hash
+            application.parsed_resume = parsed
+            changed.append(application)
+    if changed:
+        Application.objects.bulk_update(changed, ['resume_hash', 'parsed_resume'])
+    return result
+
+
+def parsed_for_application(application):
+    return ensure_parsed([application])[application.id]
+
+
+def stored_for_file(path):
+    """
+    ParsedResume for a file if it has been parsed already, else None. Never
+    parses; raises OSError if the file cannot be read.
+    """
+    from recruitment.models import ParsedResume
+
+    content_hash = file_hash(path)
+    return ParsedResume.objects.filter(content_hash=content_hash, parser_version=PARSER_VERSION).first()
+
+
+def parse_later(paths):
+    """
+    Parses files (see parsed_for_file) in a background thread of this
+    process, one at a time; files already waiting are not queued twice.
+    """
+    global _background
+    with _queued_lock:
+        if _background is None:
+            _background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='parse-later')
+        paths = [path for path in paths if path not in _queued]
+        _queued.update(paths)
+    for path in paths:
+        _background.submit(_parse_later, path)
+
+
+def _parse_later(path):
+    from django.db import connection
+
+    try:
+        parsed_for_file(path)
+    except Exception as e:
+        print(f"Could not parse resume {path}: {e}")
+    finally:
+        with _queued_lock:
+            _queued.discard(path)
+        connection.close()
+
+
+def parsed_for_file(path):
+    """
+    ParsedResume for a file that is not attached to an Application (e.g. a
+    profile resume), or None if it cannot be read or parsed right now.
+    """
+    from recruitment.models import ParsedResume
+
+    content_hash = _hash_file(path)
+    if not content_hash:
+        return None
+    try:
+        return ParsedResume.objects.get(content_hash=content_hash, parser_version=PARSER_VERSION)
+    except ParsedResume.DoesNotExist:
+        pass
+    try:
+        text, features = extract(path)
+    except ParseFailed as e:
+        print(e)
+        return None
+    try:
+        parsed = ParsedResume.objects.create(
+            content_hash=content_hash, parser_version=PARSER_VERSION, text=text, features=features
+        )
+        link_parsed_resumes([parsed])
+        return parsed
+    except IntegrityError:
+        return ParsedResume.objects.get(content_hash=content_hash, parser_version=PARSER_VERSION)
@@ -0,0 +1,286 @@
+from collections import Counter, defaultdict
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, Q, Sum
+from django.db.models.functions import Cast, Coalesce, TruncDate
+from django.utils import timezone
+
+# Analytics rollups: DailyStats (per company and day) and ScoreBucket (per
+# company and tenth of the ranking score), plus the job, application and
+# pending counters on JobListing and Company and the all-time received,
+# accepted and rejected totals on Company. Every save or delete of a job
+# or application takes back what its old values contributed and adds what
+# its new values contribute, with F() updates, so the analytics page and
+# the HR dashboard read a few rows however many applications there are.
+# Received applications and rejections are history instead: they are
+# counted once, when they happen, and never taken back, since rejecting an
+# application deletes it.
+#
+# Writes that send no signals (bulk_create, bulk_update) call
+# applications_saved() themselves. `python manage.py rebuild_analytics`
+# and `python manage.py reconcile_counters` recompute everything from the
+# tables.
+
+BUCKETS = 10
+
+# Application fields the rollups depend on, remembered at load time
+APPLICATION_FIELDS = ('status', 'score_status', 'ranking_score', 'applied_at', 'decided_at')
+JOB_FIELDS = ('company_id', 'created_at')
+
+
+def score_bucket(score):
+    return min(BUCKETS - 1, max(0, int(score * BUCKETS)))
+
+
+def _day(value):
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date()
+
+
+def snapshot(instance, fields):
+    # Raw values, so deferred fields are not loaded just for this
+    return {name: instance.__dict__.get(name) for name in fields}
+
+
+def _daily(company_id, when):
+    from recruitment.models import DailyStats
+
+    return DailyStats, (('company_id', company_id), ('day', _day(when)))
+
+
+def _bucket(company_id, score):
+    from recruitment.models import ScoreBucket
+
+    return ScoreBucket, (('company_id', company_id), ('bucket', score_bucket(score)))
+
+
+def _counters(model, pk):
+    return model, (('pk', pk),)
+
+
+def _apply(deltas):
+    # deltas: {(model, lookup): Counter of field increments}
+    for (model, lookup), fields in deltas.items():
+        fields = {name: n for name, n in fields.items() if n}
+        if not fields:
+            continue
+        lookup = dict(lookup)
+        increments = {name: F(name) + n for name, n in fields.items()}
+        if model.objects.filter(**lookup).update(**increments):
+            continue
+        if 'pk' in lookup or min(fields.values()) < 0:
+            # Counters live on existing rows, and there is nothing to take
+            # back from; e.g. the job or company is being deleted
+            continue
+        try:
+            with transaction.atomic():
+                model.objects.create(**lookup, **fields)
+        except IntegrityError:
+            # Created by a concurrent request in the meantime
+            model.objects.filter(**lookup).update(**increments)
+
+
+def _count_application(values, job_id, company_id, deltas, sign):
+    from recruitment.models import JobListing, Company
+
+    applied_at = values['applied_at']
+    if applied_at is None:
+        return
+    pending = sign if values['status'] == 'Pending' else 0
+    for counters in (_counters(JobListing, job_id), _counters(Company, company_id)):
+        deltas[counters]['application_count'] += sign
+        deltas[counters]['pending_count'] += pending
+    if values['status'] == 'Accepted':
+        deltas[_daily(company_id, values['decided_at'] or applied_at)]['accepted'] += sign
+        deltas[_counters(Company, company_id)]['accepted_count'] += sign
+    if values['score_status'] == 'Scored' and values['ranking_score'] is not None:
+        deltas[_bucket(company_id, values['ranking_score'])]['count'] += sign
+
+
+def _companies(applications):
+    # {job id: company id}, from loaded jobs where possible
+    from recruitment.models import Application, JobListing
+
+    companies = {}
+    for application in applications:
+        if Application.job.is_cached(application):
+            companies[application.job_id] = application.job.company_id
+    missing = {application.job_id for application in applications} - set(companies)
+    if missing:
+        companies.update(JobListing.objects.filter(id__in=missing).values_list('id', 'company_id'))
+    return companies
+
+
+def applications_saved(applications, created=False):
+    """
+    Moves the rollup counts of saved applications from the values they were
+    loaded with to their current ones.
+    """
+    from recruitment.models import Company
+
+    deltas = defaultdict(Counter)
+    companies = _companies(applications)
+    for application in applications:
+        company_id = companies.get(application.job_id)
+        new = snapshot(application, APPLICATION_FIELDS)
+        old = None if created else getattr(application, '_rollup_values', None)
+        if company_id is not None:
+            if created:
+                deltas[_daily(company_id, new['applied_at'] or timezone.now())]['applications'] += 1
+                deltas[_counters(Company, company_id)]['received_count'] += 1
+            if old is not None:
+                _count_application(old, application.job_id, company_id, deltas, -1)
+            _count_application(new, application.job_id, company_id, deltas, 1)
+            if new['status'] == 'Rejected' and (old is None or old['status'] != 'Rejected'):
+                deltas[_daily(company_id, new['decided_at'] or timezone.now())]['rejected'] += 1
+                deltas[_counters(Company, company_id)]['rejected_count'] += 1
+        application._rollup_values = new
+    _apply(deltas)
+
+
+def applications_deleted(applications):
+    deltas = defaultdict(Counter)
+    companies = _companies(applications)
+    for application in applications:
+        company_id = companies.get(application.job_id)
+        old = getattr(application, '_rollup_values', None)
+        if company_id is not None and old is not None:
+            _count_application(old, application.job_id, company_id, deltas, -1)
+    _apply(deltas)
+
+
+def job_saved(job, created=False):
+    from recruitment.models import Company
+
+    deltas = defaultdict(Counter)
+    new = snapshot(job, JOB_FIELDS)
+    old = None if created else getattr(job, '_rollup_values', None)
+    job._rollup_values = new
+    known = None not in new.values() and (created or (old is not None and None not in old.values()))
+    if not known:
+        return  # loaded without the fields counted on
+    if old is not None:
+        deltas[_daily(old['company_id'], old['created_at'])]['jobs_posted'] -= 1
+        deltas[_counters(Company, old['company_id'])]['job_count'] -= 1
+    deltas[_daily(new['company_id'], new['created_at'])]['jobs_posted'] += 1
+    deltas[_counters(Company, new['company_id'])]['job_count'] += 1
+    _apply(deltas)
+
+
+def job_deleted(job):
+    from recruitment.models import Company
+
+    old = getattr(job, '_rollup_values', None)
+    if old is not None and None not in old.values():
+        _apply({
+            _daily(old['company_id'], old['created_at']): Counter(jobs_posted=-1),
+            _counters(Company, old['company_id']): Counter(job_count=-1),
+        })
+
+
+def rebuild():
+    """
+    Recomputes the rollups from the job and application tables. Rejected
+    applications have been deleted, so the recorded rejection counts are
+    kept, and so are the received counts unless fewer applications from
+    that day were recorded than are still in the table. Returns (days,
+    buckets) written.
+    """
+    from recruitment.models import JobListing, Application, DailyStats, ScoreBucket
+
+    daily = defaultdict(Counter)
+    for company_id, day, n in (
+        JobListing.objects.annotate(day=TruncDate('created_at'))
+        .values_list('company_id', 'day').annotate(n=Count('id')).order_by()
+    ):
+        daily[(company_id, day)]['jobs_posted'] += n
+    for company_id, day, n in (
+        Application.objects.annotate(day=TruncDate('applied_at'))
+        .values_list('job__company_id', 'day').annotate(n=Count('id')).order_by()
+    ):
+        daily[(company_id, day)]['applications'] += n
+    for company_id, day, n in (
+        Application.objects.filter(status='Accepted')
+        .annotate(day=TruncDate(Coalesce('decided_at', 'applied_at')))
+        .values_list('job__company_id', 'day').annotate(n=Count('id')).order_by()
+    ):
+        daily[(company_id, day)]['accepted'] += n
+    buckets = Counter()
+    for company_id, tenth, n in (
+        Application.objects.filter(score_status='Scored')
+        .annotate(tenth=Cast(F('ranking_score') * BUCKETS, IntegerField()))
+        .values_list('job__company_id', 'tenth').annotate(n=Count('id')).order_by()
+    ):
+        buckets[(company_id, min(BUCKETS - 1, max(0, tenth)))] += n
+
+    with transaction.atomic():
+        recorded = DailyStats.objects.filter(Q(rejected__gt=0) | Q(applications__gt=0))
+        for company_id, day, applications, rejected in recorded.values_list('company_id', 'day', 'applications', 'rejected'):
+            counts = daily[(company_id, day)]
+            counts['rejected'] += rejected
+            counts['applications'] = max(counts['applications'], applications)
+        DailyStats.objects.all().delete()
+        ScoreBucket.objects.all().delete()
+        DailyStats.objects.bulk_create(
+            [DailyStats(company_id=company_id, day=day, **counts) for (company_id, day), counts in daily.items()],
+            batch_size=500,
+        )
+        ScoreBucket.objects.bulk_create(
+            [ScoreBucket(company_id=company_id, bucket=bucket, count=n) for (company_id, bucket), n in buckets.items()],
+            batch_size=500,
+        )
+    return len(daily), len(buckets)
+
+
+def reconcile_counters():
+    """
+    Sets the counters on every JobListing and Company to what the tables
+    say. Received and rejected applications are only recorded in DailyStats,
+    so run rebuild() first if those may be off. Returns the number of rows
+    corrected.
+    """
+    from recruitment.models import JobListing, Company, Application, DailyStats
+
+    pending = Count('applications', filter=Q(applications__status='Pending'))
+    corrected = 0
+    with transaction.atomic():
+        drifted = [
+            job for job in JobListing.objects.only('id', 'application_count', 'pending_count').annotate(
+                actual_applications=Count('applications'), actual_pending=pending,
+            )
+            if (job.application_count, job.pending_count) != (job.actual_applications, job.actual_pending)
+        ]
+        for job in drifted:
+            job.application_count, job.pending_count = job.actual_applications, job.actual_pending
+        JobListing.objects.bulk_update(drifted, ['application_count', 'pending_count'], batch_size=500)
+        corrected += len(drifted)
+
+        # Company totals follow from the (now correct) job counters
+        history = {
+            company_id: (received, rejected)
+            for company_id, received, rejected in DailyStats.objects.values_list('company_id')
+            .annotate(Sum('applications'), Sum('rejected')).order_by()
+        }
+        accepted = dict(
+            Application.objects.filter(status='Accepted').values_list('job__company_id').annotate(Count('id')).order_by()
+        )
+        drifted = []
+        for company in Company.objects.only('id', *Company.counter_fields).annotate(
+            actual_jobs=Count('jobs'),
+            actual_applications=Coalesce(Sum('jobs__application_count'), 0),
+            actual_pending=Coalesce(Sum('jobs__pending_count'), 0),
+        ):
+            received, rejected = history.get(company.id, (0, 0))
+            actual = (
+                company.actual_jobs, company.actual_applications, company.actual_pending,
+                received, accepted.get(company.id, 0), rejected,
+            )
+            if tuple(getattr(company, name) for name in Company.counter_fields) != actual:
+                for name, value in zip(Company.counter_fields, actual):
+                    setattr(company, name, value)
+                drifted.append(company)
+        Company.objects.bulk_update(drifted, list(Company.counter_fields), batch_size=500)
+        corrected += len(drifted)
+    return corrected
@@ -0,0 +1,175 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from .job_index import vectorize
+from .ranker import get_ranker
+from .parser_pool import ParseFailed, get_parser_pool
+from .resume_store import PARSER_VERSION
+
+# Memo cache for the public resume scorer. People upload the same CV again
+# and again with different role selections, so the work is cached in three
+# layers that are invalidated by different things:
+#
+#   text      resume bytes + parser version    -> extracted text
+#   features  resume bytes + model version     -> hire probability, text vector
+#   scores    ... + normalised target skills   -> final result
+#
+# Changing only the role re-uses the parsed text and model output and just
+# recomputes the (cheap) similarity against the new skill list.
+
+
+class LRUCache:
+    """
+    Thread-safe LRU bounded by the approximate size of its values in bytes.
+    """
+
+    def __init__(self, max_bytes, sizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def _features_size(value):
+    hire_prob, vector = value
+    return 64 + vector.data.nbytes + vector.indices.nbytes + vector.indptr.nbytes
+
+
+def _result_size(value):
+    return 256 + sum(sys.getsizeof(skill) for skill in value['matched_skills'] + value['missing_skills'])
+
+
+_MB = 1024 * 1024
+text_cache = LRUCache(getattr(settings, 'SCORE_CACHE_TEXT_BYTES', 32 * _MB), sys.getsizeof)
+feature_cache = LRUCache(getattr(settings, 'SCORE_CACHE_FEATURE_BYTES', 16 * _MB), _features_size)
+score_cache = LRUCache(getattr(settings, 'SCORE_CACHE_SCORE_BYTES', 4 * _MB), _result_size)
+
+
+def content_hash(uploaded_file):
+    # ResumeUploadHandler already hashed the file while it was uploaded
+    if getattr(uploaded_file, 'sha256', None):
+        return uploaded_file.sha256
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def normalize_skills(skills_text):
+    # Order, case and duplicates don't change the result
+    return sorted({skill.strip().lower() for skill in skills_text.split(',') if skill.strip()})
+
+
+def score_upload(uploaded_file, target_skills_text):
+    """
+    Scores an uploaded resume against a comma-separated skill list.
+
+    Returns {'score': 0..1 or None, 'matched_skills': [...],
+    'missing_skills': [...]}, computing only the layers that are not cached.
+    """
+    ranker = get_ranker()
+    skills = normalize_skills(target_skills_text)
+    digest = content_hash(uploaded_file)
+    model_version = ranker.version if ranker.initialized else None
+
+    skills_key = hashlib.sha1('\n'.join(skills).encode('utf-8')).hexdigest()
+    result = score_cache.get((digest, model_version, skills_key))
+    if result is not None:
+        return result
+
+    # 1. Text
+    text = text_cache.get((digest, PARSER_VERSION))
+    if text is None:
+        # Same text as parse_uploaded_resume, but in the sandboxed pool;
+        # lower-cased here for the skill matching below
+        try:
+            text = get_parser_pool().parse(uploaded_file, filename=uploaded_file.name, plain_text_fallback=True).lower()
+        except ParseFailed as e:
+            # Nothing is cached, so the same file is parsed again next time
+            print(e)
+            return {'score': None, 'matched_skills': [], 'missing_skills': skills}
+        text_cache.put((digest, PARSER_VERSION), text)
+
+    # 2. Skill-independent features: model output and the text vector
+    features = feature_cache.get((digest, model_version))
+    if features is None:
+        hire_prob = None
+        if ranker.initialized and text:
+            try:
+                hire_prob = float(ranker.predict_scores([text])[0])
+            except Exception as e:
+                print(f"Ranking error: {e}")
+        features = (hire_prob, vectorize([text]))
+        feature_cache.put((digest, model_version), features)
+    hire_prob, vector = features
+
+    # 3. Score against this skill list
+    relevance = None
+    if skills and text:
+        relevance = float((vector @ vectorize([', '.join(skills)]).T)[0, 0])
+    matched = [skill for skill in skills if skill in text]
+    result = {
+        'score': ranker.blend(hire_prob, relevance),
+        'matched_skills': matched,
+        'missing_skills': [skill for skill in skills if skill not in matched],
+    }
+    score_cache.put((digest, model_version, skills_key), result)
+    return result
+
+
+def stats():
+    return {
+        'text': text_cache.stats(),
+        'features': feature_cache.stats(),
+        'scores': score_cache.stats(),
+    }
@@ -0,0 +1,208 @@
+import os
+import socket
+import traceback
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .ranker import get_ranker
+from . import resume_store, rollups
+
+# Database-backed scoring queue. Submitting an application only inserts a
+# ScoringTask row; `python manage.py process_scoring_queue` claims tasks in
+# batches, reads the parsed resumes and scores them with one predict call.
+#
+# A claimed task carries a lease (locked_until). If the worker dies or hangs
+# past it, the task becomes claimable again, so a crash costs one attempt
+# rather than leaving the application pending forever. A worker only writes
+# back tasks it still owns, so one whose lease ran out cannot undo the work
+# of the worker that took over.
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def is_async():
+    return _setting('RESUME_SCORING_ASYNC', True)
+
+
+def enqueue(application):
+    """
+    Queues an application for scoring. Re-queuing an application resets its
+    task, e.g. after a failed one was fixed or the resume was replaced, and
+    drops its old score so the applicant list stops ranking it by that.
+    """
+    from recruitment.models import ScoringTask
+
+    ScoringTask.objects.update_or_create(
+        application=application,
+        defaults={
+            'status': 'Queued',
+            'attempts': 0,
+            'last_error': '',
+            'available_at': timezone.now(),
+            'locked_until': None,
+            'worker': '',
+        },
+    )
+    if application.score_status != 'Pending' or application.ranking_score:
+        application.score_status = 'Pending'
+        application.ranking_score = 0.0
+        application.save(update_fields=['score_status', 'ranking_score'])
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def lease_seconds(limit):
+    """
+    Lease for a batch of `limit` tasks. Nothing interrupts a slow batch, so
+    the lease covers every resume in it hitting the parser timeout.
+    """
+    parser_timeout = _setting('PARSER_TIMEOUT_SECONDS', 30)
+    return max(_setting('SCORING_LEASE_SECONDS', 300), parser_timeout * limit + 60)
+
+
+def claim(worker, limit):
+    """
+    Claims up to `limit` ready tasks for `worker` and returns them.
+
+    Ready means queued and past its backoff, or running with an expired
+    lease. The conditional UPDATE is what makes a claim exclusive: if two
+    workers select the same ids, only one of them changes each row.
+    """
+    from recruitment.models import ScoringTask
+
+    now = timezone.now()
+    lease = timedelta(seconds=lease_seconds(limit))
+    ready = ScoringTask.objects.filter(
+        Q(status='Queued', available_at__lte=now) | Q(status='Running', locked_until__lt=now)
+    )
+    ids = list(ready.order_by('available_at', 'id').values_list('id', flat=True)[:limit])
+    if not ids:
+        return []
+
+    ready.filter(id__in=ids).update(
+        status='Running',
+        worker=worker,
+        locked_until=now + lease,
+        attempts=F('attempts') + 1,
+    )
+    return list(
+        ScoringTask.objects.filter(id__in=ids, worker=worker, status='Running')
+        .select_related('application')
+    )
+
+
+def score_applications(applications):
+    """
+    Scores applications in one batch and saves their scores. Text and
+    features come from the ParsedResume store, so a resume is only parsed the
+    first time it is seen. Returns {application id: error message} for the
+    ones that failed.
+    """
+    from recruitment.models import Application
+
+    errors = {}
+    parsed = []
+    try:
+        store = resume_store.ensure_parsed(applications)
+    except Exception as e:
+        return {application.id: f"Could not read resume: {e}" for application in applications}
+    for application in applications:
+        parsed_resume = store.get(application.id)
+        if parsed_resume is None:
+            errors[application.id] = "Resume file could not be read or parsed"
+        elif not parsed_resume.text:
+            errors[application.id] = "No text could be extracted from the resume"
+        else:
+            parsed.append((application, parsed_resume))
+
+    if parsed:
+        try:
+            scores, _, _ = get_ranker().score_resumes(
+                [parsed_resume.text for _, parsed_resume in parsed],
+                [application.job_id for application, _ in parsed],
+                hits=[parsed_resume.features for _, parsed_resume in parsed],
+            )
+            if scores is None:
+                raise RuntimeError("Ranking model is not available")
+        except Exception as e:
+            for application, _ in parsed:
+                errors[application.id] = f"Scoring failed: {e}"
+            return errors
+
+        for (application, _), score in zip(parsed, scores):
+            application.ranking_score = float(score)
+            application.score_status = 'Scored'
+        Application.objects.bulk_update([application for application, _ in parsed], ['ranking_score', 'score_status'])
+        rollups.applications_saved([application for application, _ in parsed])
+
+    return errors
+
+
+def process(tasks):
+    """
+    Scores claimed tasks. Successful tasks are deleted; failed ones are
+    retried with exponential backoff until SCORING_MAX_ATTEMPTS, after which
+    the task and its application are marked Failed.
+
+    Returns (scored, retried, failed) counts.
+    """
+    from recruitment.models import Application, ScoringTask
+
+    if not tasks:
+        return 0, 0, 0
+
+    errors = score_applications([task.application for task in tasks])
+
+    max_attempts = _setting('SCORING_MAX_ATTEMPTS', 3)
+    backoff = _setting('SCORING_RETRY_BACKOFF_SECONDS', 30)
+    now = timezone.now()
+    retry, failed = [], []
+    for task in tasks:
+        error = errors.get(task.application_id)
+        if error is None:
+            continue
+        task.last_error = error
+        task.locked_until = None
+        if task.attempts >= max_attempts:
+            task.status = 'Failed'
+            failed.append(task)
+        else:
+            task.status = 'Queued'
+            task.available_at = now + timedelta(seconds=backoff * 2 ** (task.attempts - 1))
+            retry.append(task)
+
+    with transaction.atomic():
+        # Only write back tasks this worker still owns; an expired lease may
+        # have handed them to someone else in the meantime.
+        owned = set(
+            ScoringTask.objects.select_for_update()
+            .filter(id__in=[task.id for task in tasks], worker=tasks[0].worker, status='Running')
+            .values_list('id', flat=True)
+        )
+        done = [task.id for task in tasks if task.application_id not in errors and task.id in owned]
+        retry = [task for task in retry if task.id in owned]
+        failed = [task for task in failed if task.id in owned]
+        ScoringTask.objects.filter(id__in=done).delete()
+        if retry or failed:
+            ScoringTask.objects.bulk_update(retry + failed, ['status', 'last_error', 'locked_until', 'available_at'])
+        if failed:
+            Application.objects.filter(id__in=[task.application_id for task in failed]).update(score_status='Failed')
+
+    return len(done), len(retry), len(failed)
+
+
+def run_batch(worker, limit):
+    tasks = claim(worker, limit)
+    try:
+        return len(tasks), process(tasks)
+    except Exception:
+        # Leave the tasks to their lease; they will be picked up again
+        traceback.print_exc()
+        return len(tasks), (0, 0, 0)
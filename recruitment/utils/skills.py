@@ -0,0 +1,135 @@
+import re
+from django.db import IntegrityError
+from django.db.models import Count
+from .keywords import SKILLS
+
+# Skills as rows instead of text. JobListing.required_skills stays the
+# editable source (the job form is unchanged); every save resolves it into
+# Skill rows through the alias table, so "sklearn" and "scikit-learn" are
+# the same skill, and parsed resumes are linked to the skills the keyword
+# matcher found in them. "Jobs needing Django and Docker" or "applicants
+# with Kubernetes" are then joins over indexed link tables.
+
+
+def normalize(name):
+    return re.sub(r'\s+', ' ', name or '').strip().lower()
+
+
+def split_skills(text):
+    return [part for part in (text or '').split(',') if normalize(part)]
+
+
+def seed_vocabulary():
+    """
+    Creates a Skill and its aliases for every keywords.SKILLS entry.
+    Idempotent; returns the number of new aliases.
+    """
+    from recruitment.models import Skill, SkillAlias
+
+    created = 0
+    for spellings, label in SKILLS:
+        skill, _ = Skill.objects.get_or_create(name=label)
+        for alias in {normalize(label), *map(normalize, spellings)}:
+            _, new = SkillAlias.objects.get_or_create(alias=alias, defaults={'skill': skill})
+            created += new
+    return created
+
+
+def _lookup(names, create):
+    # {normalised name: Skill or None}, in input order
+    from recruitment.models import Skill, SkillAlias
+
+    wanted = {}
+    for name in names:
+        key = normalize(name)
+        if key and key not in wanted:
+            wanted[key] = name.strip()
+    found = {
+        alias.alias: alias.skill
+        for alias in SkillAlias.objects.filter(alias__in=list(wanted)).select_related('skill')
+    }
+    if create:
+        for key, name in wanted.items():
+            if key in found:
+                continue
+            skill, _ = Skill.objects.get_or_create(name=name[:100])
+            try:
+                SkillAlias.objects.create(alias=key, skill=skill)
+            except IntegrityError:
+                pass  # added concurrently
+            found[key] = skill
+    return {key: found.get(key) for key in wanted}
+
+
+def resolve(names, create=True, strict=False):
+    """
+    Skills for a list of names or aliases, in order and without duplicates.
+    Unknown names become new skills unless create is False; with strict,
+    any unknown name gives None instead.
+    """
+    found = _lookup(names, create)
+    if strict and None in found.values():
+        return None
+    skills = []
+    for skill in found.values():
+        if skill is not None and skill not in skills:
+            skills.append(skill)
+    return skills
+
+
+def sync_job_skills(job):
+    job.skills.set(resolve(split_skills(job.required_skills)))
+
+
+def link_parsed_resumes(parsed_resumes):
+    """
+    Links ParsedResume rows to the skills in their features, in bulk.
+    """
+    from recruitment.models import ParsedResume
+
+    parsed_resumes = [parsed for parsed in parsed_resumes if parsed.pk]
+    labels = {label for parsed in parsed_resumes for label in (parsed.features or {}).get('skills', [])}
+    if not labels:
+        return
+    by_key = _lookup(sorted(labels), create=True)
+    Link = ParsedResume.skills.through
+    Link.objects.bulk_create(
+        [
+            Link(parsedresume_id=parsed.pk, skill_id=by_key[normalize(label)].pk)
+            for parsed in parsed_resumes
+            for label in (parsed.features or {}).get('skills', [])
+            if normalize(label) in by_key
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _with_all(queryset, path, skills):
+    # One join on the link table; rows matching every skill have the full count
+    if not skills:
+        # Nothing asked for, or a skill nobody has
+        return queryset.none()
+    return (
+        queryset.filter(**{f'{path}__in': skills})
+        .annotate(matched_skills=Count(path, distinct=True))
+        .filter(matched_skills=len(skills))
+    )
+
+
+def jobs_requiring(*names):
+    """
+    JobListings that require every one of the given skills.
+    """
+    from recruitment.models import JobListing
+
+    return _with_all(JobListing.objects.all(), 'skills', resolve(names, create=False, strict=True))
+
+
+def applications_with(*names, job=None):
+    """
+    Applications whose parsed resume mentions every one of the given skills.
+    """
+    from recruitment.models import Application
+
+    queryset = Application.objects.all() if job is None else Application.objects.filter(job=job)
+    return _with_all(queryset, 'parsed_resume__skills', resolve(names, create=False, strict=True))
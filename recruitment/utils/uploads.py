@@ -0,0 +1,208 @@
+import hashlib
+import io
+import os
+from functools import wraps
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+# Resume uploads are checked while they stream in rather than after Django
+# has buffered the whole body: the extension is checked before the first
+# byte is stored, the magic bytes on the first chunk, and the size on every
+# chunk, so a 2 GB video renamed to cv.pdf is dropped after one chunk. The
+# SHA-256 used by the caches and the ParsedResume store is computed on the
+# same pass, and anything above FILE_UPLOAD_MAX_MEMORY_SIZE is spooled to a
+# temporary file, so memory per upload stays flat whatever the file size.
+
+APPLICATION_EXTENSIONS = ('.pdf', '.doc', '.docx')
+SCORER_EXTENSIONS = ('.pdf', '.docx', '.txt')
+
+# Leading bytes of each format. PDF readers accept the header anywhere in
+# the first kilobyte, so it is searched for rather than matched.
+MAGIC = {
+    '.pdf': b'%PDF-',
+    '.docx': b'PK\x03\x04',
+    '.doc': b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',
+}
+HEAD_BYTES = 1024
+
+
+def max_upload_bytes():
+    return getattr(settings, 'RESUME_MAX_UPLOAD_BYTES', 5 * 1024 * 1024)
+
+
+def _megabytes(size):
+    return f"{size / (1024 * 1024):g} MB"
+
+
+def check_extension(file_name, extensions):
+    ext = os.path.splitext(file_name or '')[1].lower()
+    if ext not in extensions:
+        allowed = ', '.join(e[1:].upper() for e in extensions)
+        return f"Unsupported file type. Please upload a {allowed} file."
+    return None
+
+
+def check_head(file_name, head, complete=True):
+    """
+    Error message if the first bytes of a file don't match its extension.
+    With complete=False `head` may still be growing, so only a definite
+    mismatch is reported.
+    """
+    ext = os.path.splitext(file_name or '')[1].lower()
+    if ext == '.pdf':
+        ok = MAGIC['.pdf'] in head[:HEAD_BYTES] or (not complete and len(head) < HEAD_BYTES)
+    elif ext in MAGIC:
+        ok = head.startswith(MAGIC[ext]) or (not complete and MAGIC[ext].startswith(head))
+    else:
+        # Plain text: binary files give themselves away with NUL bytes
+        ok = b'\x00' not in head[:HEAD_BYTES]
+    if not ok:
+        return f"This file is not a valid {ext[1:].upper()} document."
+    return None
+
+
+def check_size(size):
+    if size > max_upload_bytes():
+        return f"The file is too large. The maximum size is {_megabytes(max_upload_bytes())}."
+    return None
+
+
+def validate_resume(uploaded_file, extensions=APPLICATION_EXTENSIONS):
+    """
+    Same checks on a file that is already uploaded (e.g. one that did not
+    come through ResumeUploadHandler). Returns an error message or None.
+    """
+    error = check_extension(uploaded_file.name, extensions) or check_size(uploaded_file.size)
+    if error:
+        return error
+    uploaded_file.seek(0)
+    head = uploaded_file.read(HEAD_BYTES)
+    uploaded_file.seek(0)
+    return check_head(uploaded_file.name, head)
+
+
+class ResumeUploadHandler(FileUploadHandler):
+    """
+    Validating, hashing, spooling upload handler for resume fields. Other
+    file fields are passed on untouched to the next handler.
+
+    Rejected files are dropped and the reason is recorded in
+    request.upload_errors[field_name] for the form to report. Callers must
+    check it before request.FILES: a file under HEAD_BYTES can only be judged
+    once complete, and the next handler then supplies an empty file.
+    """
+
+    def __init__(self, request=None, field_names=('resume',), extensions=APPLICATION_EXTENSIONS):
+        super().__init__(request)
+        self.field_names = field_names
+        self.extensions = extensions
+        self.active = False
+        if request is not None and not hasattr(request, 'upload_errors'):
+            request.upload_errors = {}
+
+    def _reject(self, message):
+        if self.request is not None:
+            self.request.upload_errors[self.field_name] = message
+        self._discard()
+        raise SkipFile()
+
+    def _discard(self):
+        # MultiPartParser closes handler.file itself when it exists
+        file = self.__dict__.pop('file', None)
+        if file is not None:
+            file.close()  # also deletes a temporary file
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.active = field_name in self.field_names
+        if not self.active:
+            return
+        self.file = io.BytesIO()
+        self.size = 0
+        self.head = b''
+        self.digest = hashlib.sha256()
+        error = check_extension(file_name, self.extensions)
+        # Clients rarely send a per-file length, but when they do it is free
+        if not error and content_length:
+            error = check_size(content_length)
+        if error:
+            self._reject(error)
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+
+        self.size += len(raw_data)
+        error = check_size(self.size)
+        if not error and len(self.head) < HEAD_BYTES:
+            self.head += raw_data[:HEAD_BYTES - len(self.head)]
+            error = check_head(self.file_name, self.head, complete=len(self.head) >= HEAD_BYTES)
+        if error:
+            self._reject(error)
+
+        self.digest.update(raw_data)
+        if isinstance(self.file, io.BytesIO) and self.size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            # Too big to keep in memory: move what we have to disk
+            spooled = TemporaryUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+            spooled.write(self.file.getvalue())
+            self.file = spooled
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        self.active = False
+
+        # Files shorter than HEAD_BYTES are only checked once complete
+        if len(self.head) < HEAD_BYTES:
+            error = check_head(self.file_name, self.head)
+            if error:
+                if self.request is not None:
+                    self.request.upload_errors[self.field_name] = error
+                self._discard()
+                return None
+
+        self.file.seek(0)
+        if isinstance(self.file, TemporaryUploadedFile):
+            uploaded = self.file
+            uploaded.size = file_size
+        else:
+            uploaded = InMemoryUploadedFile(
+                file=self.file,
+                field_name=self.field_name,
+                name=self.file_name,
+                content_type=self.content_type,
+                size=file_size,
+                charset=self.charset,
+                content_type_extra=self.content_type_extra,
+            )
+        uploaded.sha256 = self.digest.hexdigest()
+        del self.file  # now owned by the request
+        return uploaded
+
+    def upload_interrupted(self):
+        self._discard()
+
+
+def resume_upload(field_names=('resume',), extensions=APPLICATION_EXTENSIONS):
+    """
+    View decorator that installs ResumeUploadHandler for this view only.
+
+    Upload handlers must be in place before anything reads request.POST,
+    and CsrfViewMiddleware does exactly that, so the view is exempted from
+    the middleware and CSRF is checked again after the handler is added.
+    """
+    def decorator(view_func):
+        protected = csrf_protect(view_func)
+
+        @wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            request.upload_handlers.insert(0, ResumeUploadHandler(request, field_names, extensions))
+            return protected(request, *args, **kwargs)
+
+        return csrf_exempt(wrapped)
+
+    return decorator
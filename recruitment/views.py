@@ -1,20 +1,90 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse
 from django.db import connection
+from django.db.models import Count, Q, Sum
 
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.core.mail import send_mail
 from django.conf import settings
-from .models import JobListing, Application, Company
+from .models import JobListing, Application, Company, DailyStats, ScoreBucket
 from .forms import JobPostForm, ApplicationForm, CompanyProfileForm
-from .utils.resume_parser import parse_resume
-from .utils.ranker import Ranker
+from .utils.ranker import get_ranker
+from .utils.recommender import recommend_jobs
+from .utils.pagination import keyset_page
+from .utils import scoring_queue, score_cache, parser_pool, uploads, job_search
+from .middleware import query_stats
 
 def home(request):
-    jobs = JobListing.objects.all().order_by('-created_at')[:5]
+    jobs = JobListing.objects.select_related('company').order_by('-created_at')[:5]
     return render(request, 'recruitment/home.html', {'featured_jobs': jobs})
 
+def search_jobs(request):
+    query = request.GET.get('q', '').strip()
+    job_type = request.GET.get('job_type', '')
+    if job_type not in dict(JobListing.JOB_TYPE_CHOICES):
+        job_type = ''
+    work_mode = request.GET.get('work_mode', '')
+    if work_mode not in dict(JobListing.WORK_MODE_CHOICES):
+        work_mode = ''
+    include_closed = request.GET.get('include_closed') == '1'
+    page_size = getattr(settings, 'JOB_SEARCH_PAGE_SIZE', 20)
+
+    params = request.GET.copy()
+    params.pop('page', None)
+    params.pop('after', None)
+    context = {
+        'query': query,
+        'job_type': job_type,
+        'work_mode': work_mode,
+        'include_closed': include_closed,
+        'job_type_choices': JobListing.JOB_TYPE_CHOICES,
+        'work_mode_choices': JobListing.WORK_MODE_CHOICES,
+        'page_query': params.urlencode(),
+    }
+    if query:
+        # Only the newest job_search.candidates() matches are ranked, so no
+        # page past them can have results; the page number bounds OFFSET.
+        last_page = max(1, job_search.candidates() // page_size)
+        try:
+            page = min(last_page, max(1, int(request.GET.get('page', 1))))
+        except ValueError:
+            page = 1
+        # One extra result tells whether there is a next page
+        results = job_search.search_jobs(
+            query, job_type=job_type, work_mode=work_mode, open_only=not include_closed,
+            limit=page_size + 1, offset=(page - 1) * page_size,
+        )
+        has_next = len(results) > page_size and page < last_page
+        context.update({
+            'results': results[:page_size],
+            'page': page,
+            'previous_page': page - 1 if page > 1 else None,
+            'next_page': page + 1 if has_next else None,
+            'truncated': results.truncated,
+            'candidates': job_search.candidates(),
+        })
+    else:
+        # Nothing typed: the newest jobs, with the same filters, one keyset
+        # page at a time over job_feed_idx
+        from django.utils import timezone
+        jobs = JobListing.objects.select_related('company')
+        if job_type:
+            jobs = jobs.filter(job_type=job_type)
+        if work_mode:
+            jobs = jobs.filter(work_mode=work_mode)
+        if not include_closed:
+            jobs = jobs.filter(deadline__gte=timezone.now().date())
+        results = keyset_page(jobs, ['-created_at', '-id'], cursor=request.GET.get('after'), page_size=page_size)
+        next_page = params.copy()
+        next_page['after'] = results.next_cursor or ''
+        context.update({
+            'results': results,
+            'next_page_query': next_page.urlencode(),
+        })
+    return render(request, 'recruitment/job_search.html', context)
+
 @login_required
 def dashboard_redirect(request):
     if request.user.is_hr:
@@ -33,15 +103,17 @@ def hr_dashboard(request):
     if not hasattr(request.user, 'company'):
         return redirect('create_company')
 
-    jobs = JobListing.objects.filter(company=request.user.company)
-    total_jobs = jobs.count()
-    total_applicants = Application.objects.filter(job__company=request.user.company).count()
+    # Counts come from the counters kept on the company and its jobs, so
+    # the dashboard never reads the Application table
+    company = request.user.company
+    jobs = JobListing.objects.filter(company=company)
 
     return render(request, 'recruitment/hr_dashboard.html', {
         'jobs': jobs, 
-        'company': request.user.company,
-        'total_jobs': total_jobs,
-        'total_applicants': total_applicants
+        'company': company,
+        'total_jobs': company.job_count,
+        'total_applicants': company.application_count,
+        'pending_applicants': company.pending_count,
     })
 
 @login_required
@@ -49,17 +121,47 @@ def applicant_dashboard(request):
     if not request.user.is_applicant:
         return redirect('home')
 
-    jobs = JobListing.objects.all()
-    applications = Application.objects.filter(user=request.user)
-    applied_job_ids = applications.values_list('job_id', flat=True)
+    # Open jobs, newest first, one keyset page at a time so the page costs
+    # the same however many listings there are
+    from django.utils import timezone
+    today = timezone.now().date()
+    jobs = JobListing.objects.filter(deadline__gte=today).filter(
+        Q(application_start_date__isnull=True) | Q(application_start_date__lte=today)
+    )
+    job_type = request.GET.get('job_type', '')
+    if job_type in dict(JobListing.JOB_TYPE_CHOICES):
+        jobs = jobs.filter(job_type=job_type)
+    work_mode = request.GET.get('work_mode', '')
+    if work_mode in dict(JobListing.WORK_MODE_CHOICES):
+        jobs = jobs.filter(work_mode=work_mode)
+    page = keyset_page(
+        jobs.select_related('company').prefetch_related('skills'),
+        ['-created_at', '-id'],
+        cursor=request.GET.get('after'),
+        page_size=getattr(settings, 'JOB_FEED_PAGE_SIZE', 12),
+    )
+
+    applications = list(Application.objects.filter(user=request.user).select_related('job__company'))
+    applied_job_ids = {application.job_id for application in applications}
     
-    total_applications = applications.count()
+    total_applications = len(applications)
+
+    first_page = request.GET.copy()
+    first_page.pop('after', None)
+    next_page = first_page.copy()
+    next_page['after'] = page.next_cursor or ''
 
     return render(request, 'recruitment/applicant_dashboard.html', {
-        'jobs': jobs,
+        'jobs': page,
         'applications': applications,
         'applied_job_ids': applied_job_ids,
-        'total_applications': total_applications
+        'total_applications': total_applications,
+        'job_type': job_type,
+        'work_mode': work_mode,
+        'job_type_choices': JobListing.JOB_TYPE_CHOICES,
+        'work_mode_choices': JobListing.WORK_MODE_CHOICES,
+        'first_page_query': first_page.urlencode(),
+        'next_page_query': next_page.urlencode(),
     })
 
 @login_required
@@ -99,6 +201,7 @@ def post_job(request):
     return render(request, 'recruitment/job_form.html', {'form': form})
 
 @login_required
+@uploads.resume_upload()
 def job_detail(request, pk):
     job = get_object_or_404(JobListing, pk=pk)
     
@@ -124,28 +227,23 @@ def job_detail(request, pk):
              messages.error(request, "Applications for this job are currently closed.")
              return redirect('job_detail', pk=pk)
 
-        form = ApplicationForm(request.POST, request.FILES, job=job)
+        form = ApplicationForm(request.POST, request.FILES, job=job, upload_errors=request.upload_errors)
         if form.is_valid():
             application = form.save(commit=False)
             application.user = request.user
             application.job = job
             application.save() # Saves file to disk
 
-            # Calculate Ranking Score
-            try:
-                resume_text = parse_resume(application.resume.path)
-                if resume_text:
-                    ranker = Ranker()
-                    resumes_data = [{'filename': application.resume.name, 'text': resume_text}]
-                    # Use job description AND required skills for better matching
-                    requirements = f"{job.required_skills} {job.description}"
-                    results = ranker.rank_resumes(resumes_data, requirements)
-                    
-                    if results:
-                        application.ranking_score = results[0]['score']
-                        application.save()
-            except Exception as e:
-                print(f"Ranking failed: {e}")
+            # Calculate Ranking Score. By default this is queued for the
+            # process_scoring_queue worker so the request returns right away.
+            if scoring_queue.is_async():
+                scoring_queue.enqueue(application)
+            else:
+                errors = scoring_queue.score_applications([application])
+                if errors:
+                    print(f"Ranking failed: {errors[application.id]}")
+                    application.score_status = 'Failed'
+                    application.save(update_fields=['score_status'])
 
             # Notify HR
             send_mail(
@@ -186,12 +284,62 @@ def job_detail(request, pk):
 
 @login_required
 def view_applicants(request, job_id):
-    job = get_object_or_404(JobListing, id=job_id)
+    job = get_object_or_404(JobListing.objects.select_related('company'), id=job_id)
     if not request.user.is_hr or job.company.user != request.user:
         return redirect('hr_dashboard')
     
-    applications = job.applications.all().order_by('-ranking_score')
-    return render(request, 'recruitment/view_applicants.html', {'job': job, 'applications': applications})
+    # Best score first, one keyset page at a time over the (job,
+    # ranking_score) index. Applications still being scored have a score of
+    # 0 (scoring_queue.enqueue resets it), so they come after every scored
+    # application above 0, newest first. Cover letters are left out of the
+    # list and loaded with the detail modal (application_detail).
+    applications = job.applications.select_related('user').defer('cover_letter')
+    status = request.GET.get('status', '')
+    if status in dict(Application.STATUS_CHOICES):
+        applications = applications.filter(status=status)
+    else:
+        status = ''
+    try:
+        min_score = max(0, min(100, int(request.GET.get('min_score', 0))))
+    except ValueError:
+        min_score = 0
+    if min_score:
+        applications = applications.filter(score_status='Scored', ranking_score__gte=min_score / 100)
+    page = keyset_page(
+        applications,
+        ['-ranking_score', '-id'],
+        cursor=request.GET.get('after'),
+        page_size=getattr(settings, 'APPLICANT_PAGE_SIZE', 25),
+    )
+
+    # Applications per status for the filter tabs, from the (job, status) index
+    status_counts = dict(job.applications.values_list('status').annotate(n=Count('id')).order_by())
+    status_tabs = [('', 'All', sum(status_counts.values()))] + [
+        (value, label, status_counts.get(value, 0)) for value, label in Application.STATUS_CHOICES
+    ]
+
+    first_page = request.GET.copy()
+    first_page.pop('after', None)
+    next_page = first_page.copy()
+    next_page['after'] = page.next_cursor or ''
+
+    return render(request, 'recruitment/view_applicants.html', {
+        'job': job,
+        'applications': page,
+        'status': status,
+        'min_score': min_score,
+        'status_tabs': status_tabs,
+        'first_page_query': first_page.urlencode(),
+        'next_page_query': next_page.urlencode(),
+    })
+
+@login_required
+def application_detail(request, application_id):
+    # Body of the applicant detail modal, fetched when it is opened
+    application = get_object_or_404(Application.objects.select_related('user', 'job__company'), id=application_id)
+    if not request.user.is_hr or application.job.company.user_id != request.user.id:
+        return redirect('hr_dashboard')
+    return render(request, 'recruitment/application_detail.html', {'app': application})
 
 @login_required
 def update_application_status(request, application_id, status):
@@ -199,8 +347,10 @@ def update_application_status(request, application_id, status):
     
     # Ensure only the job owner can update status
     if request.user.is_hr and application.job.company.user == request.user:
+        from django.utils import timezone
         if status == 'Accepted':
             application.status = status
+            application.decided_at = timezone.now()
             application.save()
             
             # Notify Applicant
@@ -223,7 +373,13 @@ def update_application_status(request, application_id, status):
                 fail_silently=True
             )
             
-            # Delete the application record as requested
+            # Record the decision first so the analytics rollups count the
+            # rejection, then delete the application record as requested. Its
+            # resume file may be shared with other applications and is only
+            # removed with the last reference (see recruitment.signals).
+            application.status = status
+            application.decided_at = timezone.now()
+            application.save(update_fields=['status', 'decided_at'])
             application.delete()
             messages.warning(request, f"Application rejected and record deleted.")
             
@@ -243,6 +399,7 @@ def services(request):
 def contact(request):
     return render(request, 'recruitment/contact.html')
 
+@uploads.resume_upload(extensions=uploads.SCORER_EXTENSIONS)
 def resume_scorer(request):
     score = None
     match_count = 0
@@ -263,6 +420,9 @@ def resume_scorer(request):
         role_selection = request.POST.get('job_role')
         skills_input = request.POST.get('skills', '')
         uploaded_file = request.FILES.get('resume')
+        if 'resume' in request.upload_errors:
+            messages.error(request, request.upload_errors['resume'])
+            uploaded_file = None
 
         # Use role keywords if selected and no custom override
         target_skills_text = ""
@@ -274,58 +434,14 @@ def resume_scorer(request):
             target_skills_text += ", " + skills_input
 
         if target_skills_text and uploaded_file:
-            # 1. Parse Skills (for missing keywords display)
-            target_skills = [s.strip().lower() for s in target_skills_text.split(',') if s.strip()]
-            total_skills = len(target_skills)
-
-            # 2. Extract Text
-            text_content = ""
-            try:
-                filename = uploaded_file.name.lower()
-                if filename.endswith('.pdf'):
-                    import pypdf
-                    reader = pypdf.PdfReader(uploaded_file)
-                    for page in reader.pages:
-                        text_content += page.extract_text() + " "
-                elif filename.endswith('.docx'):
-                    import docx
-                    doc = docx.Document(uploaded_file)
-                    for para in doc.paragraphs:
-                        text_content += para.text + " "
-                else:
-                    # Fallback to text
-                    text_content = uploaded_file.read().decode('utf-8', errors='ignore')
-                
-                text_content = text_content.lower()
-
-            except Exception as e:
-                print(f"Error reading resume: {e}")
-                text_content = ""
-
-            # 3. Calculate Score using TF-IDF Ranker
-            try:
-                ranker = Ranker()
-                resumes_data = [{'filename': 'uploaded_resume', 'text': text_content}]
-                # Use target skills as the "job description" for ranking
-                ranking_results = ranker.rank_resumes(resumes_data, target_skills_text)
-                
-                if ranking_results:
-                    score = int(ranking_results[0]['score'])
-                else:
-                    score = 0
-            except Exception as e:
-                print(f"Ranking error: {e}")
-                score = 0
-
-            # 4. Identify Missing Keywords (Set logic)
-            matched_skills = []
-            for skill in target_skills:
-                if skill in text_content:
-                    matched_skills.append(skill)
-                else:
-                    missing_skills.append(skill)
-            
-            match_count = len(matched_skills)
+            # 1-4. Parse skills, extract text, score with the Ranker and find
+            # missing keywords. Text, model output and results are cached by
+            # file content, so re-submitting the same CV is nearly free.
+            result = score_cache.score_upload(uploaded_file, target_skills_text)
+            total_skills = len(result['matched_skills']) + len(result['missing_skills'])
+            missing_skills = result['missing_skills']
+            match_count = len(result['matched_skills'])
+            score = int(round(result['score'] * 100)) if result['score'] is not None else 0
             
             # Hybrid Score (Optional: Average of TF-IDF and Keyword Match?)
             # For now, let's Stick to Ranker score as the primary, but ensure it's not 0 if keywords match.
@@ -346,21 +462,64 @@ def resume_scorer(request):
 
 @login_required
 def smart_matching(request):
-    # Simple recommendation logic: Filter jobs by skills matching user's resume (if exists) or profile
-    # For now, return all jobs as "Recommended" to demonstrate UI
-    recommended_jobs = JobListing.objects.all().order_by('-created_at')[:5]
-    return render(request, 'recruitment/smart_matching.html', {'recommended_jobs': recommended_jobs})
+    # Top matches between the user's resumes/profile and every open job
+    recommended_jobs, reading_resumes = recommend_jobs(request.user)
+    if not recommended_jobs:
+        # Nothing to match on yet (no resume or bio): show the newest open jobs
+        from django.utils import timezone
+        recommended_jobs = JobListing.objects.filter(deadline__gte=timezone.now().date()).select_related('company').order_by('-created_at')[:5]
+    return render(request, 'recruitment/smart_matching.html', {
+        'recommended_jobs': recommended_jobs,
+        'reading_resumes': reading_resumes,
+    })
 
 def analytics_dashboard(request):
-    # Gather some basic stats
-    total_jobs = JobListing.objects.count()
-    total_applications = Application.objects.count()
-    companies_count = Company.objects.count()
-    
+    # Everything here comes from the rollup tables (recruitment/utils/rollups.py)
+    # and the Company counters, whose size depends on the days shown and
+    # companies, not on jobs, applications or how long the site has run
+    from datetime import timedelta
+    from django.utils import timezone
+    from .utils.rollups import BUCKETS
+
+    totals = Company.objects.aggregate(
+        companies=Count('id'), jobs=Sum('job_count'), applications=Sum('received_count'),
+        accepted=Sum('accepted_count'), rejected=Sum('rejected_count'),
+    )
+
+    # One point per day, including days without activity
+    days = getattr(settings, 'ANALYTICS_DAYS', 30)
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    per_day = {
+        row['day']: row
+        for row in DailyStats.objects.filter(day__gte=start).values('day').annotate(
+            jobs=Sum('jobs_posted'), applications=Sum('applications'),
+            accepted=Sum('accepted'), rejected=Sum('rejected'),
+        ).order_by()
+    }
+    series = {'labels': [], 'jobs': [], 'applications': [], 'accepted': [], 'rejected': []}
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = per_day.get(day, {})
+        series['labels'].append(day.strftime('%b %d'))
+        for key in ('jobs', 'applications', 'accepted', 'rejected'):
+            series[key].append(row.get(key) or 0)
+
+    buckets = dict(ScoreBucket.objects.values_list('bucket').annotate(n=Sum('count')).order_by())
+    histogram = {
+        'labels': [f"{10 * bucket}-{10 * bucket + 10}%" for bucket in range(BUCKETS)],
+        'counts': [buckets.get(bucket, 0) for bucket in range(BUCKETS)],
+    }
+
     context = {
-        'total_jobs': total_jobs,
-        'total_applications': total_applications,
-        'companies_count': companies_count,
+        'total_jobs': totals['jobs'] or 0,
+        'total_applications': totals['applications'] or 0,
+        'total_accepted': totals['accepted'] or 0,
+        'total_rejected': totals['rejected'] or 0,
+        'companies_count': totals['companies'],
+        'days': days,
+        'series': series,
+        'histogram': histogram,
     }
     return render(request, 'recruitment/analytics.html', context)
 
@@ -369,17 +528,31 @@ def analytics_dashboard(request):
 def secure_recruiting(request):
     return render(request, 'recruitment/secure_recruiting.html')
 
-def health_check(request):
+def _database_ok():
     try:
         # Check database connection
         with connection.cursor() as cursor:
             cursor.execute("SELECT 1")
-        db_status = True
+        return True
     except Exception as e:
-        db_status = False
+        return False
 
+def health_check(request):
+    # Public liveness probe: answers 200 whenever the process serves
+    # requests, so a database outage does not get the app restarted, and
+    # nothing here may describe the deployment
+    return JsonResponse({"status": "ok"})
+
+@staff_member_required
+def health_details(request):
+    # Readiness (503 while the database does not answer) plus cache, parser
+    # and per-view query statistics, for staff only
+    db_status = _database_ok()
     return JsonResponse({
-        "status": "ok",
-        "database": db_status
-    })
+        "status": "ok" if db_status else "error",
+        "database": db_status,
+        "score_cache": score_cache.stats(),
+        "parser_pool": parser_pool.pool_stats(),
+        "slowest_views": query_stats.worst() if settings.QUERY_INSTRUMENTATION else None
+    }, status=200 if db_status else 503)
 